@@ -0,0 +1,270 @@
+# ------------------------------------------------------------------------------------------------- #
+# Title: analytics_classes.py
+# Description: The module of analytics classes that summarize employee rating data
+# ChangeLog: (Who, When, What)
+# AdamSavage,20261018,Created module
+# AdamSavage,20261018,Read review dates as ordinals from Employee.review_ordinal
+# AdamSavage,20261018,Count appended rows into the (date, rating) counts instead of rescanning
+# ------------------------------------------------------------------------------------------------- #
+
+from array import array
+from collections import Counter
+from datetime import date
+
+RATINGS: tuple = (1, 2, 3, 4, 5)
+PERIODS: tuple = ("month", "quarter")
+
+
+class RatingAnalytics:
+    """
+    Summaries of employee rating data computed with whole-column scans
+
+    The work is done by counting over the date and rating columns in C (Counter, zip, and map over
+    arrays) instead of a Python loop per employee. Every period is reduced to a count per rating,
+    which gives its mean, median, and share of "Not Meeting Expectations" without sorting. Results
+    are cached until the data changes, and rows appended since the last count are added to the
+    (date, rating) counts without scanning the rows counted before.
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created Class
+    AdamSavage,20261018,Added the incremental (date, rating) counts
+    """
+
+    def __init__(self, employee_data: list):
+        """ This function prepares the analytics of a list of employee objects
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param employee_data: list of employee objects or an EmployeeTable
+        """
+        self.employee_data = employee_data
+        self.cache: dict = {}
+        self.cache_version = None
+        self.period_keys: dict = {}  # (period, review date ordinal) -> period label, since dates repeat
+        self.counts: Counter = Counter()  # (review date ordinal, rating) -> number of reviews
+        self.counted_version = (None, 0)  # data version the counts were taken at
+
+    def data_version(self):
+        """ This function gets a value that changes whenever the data changes
+
+        An EmployeeTable counts its changes in its generation. A plain list only grows through
+        IO.input_employee_data and the loaders, so its length is used instead.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :return: the version value
+        """
+        return getattr(self.employee_data, "generation", None), len(self.employee_data)
+
+    def cached(self, key: tuple, compute):
+        """ This function gets a result from the cache, computing it if the data changed
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param key: the cache key of the result
+        :param compute: function without arguments that computes the result
+        :return: the result
+        """
+        version = self.data_version()
+        if version != self.cache_version:
+            self.cache.clear()
+            self.cache_version = version
+        if key not in self.cache:
+            self.cache[key] = compute()
+        return self.cache[key]
+
+    def columns(self) -> tuple:
+        """ This function gets the first name, last name, review date ordinal, and rating columns
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :return: tuple of the four columns
+        """
+        def compute():
+            employee_data = self.employee_data
+            if hasattr(employee_data, "review_dates"):
+                return (employee_data.first_names, employee_data.last_names,
+                        employee_data.review_dates, employee_data.review_ratings)
+            return ([employee.first_name for employee in employee_data],
+                    [employee.last_name for employee in employee_data],
+                    array("i", [employee.review_ordinal for employee in employee_data]),
+                    array("b", [employee.review_rating for employee in employee_data]))
+        return self.cached(("columns",), compute)
+
+    def period_key(self, period: str, ordinal: int) -> str:
+        """ This function gets the label of the month or quarter a review date falls in
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param period: "month" or "quarter"
+        :param ordinal: the review date as a date ordinal
+        :return: label such as "2024-03" or "2024-Q1"
+        """
+        key = self.period_keys.get((period, ordinal))
+        if key is None:
+            review_date = date.fromordinal(ordinal)
+            if period == "month":
+                key = f"{review_date.year}-{review_date.month:02d}"
+            else:
+                key = f"{review_date.year}-Q{(review_date.month - 1) // 3 + 1}"
+            self.period_keys[(period, ordinal)] = key
+        return key
+
+    def date_rating_counts(self) -> Counter:
+        """ This function counts the reviews with each (review date, rating) pair
+
+        Dates repeat heavily, so there are far fewer pairs than rows. If rows were only appended
+        since the last count, only those rows are counted; any other change counts everything again.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :return: Counter of (review date ordinal, rating) -> number of reviews
+        """
+        version = self.data_version()
+        if version == self.counted_version:
+            return self.counts
+        generation, row_count = version
+        counted_generation, counted_rows = self.counted_version
+        # An EmployeeTable adds one to its generation for each appended row and for each edit.
+        only_appended = counted_rows == 0 or row_count >= counted_rows and \
+            (generation is None or generation - counted_generation == row_count - counted_rows)
+        if not only_appended:
+            self.counts.clear()
+            counted_rows = 0
+        employee_data = self.employee_data
+        if hasattr(employee_data, "review_dates"):
+            self.counts.update(zip(employee_data.review_dates[counted_rows:],
+                                   employee_data.review_ratings[counted_rows:]))
+        else:
+            self.counts.update((employee_data[row].review_ordinal, employee_data[row].review_rating)
+                               for row in range(counted_rows, row_count))
+        self.counted_version = version
+        return self.counts
+
+    def rating_histogram(self) -> dict:
+        """ This function counts the reviews with each rating
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :return: dictionary of rating -> number of reviews
+        """
+        def compute():
+            histogram = dict.fromkeys(RATINGS, 0)
+            for (_, rating), count in self.date_rating_counts().items():
+                histogram[rating] += count
+            return histogram
+        return self.cached(("histogram",), compute)
+
+    def period_histograms(self, period: str = "quarter") -> dict:
+        """ This function counts the reviews with each rating in each month or quarter
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param period: "month" or "quarter"
+        :return: dictionary of period label -> dictionary of rating -> number of reviews, in period order
+        """
+        if period not in PERIODS:
+            raise ValueError(f"Please choose a period from {', '.join(PERIODS)}")
+
+        def compute():
+            period_counts: Counter = Counter()
+            period_key = self.period_key
+            for (ordinal, rating), count in self.date_rating_counts().items():
+                period_counts[period_key(period, ordinal), rating] += count
+            histograms: dict = {}
+            for (key, rating), count in sorted(period_counts.items()):
+                histograms.setdefault(key, dict.fromkeys(RATINGS, 0))[rating] = count
+            return histograms
+        return self.cached(("period_histograms", period), compute)
+
+    @staticmethod
+    def histogram_summary(histogram: dict) -> dict:
+        """ This function gets the count, mean, median, and "Not Meeting Expectations" share of a histogram
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param histogram: dictionary of rating -> number of reviews
+        :return: dictionary with the reviews, mean, median, and not_meeting_percent keys
+        """
+        total = sum(histogram.values())
+        if total == 0:
+            return {"reviews": 0, "mean": None, "median": None, "not_meeting_percent": None}
+        mean = sum(rating * count for rating, count in histogram.items()) / total
+
+        def rating_at(position: int) -> int:  # the rating of the review at a 0-based position in sorted order
+            seen = 0
+            for rating in RATINGS:
+                seen += histogram.get(rating, 0)
+                if position < seen:
+                    return rating
+            return RATINGS[-1]
+
+        median = (rating_at((total - 1) // 2) + rating_at(total // 2)) / 2
+        return {"reviews": total, "mean": mean, "median": median,
+                "not_meeting_percent": 100 * histogram.get(1, 0) / total}
+
+    def period_summary(self, period: str = "quarter") -> dict:
+        """ This function gets the count, mean, median, and "Not Meeting Expectations" share of each period
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param period: "month" or "quarter"
+        :return: dictionary of period label -> summary dictionary, in period order
+        """
+        return self.cached(("period_summary", period),
+                           lambda: {key: RatingAnalytics.histogram_summary(histogram)
+                                    for key, histogram in self.period_histograms(period).items()})
+
+    def rating_trajectory(self, first_name: str, last_name: str) -> list:
+        """ This function gets one employee's ratings in review date order
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param first_name: the employee's first name, in any letter case
+        :param last_name: the employee's last name, in any letter case
+        :return: list of (YYYY-MM-DD review date, rating) tuples
+        """
+        return self.trajectories().get((last_name.title(), first_name.title()), [])
+
+    def trajectories(self) -> dict:
+        """ This function gets every employee's ratings in review date order
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :return: dictionary of (last name, first name) -> list of (YYYY-MM-DD review date, rating) tuples
+        """
+        def compute():
+            first_names, last_names, review_dates, review_ratings = self.columns()
+            by_employee: dict = {}
+            for key, ordinal, rating in zip(zip(last_names, first_names), review_dates, review_ratings):
+                by_employee.setdefault(key, []).append((ordinal, rating))
+            return {key: [(date.fromordinal(ordinal).isoformat(), rating) for ordinal, rating in sorted(reviews)]
+                    for key, reviews in by_employee.items()}
+        return self.cached(("trajectories",), compute)
+
+    def summary(self, period: str = "quarter") -> dict:
+        """ This function gets the overall and per period summaries shown by IO.output_rating_analytics
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param period: "month" or "quarter"
+        :return: dictionary with the histogram, overall, period, and periods keys
+        """
+        histogram = self.rating_histogram()
+        return {"histogram": histogram,
+                "overall": RatingAnalytics.histogram_summary(histogram),
+                "period": period,
+                "periods": self.period_summary(period)}
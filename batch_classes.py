@@ -0,0 +1,429 @@
+# ------------------------------------------------------------------------------------------------- #
+# Title: batch_classes.py
+# Description: The module of batch command classes that run without the menu loop
+# ChangeLog: (Who, When, What)
+# AdamSavage,20261018,Created module with the import, export, stats, and validate commands
+# AdamSavage,20261018,Added the analytics command
+# AdamSavage,20261018,Added the dedup command and upserting imports
+# AdamSavage,20261018,Added the serve command
+# AdamSavage,20261018,Count accepted and rejected rows with Metrics
+# AdamSavage,20261018,Added the merge command for sharded rating files
+# AdamSavage,20261018,Import the ratings service only for the serve command
+# AdamSavage,20261018,Upserts never rewrite a ratings file that has invalid rows
+# AdamSavage,20261018,Use the RECORD_ERRORS of processing_classes
+# ------------------------------------------------------------------------------------------------- #
+
+import os
+import sys
+import tempfile
+import time
+from itertools import islice
+import analytics_classes as ana
+import data_classes as dat
+import metrics_classes as met
+import presentation_classes as pres
+import processing_classes as proc
+import query_classes as query
+import storage_classes as storage
+
+MAX_REPORTED_ERRORS: int = 20  # rejected rows listed in a batch report, the rest are only counted
+
+
+class BatchProcessor:
+    """
+    A collection of processing layer functions that run the batch commands of main.py
+
+    Every command streams rows through the Employee validation and reports its row counts and
+    rows per second with IO.output_batch_report.
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created Class
+    """
+
+    @staticmethod
+    def new_report(command: str) -> dict:
+        """ This function starts the report of a batch command
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param command: name of the command
+        :return: dictionary with the command, accepted, rejected, seconds, errors, and start keys
+        """
+        return {"command": command, "accepted": 0, "rejected": 0, "seconds": 0.0, "errors": [],
+                "start": time.perf_counter()}
+
+    @staticmethod
+    def finish_report(report: dict) -> dict:
+        """ This function records the run time of a batch command and displays its report
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param report: the report started by new_report
+        :return: the finished report
+        """
+        report["seconds"] = time.perf_counter() - report.pop("start")
+        pres.IO.output_batch_report(report)
+        return report
+
+    @staticmethod
+    def iter_source_records(sources: list, backend_name: str = None):
+        """ This function yields the dictionary rows of files, or of standard input for "-"
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param sources: list of file names, where "-" means standard input
+        :param backend_name: name of the storage format, or None to go by the file extension
+        :return: generator of dictionary rows
+        """
+        for source in sources:
+            if source == "-":
+                backend = storage.StorageBackend.for_file_name("", backend_name or "jsonl")
+                if not hasattr(backend, "iter_file_records"):
+                    raise ValueError(f"The {backend.name} format cannot be read from standard input")
+                yield from backend.iter_file_records(sys.stdin)
+            else:
+                yield from proc.FileProcessor.iter_file_records(source, backend_name)
+
+    @staticmethod
+    def iter_valid_employees(records, employee_type: object, report: dict):
+        """ This function yields the employees built from the valid rows and counts the rejected rows
+
+        Rows are validated in batches with employee_type.from_records, and only a batch with a bad
+        row is checked again row by row to find the rows to reject.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Time validation and count the rows with Metrics
+        AdamSavage,20261018,Catch the RECORD_ERRORS of processing_classes
+
+        :param records: iterable of dictionary rows
+        :param employee_type: an reference to the Employee class
+        :param report: the report that counts the accepted and rejected rows
+        :return: generator of employee objects
+        """
+        records = iter(records)
+        row_number = 0
+        while batch := list(islice(records, proc.RECORD_BATCH_SIZE)):
+            try:
+                with met.Metrics.timer("validate"):
+                    employee_list = employee_type.from_records(batch)
+            except proc.RECORD_ERRORS:
+                employee_list = []
+                for offset, record in enumerate(batch, 1):
+                    try:
+                        employee_list.extend(employee_type.from_records([record]))
+                    except proc.RECORD_ERRORS as e:
+                        report["rejected"] += 1
+                        met.Metrics.count("rows_rejected")
+                        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                            report["errors"].append((row_number + offset, f"{type(e).__name__}: {e}"))
+            row_number += len(batch)
+            report["accepted"] += len(employee_list)
+            met.Metrics.count("rows_accepted", len(employee_list))
+            yield from employee_list
+
+    @staticmethod
+    def run_import(sources: list, file_name: str, employee_type: object, source_format: str = None,
+                   backend_name: str = None, upsert: bool = False) -> int:
+        """ This function appends the valid rows of files or standard input to a ratings file
+
+        With upsert, a row whose review is already in the file replaces it instead of being added, so
+        importing the same rows twice changes nothing. The file is then rewritten only if a rating changed.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Added upsert
+
+        :param sources: list of file names, where "-" means standard input
+        :param file_name: string data with name of the ratings file to append to
+        :param employee_type: an reference to the Employee class
+        :param source_format: storage format of the sources, or None to go by the file extension
+        :param backend_name: storage format of the ratings file, or None to go by the file extension
+        :param upsert: True to update reviews that are already in the file instead of adding duplicates
+        :return: the process exit code, 0 when every row was imported
+        """
+        report = BatchProcessor.new_report("import")
+        exit_code = 0
+        try:
+            employees = BatchProcessor.iter_valid_employees(
+                BatchProcessor.iter_source_records(sources, source_format), employee_type, report)
+            if upsert:
+                return BatchProcessor.upsert_employees(file_name, employees, employee_type, report, backend_name)
+            while batch := list(islice(employees, proc.RECORD_BATCH_SIZE)):
+                if proc.FileProcessor.append_employee_data_to_file(file_name, batch, 0, backend_name) != len(batch):
+                    report["accepted"] -= len(batch)  # the save error is displayed by FileProcessor
+                    exit_code = 2
+                    break
+        except Exception as e:
+            pres.IO.output_error_messages("There was a non-specific error!", e)
+            exit_code = 2
+        BatchProcessor.finish_report(report)
+        return exit_code or (1 if report["rejected"] else 0)
+
+    @staticmethod
+    def upsert_employees(file_name: str, employees, employee_type: object, report: dict,
+                         backend_name: str = None) -> int:
+        """ This function upserts employee objects into a ratings file and finishes the import report
+
+        Invalid rows already in the file are counted in the report. A rewrite would drop them, so
+        when a rating changed and the file has such rows, nothing is imported.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Report the invalid rows of the file and refuse to rewrite a file that has any
+
+        :param file_name: string data with name of the ratings file
+        :param employees: iterable of employee objects
+        :param employee_type: an reference to the Employee class
+        :param report: the report of the import
+        :param backend_name: storage format of the ratings file, or None to go by the file extension
+        :return: the process exit code, 0 when every row was imported
+        """
+        table = dat.EmployeeTable()
+        load_report = BatchProcessor.new_report("load")
+        if os.path.exists(file_name):
+            table.extend(BatchProcessor.iter_valid_employees(proc.FileProcessor.iter_file_records(
+                file_name, backend_name), employee_type, load_report))
+        report["file_rejected"] = load_report["rejected"]
+        saved_row_count = len(table)
+        index = query.EmployeeIndex(table)
+        added, existed = index.upsert_many(employees)
+        report["duplicates"] = existed
+        if index.update_count and load_report["rejected"]:
+            pres.IO.output_error_messages(f"The {file_name} file has {load_report['rejected']} invalid rows that "
+                                          "rewriting it would drop, so no rows were imported. Please fix them first.")
+            report["accepted"] = 0
+            BatchProcessor.finish_report(report)
+            return 2
+        if index.update_count:  # ratings changed in place, so the whole file is rewritten
+            proc.FileProcessor.replace_file_records(file_name, map(storage.record_from_employee, table), backend_name)
+        elif proc.FileProcessor.append_employee_data_to_file(file_name, table, saved_row_count,
+                                                             backend_name) != len(table):
+            report["accepted"] -= added  # the save error is displayed by FileProcessor
+            BatchProcessor.finish_report(report)
+            return 2
+        BatchProcessor.finish_report(report)
+        return 1 if report["rejected"] or report["file_rejected"] else 0
+
+    @staticmethod
+    def run_dedup(file_name: str, backend_name: str = None, max_rows_in_memory: int = proc.DEDUP_MEMORY_ROWS) -> int:
+        """ This function rewrites a ratings file keeping only the last row of each review
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of the ratings file
+        :param backend_name: storage format of the ratings file, or None to go by the file extension
+        :param max_rows_in_memory: largest number of rows to sort in memory at once
+        :return: the process exit code, 0 when the file was rewritten
+        """
+        report = BatchProcessor.new_report("dedup")
+        try:
+            rows_read, rows_written = proc.FileProcessor.deduplicate_employee_file(file_name, backend_name,
+                                                                                   max_rows_in_memory)
+            report["accepted"], report["duplicates"] = rows_written, rows_read - rows_written
+        except Exception as e:
+            pres.IO.output_error_messages("There was a non-specific error!", e)
+            BatchProcessor.finish_report(report)
+            return 2
+        BatchProcessor.finish_report(report)
+        return 0
+
+    @staticmethod
+    def run_merge(path: str, file_name: str, employee_type: object, source_format: str = None,
+                  backend_name: str = None, max_rows_in_memory: int = proc.DEDUP_MEMORY_ROWS) -> int:
+        """ This function merges the valid rows of the rating files in a directory or glob into one file by review date
+
+        The rows are streamed and sorted with bounded memory, so the files do not need to fit in memory.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param path: a directory, or a glob pattern such as "ratings/*.jsonl"
+        :param file_name: string data with name of the ratings file to replace with the merged rows
+        :param employee_type: an reference to the Employee class
+        :param source_format: storage format of the files, or None to go by each file extension
+        :param backend_name: storage format of the ratings file, or None to go by the file extension
+        :param max_rows_in_memory: largest number of rows to sort in memory at once
+        :return: the process exit code, 0 when every row was valid and the file was written
+        """
+        report = BatchProcessor.new_report("merge")
+        report["shards"] = {}
+        exit_code = 0
+
+        def iter_shard_records(shard_file_name: str):
+            report["shards"][shard_file_name] = 0
+            for employee in BatchProcessor.iter_valid_employees(
+                    proc.FileProcessor.iter_file_records(shard_file_name, source_format), employee_type, report):
+                report["shards"][shard_file_name] += 1
+                yield storage.record_from_employee(employee)
+
+        try:
+            shard_file_names = proc.FileProcessor.find_shard_files(path, source_format)
+            if not shard_file_names:
+                raise FileNotFoundError(f"There are no rating files at {path}")
+            with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(file_name))) as temp_dir:
+                records = proc.FileProcessor.iter_merged_records(
+                    [iter_shard_records(shard_file_name) for shard_file_name in shard_file_names],
+                    max_rows_in_memory, temp_dir)
+                proc.FileProcessor.replace_file_records(file_name, records, backend_name)
+        except Exception as e:
+            pres.IO.output_error_messages("There was a non-specific error!", e)
+            exit_code = 2
+        BatchProcessor.finish_report(report)
+        return exit_code or (1 if report["rejected"] else 0)
+
+    @staticmethod
+    def run_export(file_name: str, output: str, employee_type: object, backend_name: str = None,
+                   output_format: str = None) -> int:
+        """ This function writes the valid rows of a ratings file to another file or standard output
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of the ratings file to read from
+        :param output: name of the file to write to, where "-" means standard output
+        :param employee_type: an reference to the Employee class
+        :param backend_name: storage format of the ratings file, or None to go by the file extension
+        :param output_format: storage format of the output, or None to go by its file extension
+        :return: the process exit code, 0 when every row was exported
+        """
+        report = BatchProcessor.new_report("export")
+        exit_code = 0
+        try:
+            records = (storage.record_from_employee(employee) for employee in BatchProcessor.iter_valid_employees(
+                proc.FileProcessor.iter_file_records(file_name, backend_name), employee_type, report))
+            if output == "-":
+                backend = storage.StorageBackend.for_file_name("", output_format or "jsonl")
+                if not hasattr(backend, "write_file_records") or backend is storage.BinaryBackend:
+                    raise ValueError(f"The {backend.name} format cannot be written to standard output")
+                backend.write_file_records(sys.stdout, records)
+                sys.stdout.flush()
+            else:
+                storage.StorageBackend.for_file_name(output, output_format).write_records(output, records)
+        except Exception as e:
+            pres.IO.output_error_messages("There was a non-specific error!", e)
+            exit_code = 2
+        BatchProcessor.finish_report(report)
+        return exit_code or (1 if report["rejected"] else 0)
+
+    @staticmethod
+    def run_stats(file_name: str, employee_type: object, backend_name: str = None) -> int:
+        """ This function displays summary statistics of the valid rows of a ratings file
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of the ratings file to read from
+        :param employee_type: an reference to the Employee class
+        :param backend_name: storage format of the ratings file, or None to go by the file extension
+        :return: the process exit code, 0 when every row was valid
+        """
+        report = BatchProcessor.new_report("stats")
+        stats: dict = {"rows": 0, "employees": 0, "first_date": None, "last_date": None,
+                       "ratings": {rating: 0 for rating in (1, 2, 3, 4, 5)}}
+        names: set = set()
+        try:
+            for employee in BatchProcessor.iter_valid_employees(
+                    proc.FileProcessor.iter_file_records(file_name, backend_name), employee_type, report):
+                review_date = employee.review_date  # ISO dates compare correctly as text
+                if stats["first_date"] is None or review_date < stats["first_date"]:
+                    stats["first_date"] = review_date
+                if stats["last_date"] is None or review_date > stats["last_date"]:
+                    stats["last_date"] = review_date
+                stats["ratings"][employee.review_rating] += 1
+                names.add((employee.last_name, employee.first_name))
+            stats["rows"] = report["accepted"]
+            stats["employees"] = len(names)
+            pres.IO.output_rating_stats(stats)
+        except Exception as e:
+            pres.IO.output_error_messages("There was a non-specific error!", e)
+            BatchProcessor.finish_report(report)
+            return 2
+        BatchProcessor.finish_report(report)
+        return 1 if report["rejected"] else 0
+
+    @staticmethod
+    def run_analytics(file_name: str, employee_type: object, backend_name: str = None,
+                      period: str = "quarter") -> int:
+        """ This function displays the rating analytics of the valid rows of a ratings file
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of the ratings file to read from
+        :param employee_type: an reference to the Employee class
+        :param backend_name: storage format of the ratings file, or None to go by the file extension
+        :param period: "month" or "quarter"
+        :return: the process exit code, 0 when every row was valid
+        """
+        report = BatchProcessor.new_report("analytics")
+        try:
+            table = dat.EmployeeTable(BatchProcessor.iter_valid_employees(
+                proc.FileProcessor.iter_file_records(file_name, backend_name), employee_type, report))
+            pres.IO.output_rating_analytics(ana.RatingAnalytics(table).summary(period))
+        except Exception as e:
+            pres.IO.output_error_messages("There was a non-specific error!", e)
+            BatchProcessor.finish_report(report)
+            return 2
+        BatchProcessor.finish_report(report)
+        return 1 if report["rejected"] else 0
+
+    @staticmethod
+    def run_validate(sources: list, employee_type: object, source_format: str = None) -> int:
+        """ This function checks the rows of files or standard input without saving them
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param sources: list of file names, where "-" means standard input
+        :param employee_type: an reference to the Employee class
+        :param source_format: storage format of the sources, or None to go by the file extension
+        :return: the process exit code, 0 when every row was valid
+        """
+        report = BatchProcessor.new_report("validate")
+        exit_code = 0
+        try:
+            for _ in BatchProcessor.iter_valid_employees(
+                    BatchProcessor.iter_source_records(sources, source_format), employee_type, report):
+                pass
+        except Exception as e:
+            pres.IO.output_error_messages("There was a non-specific error!", e)
+            exit_code = 2
+        BatchProcessor.finish_report(report)
+        return exit_code or (1 if report["rejected"] else 0)
+
+    @staticmethod
+    def run_command(arguments, employee_type: object) -> int:
+        """ This function runs the batch command chosen on the command line
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Import the service module only for the serve command
+
+        :param arguments: the parsed command line arguments of main.py
+        :param employee_type: an reference to the Employee class
+        :return: the process exit code
+        """
+        if arguments.command == "import":
+            return BatchProcessor.run_import(arguments.sources, arguments.file, employee_type,
+                                             arguments.input_format, arguments.format, arguments.upsert)
+        if arguments.command == "export":
+            return BatchProcessor.run_export(arguments.file, arguments.output, employee_type,
+                                             arguments.format, arguments.output_format)
+        if arguments.command == "stats":
+            return BatchProcessor.run_stats(arguments.file, employee_type, arguments.format)
+        if arguments.command == "serve":
+            import service_classes as srv  # imported here, so only the serve command loads asyncio
+            return srv.RatingService.run_server(arguments, employee_type)
+        if arguments.command == "merge":
+            return BatchProcessor.run_merge(arguments.path, arguments.file, employee_type, arguments.input_format,
+                                            arguments.format, arguments.memory_rows)
+        if arguments.command == "dedup":
+            return BatchProcessor.run_dedup(arguments.file, arguments.format, arguments.memory_rows)
+        if arguments.command == "analytics":
+            return BatchProcessor.run_analytics(arguments.file, employee_type, arguments.format, arguments.period)
+        return BatchProcessor.run_validate(arguments.sources, employee_type, arguments.input_format)
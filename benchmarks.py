@@ -0,0 +1,802 @@
+# ------------------------------------------------------------------------------------------------- #
+# Title: benchmarks.py
+# Description: Benchmarks for the employee ratings data, processing, and presentation classes
+# ChangeLog: (Who, When, What)
+# AdamSavage,20261018,Created script with the EmployeeTable memory benchmark
+# AdamSavage,20261018,Added the Employee construction benchmark
+# AdamSavage,20261018,Added the storage backend benchmark
+# AdamSavage,20261018,Added the parallel load scaling benchmark
+# AdamSavage,20261018,Added the review date benchmark
+# AdamSavage,20261018,Added the name interning benchmark
+# AdamSavage,20261018,Added the ratings service load generator
+# AdamSavage,20261018,Added the lazy loading time-to-menu benchmark
+# AdamSavage,20261018,Added the load/save/display suite, JSON results, and baseline comparison
+# AdamSavage,20261018,Added the compressed storage benchmark
+# AdamSavage,20261018,Added the shard loader benchmark
+# AdamSavage,20261018,Added the startup time benchmark
+# AdamSavage,20261018,Added the sorted and top N view benchmark
+# AdamSavage,20261018,Added the autosave input latency benchmark
+# ------------------------------------------------------------------------------------------------- #
+
+import argparse
+import asyncio
+import contextlib
+import functools
+import gc
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+from unittest.mock import patch
+
+import data_classes as dat
+import presentation_classes as pres
+import processing_classes as proc
+import query_classes as query
+import service_classes as srv
+import storage_classes as storage
+
+FIRST_NAMES: tuple = ("John", "Jane", "Alex", "Maria", "Sam", "Priya", "Chen", "Olga", "Luis", "Aisha")
+LAST_NAMES: tuple = ("Doe", "Smith", "Garcia", "Nguyen", "Patel", "Kim", "Brown", "Novak", "Silva", "Okafor")
+FIRST_REVIEW_DATE: date = date(2020, 1, 1)
+DATE_SPREAD_DAYS: int = 1826  # five years of review dates
+SUITE_ROWS: tuple = (1_000, 10_000, 100_000)
+REGRESSION_TOLERANCE: float = 0.25  # a metric more than 25% worse than the baseline is a regression
+BASELINE_FILE_NAME: str = "benchmark_baseline.json"
+MAIN_SCRIPT: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+
+def make_person_name(person: int) -> tuple:
+    """ This function makes the first and last name of a synthetic person
+
+    The first 100 people combine the FIRST_NAMES and LAST_NAMES, later people get letters added
+    to the first name, so any number of distinct names can be made.
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created function
+
+    :param person: number of the person, from 0
+    :return: tuple of the first name and last name
+    """
+    extra, combination = divmod(person, len(FIRST_NAMES) * len(LAST_NAMES))
+    first_name = FIRST_NAMES[combination % len(FIRST_NAMES)]
+    while extra:
+        extra, letter = divmod(extra - 1, 26)
+        first_name += chr(ord("a") + letter)
+    return first_name, LAST_NAMES[combination // len(FIRST_NAMES)]
+
+
+def make_employee_records(row_count: int, seed: int = 42, name_count: int = None,
+                          date_spread: int = DATE_SPREAD_DAYS):
+    """ This function yields deterministic synthetic employee rating rows
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created function
+    AdamSavage,20261018,Added name_count and date_spread
+
+    :param row_count: number of rows to generate
+    :param seed: seed for the random number generator
+    :param name_count: number of distinct people, or None to pick first and last names separately from
+                       FIRST_NAMES and LAST_NAMES
+    :param date_spread: number of distinct days the review dates are spread over, from FIRST_REVIEW_DATE
+    :return: generator of dictionary rows
+    """
+    generator = random.Random(seed)
+    first_ordinal = FIRST_REVIEW_DATE.toordinal()
+    names: dict = {}
+    for _ in range(row_count):
+        if name_count is None:
+            first_name, last_name = generator.choice(FIRST_NAMES), generator.choice(LAST_NAMES)
+        else:
+            person = generator.randrange(name_count)
+            if person not in names:
+                names[person] = make_person_name(person)
+            first_name, last_name = names[person]
+        yield {"FirstName": first_name,
+               "LastName": last_name,
+               "ReviewDate": date.fromordinal(first_ordinal + generator.randrange(date_spread)).isoformat(),
+               "ReviewRating": generator.randint(1, 5)}
+
+
+def make_employees(row_count: int, seed: int = 42):
+    """ This function builds a list of Employee objects from synthetic rows
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created function
+
+    :param row_count: number of rows to generate
+    :param seed: seed for the random number generator
+    :return: list of Employee objects
+    """
+    return [dat.Employee(record["FirstName"], record["LastName"], record["ReviewDate"], record["ReviewRating"])
+            for record in make_employee_records(row_count, seed)]
+
+
+def measure_memory(build) -> int:
+    """ This function measures the memory still allocated by the object a function builds
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created function
+
+    :param build: function without arguments that returns the object to measure
+    :return: number of bytes allocated
+    """
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return allocated
+
+
+def benchmark_table_memory(row_count: int) -> dict:
+    """ This function compares the memory of a list of Employee objects with an EmployeeTable
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created function
+
+    :param row_count: number of rows to store
+    :return: dictionary of results
+    """
+    employees = make_employees(row_count)
+    list_bytes = measure_memory(lambda: make_employees(row_count))
+    table_bytes = measure_memory(lambda: dat.EmployeeTable(employees))
+    return {"rows": row_count,
+            "list_bytes_per_row": list_bytes / row_count,
+            "table_bytes_per_row": table_bytes / row_count}
+
+
+def build_employees_with_setters(records: list) -> list:
+    """ This function builds Employee objects one property setter at a time, as the loader used to
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created function
+
+    :param records: list of dictionary rows
+    :return: list of Employee objects
+    """
+    employee_list: list = []
+    for record in records:
+        employee = dat.Employee()
+        employee.first_name = record["FirstName"]
+        employee.last_name = record["LastName"]
+        employee.review_date = record["ReviewDate"]
+        employee.review_rating = record["ReviewRating"]
+        employee_list.append(employee)
+    return employee_list
+
+
+def benchmark_employee_construction(row_count: int) -> dict:
+    """ This function compares rows per second for per-row setters and Employee.from_records
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created function
+
+    :param row_count: number of rows to build
+    :return: dictionary of results
+    """
+    records = list(make_employee_records(row_count))
+    results: dict = {"rows": row_count}
+    for name, build in (("setters", build_employees_with_setters), ("from_records", dat.Employee.from_records)):
+        start = time.perf_counter()
+        build(records)
+        results[name + "_rows_per_sec"] = row_count / (time.perf_counter() - start)
+    return results
+
+
+def benchmark_storage(row_count: int) -> dict:
+    """ This function compares save and load throughput and file size of every storage backend
+
+    Run it at the sizes that matter, for example: python benchmarks.py storage --rows 10000 1000000 10000000
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created function
+
+    :param row_count: number of rows to save and load
+    :return: dictionary of results
+    """
+    records = list(make_employee_records(row_count))
+    results: dict = {"rows": row_count}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for backend in storage.BACKENDS:
+            file_name = os.path.join(temp_dir, "EmployeeRatings" + backend.extensions[0])
+            start = time.perf_counter()
+            backend.write_records(file_name, records)
+            save_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            proc.FileProcessor.read_employee_data_from_file(file_name, dat.EmployeeTable(), dat.Employee)
+            load_seconds = time.perf_counter() - start
+            results[backend.name] = {"save_rows_per_sec": row_count / save_seconds,
+                                     "load_rows_per_sec": row_count / load_seconds,
+                                     "bytes_per_row": os.path.getsize(file_name) / row_count}
+    return results
+
+
+def benchmark_parallel_load(row_count: int, worker_counts: tuple = (1, 2, 4, 8, 16, 32)) -> dict:
+    """ This function measures how loading a json lines file scales with the number of worker processes
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created function
+
+    :param row_count: number of rows to load
+    :param worker_counts: numbers of worker processes to try, capped at the number of CPUs
+    :return: dictionary of results
+    """
+    results: dict = {"rows": row_count, "cpus": os.cpu_count()}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_name = os.path.join(temp_dir, "EmployeeRatings.jsonl")
+        storage.JsonLinesBackend.write_records(file_name, make_employee_records(row_count))
+        for workers in worker_counts:
+            if workers > (os.cpu_count() or 1) and workers > 1:
+                break
+            start = time.perf_counter()
+            proc.FileProcessor.read_employee_data_parallel(file_name, dat.EmployeeTable(), dat.Employee, workers)
+            results[f"workers_{workers}_rows_per_sec"] = row_count / (time.perf_counter() - start)
+    return results
+
+
+def benchmark_review_dates(row_count: int = 1_000_000) -> dict:
+    """ This function compares review date validation and sorting with parsed strings and cached ordinals
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created function
+
+    :param row_count: number of review dates, 1,000,000 is the size the ordinal dates were tuned for
+    :return: dictionary of results
+    """
+    review_dates = [record["ReviewDate"] for record in make_employee_records(row_count)]
+    employee = dat.Employee()
+    results: dict = {"rows": row_count, "distinct_dates": len(set(review_dates))}
+
+    start = time.perf_counter()
+    for review_date in review_dates:
+        date.fromisoformat(review_date)  # what the setter used to do on every assignment
+    results["parse_every_time_per_sec"] = row_count / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for review_date in review_dates:
+        employee.review_date = review_date
+    results["cached_setter_per_sec"] = row_count / (time.perf_counter() - start)
+
+    employees = dat.Employee.from_records({"FirstName": "John", "LastName": "Doe", "ReviewDate": review_date,
+                                           "ReviewRating": 3} for review_date in review_dates)
+    start = time.perf_counter()
+    sorted(employees, key=lambda row: date.fromisoformat(row.review_date))
+    results["sort_by_parsed_date_seconds"] = time.perf_counter() - start
+    start = time.perf_counter()
+    sorted(employees, key=lambda row: row.review_ordinal)
+    results["sort_by_ordinal_seconds"] = time.perf_counter() - start
+    return results
+
+
+def benchmark_name_interning(row_count: int) -> dict:
+    """ This function measures loading and displaying employees whose names share interned strings
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created function
+
+    :param row_count: number of rows to load and display
+    :return: dictionary of results
+    """
+    results: dict = {"rows": row_count}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_name = os.path.join(temp_dir, "EmployeeRatings.json")
+        storage.JsonBackend.write_records(file_name, make_employee_records(row_count))
+        start = time.perf_counter()
+        employees = proc.FileProcessor.read_employee_data_from_file(file_name, [], dat.Employee)
+        results["load_rows_per_sec"] = row_count / (time.perf_counter() - start)
+        results["list_bytes_per_row"] = measure_memory(
+            lambda: proc.FileProcessor.read_employee_data_from_file(file_name, [], dat.Employee)) / row_count
+    results["distinct_name_objects"] = len({id(employee.first_name) for employee in employees} |
+                                           {id(employee.last_name) for employee in employees})
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        pres.IO.write_employee_data(employees)
+        results["display_rows_per_sec"] = row_count / (time.perf_counter() - start)
+    return results
+
+
+async def generate_service_load(path: str, requests: list, clients: int) -> list:
+    """ This function sends requests to the ratings service from several concurrent clients
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created function
+
+    :param path: path of the Unix socket the service listens on
+    :param requests: list of request dictionaries, shared out round robin between the clients
+    :param clients: number of concurrent client connections
+    :return: list of request latencies in seconds
+    """
+    latencies: list = []
+
+    async def run_client(client_requests: list):
+        reader, writer = await asyncio.open_unix_connection(path)
+        for request in client_requests:
+            start = time.perf_counter()
+            writer.write(json.dumps(request).encode("utf-8") + b"\n")
+            await writer.drain()
+            await reader.readline()
+            latencies.append(time.perf_counter() - start)
+        writer.close()
+
+    await asyncio.gather(*[run_client(requests[client::clients]) for client in range(clients)])
+    return latencies
+
+
+def benchmark_service(row_count: int, clients: int = 16, preload_rows: int = 100_000) -> dict:
+    """ This function measures requests per second and p99 latency of the ratings service
+
+    The service and the load generator share one event loop, so the numbers are a lower bound
+    for a service with the machine to itself. The mix is 80% adds, 15% queries, and 5% stats.
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created function
+
+    :param row_count: number of requests to send
+    :param clients: number of concurrent client connections
+    :param preload_rows: number of rows in the ratings file when the service starts
+    :return: dictionary of results
+    """
+    generator = random.Random(7)
+    first_new_ordinal = date(2025, 1, 1).toordinal()  # after the preloaded reviews, so the adds append
+    requests: list = []
+    for number, record in enumerate(make_employee_records(row_count, seed=1)):
+        choice = generator.random()
+        if choice < 0.80:  # a new review, each name reviewed once per day
+            requests.append({"op": "add", "FirstName": FIRST_NAMES[number % 10],
+                             "LastName": LAST_NAMES[number // 10 % 10],
+                             "ReviewDate": date.fromordinal(first_new_ordinal + number // 100).isoformat(),
+                             "ReviewRating": record["ReviewRating"]})
+        elif choice < 0.95:
+            requests.append({"op": "query", "FirstName": record["FirstName"], "LastName": record["LastName"],
+                             "limit": 10})
+        else:
+            requests.append({"op": "stats"})
+
+    async def run(service: srv.RatingService, path: str) -> tuple:
+        server = await service.start(path=path)
+        async with server:
+            start = time.perf_counter()
+            latencies = await generate_service_load(path, requests, clients)
+            return time.perf_counter() - start, latencies
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_name = os.path.join(temp_dir, "EmployeeRatings.json")
+        storage.JsonBackend.write_records(file_name, make_employee_records(preload_rows))
+        service = srv.RatingService(file_name, dat.EmployeeTable(), dat.Employee)
+        service.load()
+        seconds, latencies = asyncio.run(run(service, os.path.join(temp_dir, "ratings.sock")))
+    latencies.sort()
+    return {"requests": row_count, "clients": clients,
+            "requests_per_sec": row_count / seconds,
+            "p50_ms": latencies[len(latencies) // 2] * 1000,
+            "p99_ms": latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)] * 1000}
+
+
+def benchmark_lazy_load(row_count: int) -> dict:
+    """ This function compares the time to the menu, and to add one rating and save, of eager and lazy loading
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created function
+
+    :param row_count: number of rows in the ratings file
+    :return: dictionary of results
+    """
+    results: dict = {"rows": row_count}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for backend in (storage.JsonLinesBackend, storage.BinaryBackend):
+            file_name = os.path.join(temp_dir, "EmployeeRatings" + backend.extensions[0])
+            backend.write_records(file_name, make_employee_records(row_count))
+            for lazy in (False, True):
+                start = time.perf_counter()
+                employees = proc.FileProcessor.read_employee_data_from_file(file_name, dat.EmployeeTable(),
+                                                                            dat.Employee, lazy=lazy)
+                menu_seconds = time.perf_counter() - start
+                employees.append(dat.Employee("Ann", "Lee", "2025-01-01", 3))
+                save_rows, saved_row_count = (employees.added_rows, 0) if lazy else (employees, len(employees) - 1)
+                proc.FileProcessor.append_employee_data_to_file(file_name, save_rows, saved_row_count)
+                mode = "lazy" if lazy else "eager"
+                results[f"{backend.name}_{mode}_menu_ms"] = menu_seconds * 1000
+                results[f"{backend.name}_{mode}_add_and_save_ms"] = (time.perf_counter() - start) * 1000
+                if lazy:
+                    start = time.perf_counter()
+                    employees[row_count // 2]
+                    results[f"{backend.name}_lazy_middle_row_ms"] = (time.perf_counter() - start) * 1000
+                    employees.close()
+    return results
+
+
+def benchmark_compression(row_count: int, extensions: tuple = (".json", ".jsonl", ".bin")) -> dict:
+    """ This function measures save and load throughput and the compression ratio of each codec against plain files
+
+    The peak memory of each load is traced too, which stays flat for compressed files because
+    they are decompressed as a stream rather than in one piece.
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created function
+
+    :param row_count: number of rows to save and load
+    :param extensions: storage format extensions to compress
+    :return: dictionary of results
+    """
+    employees = make_employees(row_count)
+    results: dict = {"rows": row_count}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for extension in extensions:
+            plain_size = None
+            for codec_extension in ("",) + tuple(storage.CODECS):
+                name = (extension + codec_extension).lstrip(".")
+                file_name = os.path.join(temp_dir, "EmployeeRatings" + extension + codec_extension)
+                start = time.perf_counter()
+                proc.FileProcessor.write_employee_data_to_file(file_name, employees)
+                results[f"{name}_save_rows_per_sec"] = row_count / (time.perf_counter() - start)
+                start = time.perf_counter()
+                proc.FileProcessor.read_employee_data_from_file(file_name, dat.EmployeeTable(), dat.Employee)
+                results[f"{name}_load_rows_per_sec"] = row_count / (time.perf_counter() - start)
+                tracemalloc.start()
+                for _ in storage.StorageBackend.for_file_name(file_name).iter_records(file_name):
+                    pass
+                results[f"{name}_read_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                file_size = os.path.getsize(file_name)
+                results[f"{name}_bytes"] = file_size
+                plain_size = plain_size or file_size
+                if codec_extension:
+                    results[f"{name}_ratio"] = plain_size / file_size
+    return results
+
+
+def benchmark_shard_load(row_count: int, shard_count: int = 8) -> dict:
+    """ This function measures loading rating files split into shards, against one file with the same rows
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created function
+
+    :param row_count: number of rows across all the shards
+    :param shard_count: number of shard files
+    :return: dictionary of results
+    """
+    records = list(make_employee_records(row_count))
+    results: dict = {"rows": row_count, "shards": shard_count, "cpus": os.cpu_count()}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_name = os.path.join(temp_dir, "EmployeeRatings.jsonl")
+        storage.JsonLinesBackend.write_records(file_name, records)
+        shard_dir = os.path.join(temp_dir, "shards")
+        os.mkdir(shard_dir)
+        for shard in range(shard_count):
+            storage.JsonLinesBackend.write_records(os.path.join(shard_dir, f"department{shard}.jsonl"),
+                                                   records[shard::shard_count])
+        start = time.perf_counter()
+        proc.FileProcessor.read_employee_data_from_file(file_name, [], dat.Employee)
+        results["one_file_rows_per_sec"] = row_count / (time.perf_counter() - start)
+        for workers in sorted({1, os.cpu_count() or 1}):
+            for merge_by_date in (False, True):
+                shard_timings: list = []
+                start = time.perf_counter()
+                proc.FileProcessor.read_employee_shards(shard_dir, [], dat.Employee, workers=workers,
+                                                        merge_by_date=merge_by_date, shard_timings=shard_timings)
+                name = f"shards_{workers}_workers" + ("_by_date" if merge_by_date else "")
+                results[name + "_rows_per_sec"] = row_count / (time.perf_counter() - start)
+                results[name + "_slowest_parse_ms"] = max(timing["parse_seconds"] for timing in shard_timings) * 1000
+    return results
+
+
+def time_startup(arguments: list, repeat: int) -> float:
+    """ This function times main.py from launch until it exits at the first menu, keeping the fastest run
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created function
+
+    :param arguments: command line arguments for main.py
+    :param repeat: number of runs
+    :return: seconds taken by the fastest run
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, MAIN_SCRIPT] + arguments, input=b"4\n", stdout=subprocess.DEVNULL,
+                       check=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark_startup(row_count: int, repeat: int = 3) -> dict:
+    """ This function measures the time from launching main.py to its menu, reading the file or its startup snapshot
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created function
+
+    :param row_count: number of rows in the ratings file
+    :param repeat: runs of each measurement, the fastest is kept
+    :return: dictionary of results
+    """
+    results: dict = {"rows": row_count}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_name = os.path.join(temp_dir, "EmployeeRatings.json")
+        storage.JsonBackend.write_records(file_name, make_employee_records(row_count))
+        results["help_ms"] = time_startup(["--help"], repeat) * 1000  # imports and argument parsing only
+        results["parse_ms"] = time_startup(["--file", file_name, "--no-snapshot"], repeat) * 1000
+        start = time.perf_counter()
+        proc.FileProcessor.read_employee_data_from_file(file_name, dat.EmployeeTable(), dat.Employee, snapshot=True)
+        results["write_snapshot_ms"] = (time.perf_counter() - start) * 1000  # parsing plus writing the snapshot
+        results["snapshot_ms"] = time_startup(["--file", file_name], repeat) * 1000
+        results["snapshot_bytes"] = os.path.getsize(file_name + proc.SNAPSHOT_SUFFIX)
+        results["file_bytes"] = os.path.getsize(file_name)
+    return results
+
+
+def benchmark_sorted_view(row_count: int, top: int = 100) -> dict:
+    """ This function compares a top N view picked with a heap against a full sort, and a cached order against both
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created function
+
+    :param row_count: number of rows in the EmployeeTable
+    :param top: number of rows in the top N views
+    :return: dictionary of results
+    """
+    employee_data = dat.EmployeeTable(dat.Employee.from_records(make_employee_records(row_count)))
+    results: dict = {"rows": row_count, "top": top}
+    for sort_key in ("review_date", "last_name"):
+        for name, arguments in (("top", (sort_key, True, top)), ("top_rating_5", (sort_key, True, top, 5)),
+                                ("full_sort", (sort_key, True))):
+            gc.collect()
+            tracemalloc.start()  # measured on a separate run, since tracing slows the allocations down
+            query.EmployeeOrdering(employee_data).positions(*arguments)
+            results[f"{sort_key}_{name}_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            ordering = query.EmployeeOrdering(employee_data)
+            start = time.perf_counter()
+            ordering.positions(*arguments)
+            results[f"{sort_key}_{name}_ms"] = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        ordering.positions(sort_key, True, top)  # a slice of the cached full order
+        results[f"{sort_key}_cached_top_ms"] = (time.perf_counter() - start) * 1000
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        pres.IO.write_employee_data(employee_data, positions=query.EmployeeOrdering(employee_data).positions(
+            "review_date", True, top, 5))
+        results["display_top_rating_5_ms"] = (time.perf_counter() - start) * 1000
+    return results
+
+
+def time_inputs(employee_data, index, entries: int, think_seconds: float, save_every: int = None,
+                file_name: str = None, autosaver=None) -> list:
+    """ This function enters reviews through IO.input_employee_data and times each entry, as menu choice 2 does
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created function
+
+    :param employee_data: the EmployeeTable the reviews are added to
+    :param index: an EmployeeIndex over employee_data
+    :param entries: number of reviews to enter
+    :param think_seconds: seconds between entries, as if the user was typing
+    :param save_every: number of entries between saves made by the entry itself, None for no such saves
+    :param file_name: string data with name of file the entries save to
+    :param autosaver: an AutoSaver to tell about each entry, or None
+    :return: list of the seconds taken by each entry, not counting the think time
+    """
+    latencies: list = []
+    row_count = len(employee_data)
+    for entry in range(entries):
+        first_name, last_name = make_person_name(row_count + entry)
+        answers = [first_name, last_name, "2024-12-09", "4"]
+        with patch("builtins.input", side_effect=answers):
+            start = time.perf_counter()
+            time.sleep(think_seconds)  # timed too, since waking up includes waiting for the autosave thread to yield
+            pres.IO.input_employee_data(employee_data, dat.Employee, employee_index=index)
+            if autosaver is not None:
+                autosaver.changed()
+            elif save_every and (entry + 1) % save_every == 0:
+                proc.FileProcessor.replace_file_records(file_name, map(storage.record_from_employee, employee_data))
+            latencies.append(time.perf_counter() - start - think_seconds)
+    return latencies
+
+
+def benchmark_autosave(row_count: int, entries: int = 100, think_seconds: float = 0.02, save_every: int = 25) -> dict:
+    """ This function compares the latency of entering reviews without saving, with saves made by the entries,
+    and with the AutoSaver saving the same rows from its thread
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created function
+
+    :param row_count: number of rows in the ratings file
+    :param entries: number of reviews to enter in each mode
+    :param think_seconds: seconds between entries, as if the user was typing
+    :param save_every: number of entries between the saves made by the entries
+    :return: dictionary of results
+    """
+    results: dict = {"rows": row_count, "entries": entries, "think_ms": think_seconds * 1000}
+    records = list(make_employee_records(row_count))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_name = os.path.join(temp_dir, "EmployeeRatings.jsonl")
+        for mode in ("no_save", "inline_save", "autosave"):
+            proc.FileProcessor.replace_file_records(file_name, records)
+            employee_data = dat.EmployeeTable(dat.Employee.from_records(records))
+            index = query.EmployeeIndex(employee_data)
+            autosaver = None
+            if mode == "autosave":  # saves as soon as anything changed, so every entry is saved on its own
+                autosaver = proc.AutoSaver(file_name, employee_data, interval=0)
+                autosaver.start()
+            with contextlib.redirect_stdout(io.StringIO()):
+                latencies = sorted(time_inputs(employee_data, index, entries, think_seconds,
+                                               save_every if mode == "inline_save" else None, file_name, autosaver))
+            if autosaver is not None:
+                autosaver.stop()
+                results["autosave_saves"] = autosaver.save_count
+            results[f"{mode}_p50_ms"] = latencies[len(latencies) // 2] * 1000
+            results[f"{mode}_p99_ms"] = latencies[min(len(latencies) * 99 // 100, len(latencies) - 1)] * 1000
+            results[f"{mode}_max_ms"] = latencies[-1] * 1000
+            saved_rows = sum(1 for _ in storage.JsonLinesBackend.iter_records(file_name))
+            if mode != "no_save" and saved_rows != row_count + entries:
+                raise RuntimeError(f"The {mode} run saved {saved_rows} of {row_count + entries} rows")
+    return results
+
+
+def time_call(function, repeat: int) -> float:
+    """ This function times a function, keeping the fastest of several runs to filter out noise
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created function
+
+    :param function: function without arguments to time
+    :param repeat: number of runs
+    :return: seconds taken by the fastest run
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark_suite(row_count: int, repeat: int = 3, name_count: int = None,
+                    date_spread: int = DATE_SPREAD_DAYS) -> dict:
+    """ This function times the load, save, display, and Employee construction paths of the application
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created function
+
+    :param row_count: number of rows
+    :param repeat: number of runs of each path, the fastest is kept
+    :param name_count: number of distinct people, or None for the default name mix
+    :param date_spread: number of distinct days the review dates are spread over
+    :return: dictionary of results
+    """
+    records = list(make_employee_records(row_count, name_count=name_count, date_spread=date_spread))
+    employees = dat.Employee.from_records(records)
+    results: dict = {"rows": row_count, "name_count": name_count, "date_spread": date_spread}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_name = os.path.join(temp_dir, "EmployeeRatings.json")
+        seconds = time_call(lambda: proc.FileProcessor.write_employee_data_to_file(file_name, employees), repeat)
+        results["save_rows_per_sec"] = row_count / seconds
+        seconds = time_call(lambda: proc.FileProcessor.read_employee_data_from_file(
+            file_name, dat.EmployeeTable(), dat.Employee), repeat)
+        results["load_rows_per_sec"] = row_count / seconds
+    for name, display in (("display", pres.IO.output_employee_data), ("buffered_display", pres.IO.write_employee_data)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            seconds = time_call(lambda: display(employees), repeat)
+        results[name + "_rows_per_sec"] = row_count / seconds
+    for name, build in (("construct_setters", build_employees_with_setters),
+                        ("construct_from_records", dat.Employee.from_records)):
+        results[name + "_rows_per_sec"] = row_count / time_call(lambda: build(records), repeat)
+    return results
+
+
+def get_environment() -> dict:
+    """ This function describes the machine the benchmarks ran on, since results only compare on the same one
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created function
+
+    :return: dictionary of the python version, implementation, platform, and number of CPUs
+    """
+    return {"python": platform.python_version(), "implementation": platform.python_implementation(),
+            "platform": platform.platform(), "cpus": os.cpu_count()}
+
+
+def find_regressions(runs: list, baseline: dict, tolerance: float = REGRESSION_TOLERANCE) -> list:
+    """ This function compares benchmark runs with the matching runs of a baseline
+
+    Runs match on their benchmark name and parameters. Metrics ending in _per_sec are better
+    when higher, and metrics ending in _seconds or _ms are better when lower.
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created function
+
+    :param runs: list of result dictionaries, each with a benchmark key
+    :param baseline: benchmark results saved earlier, with a runs key
+    :param tolerance: fraction a metric may be worse than the baseline before it counts as a regression
+    :return: list of dictionaries with the benchmark, rows, metric, baseline, current, and change keys
+    """
+    def run_key(run: dict) -> tuple:
+        return tuple(sorted((key, value) for key, value in run.items()
+                            if not isinstance(value, float) and not isinstance(value, dict)))
+
+    baseline_runs = {run_key(run): run for run in baseline.get("runs", [])}
+    regressions: list = []
+    for run in runs:
+        baseline_run = baseline_runs.get(run_key(run))
+        if baseline_run is None:
+            continue
+        for metric, value in run.items():
+            old_value = baseline_run.get(metric)
+            if not isinstance(value, float) or not isinstance(old_value, float) or old_value <= 0:
+                continue
+            if metric.endswith("_per_sec"):
+                change = value / old_value - 1
+            elif metric.endswith(("_seconds", "_ms")):
+                change = old_value / value - 1 if value > 0 else 0.0
+            else:
+                continue
+            if change < -tolerance:
+                regressions.append({"benchmark": run["benchmark"], "rows": run.get("rows"), "metric": metric,
+                                    "baseline": old_value, "current": value, "change": change})
+    return regressions
+
+
+BENCHMARKS: dict = {"table_memory": benchmark_table_memory,
+                    "employee_construction": benchmark_employee_construction,
+                    "storage": benchmark_storage,
+                    "parallel_load": benchmark_parallel_load,
+                    "review_dates": benchmark_review_dates,
+                    "name_interning": benchmark_name_interning,
+                    "service": benchmark_service,
+                    "lazy_load": benchmark_lazy_load,
+                    "compression": benchmark_compression,
+                    "shard_load": benchmark_shard_load,
+                    "startup": benchmark_startup,
+                    "sorted_view": benchmark_sorted_view,
+                    "autosave": benchmark_autosave,
+                    "suite": benchmark_suite}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run the employee ratings benchmarks and print the results as JSON.",
+        epilog=f"Record a baseline with: python benchmarks.py suite --save-baseline {BASELINE_FILE_NAME}, "
+               f"then check later runs with: python benchmarks.py suite --baseline {BASELINE_FILE_NAME}")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--rows", type=int, nargs="+", help=f"row counts (default: {list(SUITE_ROWS)})")
+    parser.add_argument("--names", type=int, help="number of distinct people in the suite data")
+    parser.add_argument("--date-spread", type=int, default=DATE_SPREAD_DAYS,
+                        help="number of distinct review days in the suite data")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each suite path, the fastest is kept")
+    parser.add_argument("--output", help="file to write the JSON results to (default: standard output)")
+    parser.add_argument("--baseline", help="JSON results to compare with; exits with 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE,
+                        help="fraction a metric may be worse than the baseline")
+    parser.add_argument("--save-baseline", help="file to save these results to as the new baseline")
+    arguments = parser.parse_args()
+
+    run_benchmark = BENCHMARKS[arguments.benchmark]
+    if arguments.benchmark == "suite":
+        run_benchmark = functools.partial(benchmark_suite, repeat=arguments.repeat, name_count=arguments.names,
+                                          date_spread=arguments.date_spread)
+    runs = [dict(run_benchmark(rows), benchmark=arguments.benchmark) for rows in arguments.rows or SUITE_ROWS]
+    report = {"environment": get_environment(), "runs": runs}
+    if arguments.baseline:
+        with open(arguments.baseline, "r") as file:
+            report["regressions"] = find_regressions(runs, json.load(file), arguments.tolerance)
+    text = json.dumps(report, indent=2)
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    if arguments.save_baseline:
+        with open(arguments.save_baseline, "w") as file:
+            file.write(json.dumps({"environment": report["environment"], "runs": runs}, indent=2) + "\n")
+    if report.get("regressions"):
+        for regression in report["regressions"]:
+            print(f"Regression in {regression['benchmark']} at {regression['rows']} rows: {regression['metric']} "
+                  f"{regression['change']:+.0%}", file=sys.stderr)
+        sys.exit(1)
@@ -3,9 +3,22 @@
 # Description: The module of data classes
 # ChangeLog: (Who, When, What)
 # AdamSavage,20241208,Created module
+# AdamSavage,20261018,Added the columnar EmployeeTable
+# AdamSavage,20261018,Added __slots__ and the Employee.from_records bulk constructor
+# AdamSavage,20261018,Added the EmployeeTable generation counter
+# AdamSavage,20261018,Added the rating analytics menu choice
+# AdamSavage,20261018,Employee keeps review dates as date ordinals behind cached conversions
+# AdamSavage,20261018,Person stores names in title case as interned strings
+# AdamSavage,20261018,Added Employee.find_record_errors for tolerant loads
+# AdamSavage,20261018,Added change tracking so saves only write the changed rows
+# AdamSavage,20261018,Added EmployeeTable.extend_columns for loading startup snapshots
+# AdamSavage,20261018,Added EmployeeTable.copy and mark_copy_saved for saves made from a copy of the table
 # ------------------------------------------------------------------------------------------------- #
 
+import sys
+from array import array
 from datetime import date
+from functools import lru_cache
 
 MENU: str = '''
 ---- Employee Ratings ------------------------------
@@ -14,10 +27,64 @@ MENU: str = '''
     2. Enter new employee rating data.
     3. Save data to a file.
     4. Exit the program.
+    5. Show rating analytics.
 --------------------------------------------------
 '''
 
-employees: list = []  # a table of employees data
+REVIEW_DATE_CACHE_SIZE: int = 65_536  # distinct review dates remembered, far more than a company has review cycles
+NAME_CACHE_SIZE: int = 65_536  # distinct names remembered by normalize_name
+
+
+@lru_cache(maxsize=REVIEW_DATE_CACHE_SIZE)
+def parse_review_date(value: str) -> int:
+    """
+    Validates a YYYY-MM-DD review date and converts it to a date ordinal.
+
+    Review dates repeat heavily, so the results are cached and a date is only parsed the first time it is seen.
+
+    Args:
+        value (str): The review date, in the format YYYY-MM-DD.
+
+    Returns:
+        int: The review date as a date ordinal.
+
+    Raises:
+        ValueError: If the date format is incorrect (not in YYYY-MM-DD format).
+    """
+    try:
+        return date.fromisoformat(value).toordinal()
+    except ValueError:
+        raise ValueError("Incorrect data format, should be YYYY-MM-DD")
+
+
+@lru_cache(maxsize=REVIEW_DATE_CACHE_SIZE)
+def format_review_date(ordinal: int) -> str:
+    """
+    Converts a date ordinal back to a YYYY-MM-DD review date, caching the strings it builds.
+
+    Args:
+        ordinal (int): The review date as a date ordinal.
+
+    Returns:
+        str: The review date, formatted as YYYY-MM-DD.
+    """
+    return date.fromordinal(ordinal).isoformat()
+
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
+def normalize_name(value: str) -> str:
+    """
+    Converts a name to title case and interns it, so every copy of a name shares one string object.
+
+    The results are cached, since the same few names are set over and over.
+
+    Args:
+        value (str): The name to normalize.
+
+    Returns:
+        str: The interned title case name.
+    """
+    return sys.intern(value.title())
 
 
 class Person:
@@ -27,11 +94,17 @@ class Person:
     Properties:
     - first_name (str): The person's first name.
     - last_name (str): The person's last name.
+    - changed (bool): True when a setter changed the person since it was loaded or saved.
 
     ChangeLog:
     - RRoot, 1.1.2030: Created the class.
+    - AdamSavage, 20261018: Added __slots__.
+    - AdamSavage, 20261018: Stored names in title case as interned strings.
+    - AdamSavage, 20261018: Added the changed flag.
     """
 
+    __slots__ = ("__first_name", "__last_name", "changed")
+
     def __init__(self, first_name: str = "", last_name: str = ""):
         """
         Initializes a new Person instance with optional first and last names.
@@ -51,7 +124,7 @@ class Person:
         Returns:
             str: The person's first name with the first letter capitalized.
         """
-        return self.__first_name.title()
+        return self.__first_name
 
     @first_name.setter
     def first_name(self, value: str):
@@ -65,7 +138,8 @@ class Person:
             ValueError: If the first name contains any numeric characters.
         """
         if value.isalpha() or value == "":
-            self.__first_name = value
+            self.__first_name = normalize_name(value)
+            self.changed = True
         else:
             raise ValueError("The first name should not contain numbers.")
 
@@ -77,7 +151,7 @@ class Person:
         Returns:
             str: The person's last name with the first letter capitalized.
         """
-        return self.__last_name.title()
+        return self.__last_name
 
     @last_name.setter
     def last_name(self, value: str):
@@ -91,7 +165,8 @@ class Person:
             ValueError: If the last name contains any numeric characters.
         """
         if value.isalpha() or value == "":
-            self.__last_name = value
+            self.__last_name = normalize_name(value)
+            self.changed = True
         else:
             raise ValueError("The last name should not contain numbers.")
 
@@ -113,12 +188,19 @@ class Employee(Person):
     - first_name (str): The employee's first name.
     - last_name (str): The employee's last name.
     - review_date (date): The data of the employee review.
+    - review_ordinal (int): The date of the employee review as a date ordinal, for fast sorting and comparing.
     - review_rating (int): The review rating of the employee's performance (1-5)
 
     ChangeLog:
     - RRoot, 1.1.2030: Created the class.
+    - AdamSavage, 20261018: Added __slots__ and from_records.
+    - AdamSavage, 20261018: Stored the review date as a date ordinal.
+    - AdamSavage, 20261018: Added find_record_errors.
+    - AdamSavage, 20261018: The review setters set the changed flag.
     """
 
+    __slots__ = ("__review_date", "__review_rating")
+
     def __init__(self, first_name: str = "", last_name: str = "", review_date: str = "1900-01-01",
                  review_rating: int = 3):
         """
@@ -134,6 +216,97 @@ class Employee(Person):
         self.review_date = review_date
         self.review_rating = review_rating
 
+    @classmethod
+    def from_records(cls, records) -> list:
+        """
+        Builds employees from dictionary rows, validating each column once for the whole batch.
+
+        Each distinct name and date is only checked once, and the instances are filled in directly
+        instead of going through the property setters. The new employees start unchanged.
+
+        Args:
+            records (iterable): Dictionary rows with FirstName, LastName, ReviewDate, and ReviewRating keys.
+
+        Returns:
+            list: The new Employee objects in row order.
+
+        Raises:
+            ValueError: If any value in the batch does not pass the Employee validation.
+        """
+        records = records if isinstance(records, list) else list(records)
+        first_names = [record["FirstName"] for record in records]
+        last_names = [record["LastName"] for record in records]
+        review_dates = [record["ReviewDate"] for record in records]
+        review_ratings = [record["ReviewRating"] for record in records]
+
+        names: dict = {}
+        for value in set(first_names):
+            if not (value.isalpha() or value == ""):
+                raise ValueError("The first name should not contain numbers.")
+            names[value] = normalize_name(value)
+        for value in set(last_names):
+            if not (value.isalpha() or value == ""):
+                raise ValueError("The last name should not contain numbers.")
+            names[value] = normalize_name(value)
+        review_ordinals: dict = {}
+        for value in set(review_dates):
+            try:
+                review_ordinals[value] = parse_review_date(value)
+            except TypeError:
+                raise ValueError("Incorrect data format, should be YYYY-MM-DD")
+        for value in review_ratings:
+            if value not in (1, 2, 3, 4, 5):
+                raise ValueError("Please choose only values 1 through 5")
+
+        employee_list: list = []
+        new_employee = cls.__new__
+        for first_name, last_name, review_date, review_rating in zip(first_names, last_names,
+                                                                     review_dates, review_ratings):
+            employee = new_employee(cls)
+            employee._Person__first_name = names[first_name]
+            employee._Person__last_name = names[last_name]
+            employee._Employee__review_date = review_ordinals[review_date]
+            employee._Employee__review_rating = review_rating
+            employee.changed = False
+            employee_list.append(employee)
+        return employee_list
+
+    @staticmethod
+    def find_record_errors(record) -> list:
+        """
+        Checks every field of one dictionary row with the same rules as from_records.
+
+        from_records stops at the first bad value of a batch, so this is used to tell which rows
+        and fields of a rejected batch are at fault.
+
+        Args:
+            record (dict): A dictionary row with FirstName, LastName, ReviewDate, and ReviewRating keys.
+
+        Returns:
+            list: A (field, reason) tuple for each invalid field, empty when the row is valid.
+        """
+        if not isinstance(record, dict):
+            return [("", f"The row should be an object, not {type(record).__name__}")]
+        errors: list = []
+        for field, reason in (("FirstName", "The first name should not contain numbers."),
+                              ("LastName", "The last name should not contain numbers.")):
+            if field not in record:
+                errors.append((field, "The field is missing"))
+            elif not isinstance(record[field], str) or not (record[field].isalpha() or record[field] == ""):
+                errors.append((field, reason))
+        if "ReviewDate" not in record:
+            errors.append(("ReviewDate", "The field is missing"))
+        else:
+            try:
+                parse_review_date(record["ReviewDate"])
+            except (ValueError, TypeError):
+                errors.append(("ReviewDate", "Incorrect data format, should be YYYY-MM-DD"))
+        if "ReviewRating" not in record:
+            errors.append(("ReviewRating", "The field is missing"))
+        elif record["ReviewRating"] not in (1, 2, 3, 4, 5):
+            errors.append(("ReviewRating", "Please choose only values 1 through 5"))
+        return errors
+
     @property
     def review_date(self):
         """
@@ -142,7 +315,7 @@ class Employee(Person):
         Returns:
             str: The date of the employee's review, formatted as YYYY-MM-DD.
         """
-        return self.__review_date
+        return format_review_date(self.__review_date)
 
     @review_date.setter
     def review_date(self, value: str):
@@ -155,11 +328,18 @@ class Employee(Person):
         Raises:
             ValueError: If the date format is incorrect (not in YYYY-MM-DD format).
         """
-        try:
-            date.fromisoformat(value)
-            self.__review_date = value
-        except ValueError:
-            raise ValueError("Incorrect data format, should be YYYY-MM-DD")
+        self.__review_date = parse_review_date(value)
+        self.changed = True
+
+    @property
+    def review_ordinal(self):
+        """
+        Gets the review date of the employee as a date ordinal.
+
+        Returns:
+            int: The date of the employee's review as a date ordinal.
+        """
+        return self.__review_date
 
     @property
     def review_rating(self):
@@ -184,6 +364,7 @@ class Employee(Person):
         """
         if value in (1, 2, 3, 4, 5):
             self.__review_rating = value
+            self.changed = True
         else:
             raise ValueError("Please choose only values 1 through 5")
 
@@ -195,3 +376,416 @@ class Employee(Person):
             str: A string containing the employee's first name, last name, review date, and review rating.
         """
         return f"{self.first_name},{self.last_name},{self.review_date},{self.__review_rating}"
+
+
+class EmployeeRow:
+    """
+    A view of one row of an EmployeeTable that behaves like an Employee.
+
+    Reading a property reads the table's columns and setting a property validates the value
+    the same way Employee does and writes it back into the table.
+
+    Properties:
+    - first_name (str): The employee's first name.
+    - last_name (str): The employee's last name.
+    - review_date (str): The date of the employee review, formatted as YYYY-MM-DD.
+    - review_ordinal (int): The date of the employee review as a date ordinal.
+    - review_rating (int): The review rating of the employee's performance (1-5)
+
+    ChangeLog:
+    - AdamSavage, 20261018: Created the class.
+    - AdamSavage, 20261018: Added review_ordinal.
+    - AdamSavage, 20261018: Added changed.
+    """
+
+    __slots__ = ("__table", "__index")
+
+    def __init__(self, table: "EmployeeTable", index: int):
+        """
+        Initializes a view of the row at the given position of the table.
+
+        Args:
+            table (EmployeeTable): The table holding the row.
+            index (int): The position of the row in the table.
+        """
+        self.__table = table
+        self.__index = index
+
+    @property
+    def first_name(self):
+        """
+        Gets the first name of the employee, capitalized.
+
+        Returns:
+            str: The employee's first name.
+        """
+        return self.__table.get_value("first_name", self.__index)
+
+    @first_name.setter
+    def first_name(self, value: str):
+        """
+        Sets the first name of the employee after validating that it does not contain numbers.
+
+        Args:
+            value (str): The first name to set.
+
+        Raises:
+            ValueError: If the first name contains any numeric characters.
+        """
+        self.__table.set_value("first_name", self.__index, value)
+
+    @property
+    def last_name(self):
+        """
+        Gets the last name of the employee, capitalized.
+
+        Returns:
+            str: The employee's last name.
+        """
+        return self.__table.get_value("last_name", self.__index)
+
+    @last_name.setter
+    def last_name(self, value: str):
+        """
+        Sets the last name of the employee after validating that it does not contain numbers.
+
+        Args:
+            value (str): The last name to set.
+
+        Raises:
+            ValueError: If the last name contains any numeric characters.
+        """
+        self.__table.set_value("last_name", self.__index, value)
+
+    @property
+    def review_date(self):
+        """
+        Gets the review date of the employee.
+
+        Returns:
+            str: The date of the employee's review, formatted as YYYY-MM-DD.
+        """
+        return self.__table.get_value("review_date", self.__index)
+
+    @property
+    def review_ordinal(self):
+        """
+        Gets the review date of the employee as a date ordinal.
+
+        Returns:
+            int: The date of the employee's review as a date ordinal.
+        """
+        return self.__table.review_dates[self.__index]
+
+    @property
+    def changed(self):
+        """
+        Gets whether the row was changed since the table was loaded or saved.
+
+        Returns:
+            bool: True if a field of the row was set.
+        """
+        return self.__index in self.__table.changed_rows
+
+    @review_date.setter
+    def review_date(self, value: str):
+        """
+        Sets the review date of the employee after validating the date format.
+
+        Args:
+            value (str): The review date to set, in the format YYYY-MM-DD.
+
+        Raises:
+            ValueError: If the date format is incorrect (not in YYYY-MM-DD format).
+        """
+        self.__table.set_value("review_date", self.__index, value)
+
+    @property
+    def review_rating(self):
+        """
+        Gets the review rating of the employee.
+
+        Returns:
+            int: The employee's review rating (an integer between 1 and 5).
+        """
+        return self.__table.get_value("review_rating", self.__index)
+
+    @review_rating.setter
+    def review_rating(self, value: int):
+        """
+        Sets the review rating of the employee after validating it is between 1 and 5.
+
+        Args:
+            value (int): The review rating to set, must be between 1 and 5.
+
+        Raises:
+            ValueError: If the review rating is not between 1 and 5.
+        """
+        self.__table.set_value("review_rating", self.__index, value)
+
+    def __str__(self):
+        """
+        Returns a string representation of the employee.
+
+        Returns:
+            str: A string containing the employee's first name, last name, review date, and review rating.
+        """
+        return f"{self.first_name},{self.last_name},{self.review_date},{self.review_rating}"
+
+
+class EmployeeTable:
+    """
+    A table of employee data stored as compact columns instead of a list of Employee objects.
+
+    Names are kept as interned strings so repeated names share one object, review dates are kept
+    as date ordinals in an int array, and review ratings in a byte array. Iterating the table or
+    indexing it hands out EmployeeRow views, so code written for a list of Employee objects keeps working.
+
+    Properties:
+    - first_names (list): The column of first names.
+    - last_names (list): The column of last names.
+    - review_dates (array): The column of review dates as date ordinals.
+    - review_ratings (array): The column of review ratings.
+    - generation (int): A counter that goes up whenever the table changes, so cached results can tell they are stale.
+    - saved_generation (int): The generation of the table when it was last loaded or saved.
+    - changed_rows (set): The positions of the rows changed by set_value since the last save.
+
+    ChangeLog:
+    - AdamSavage, 20261018: Created the class.
+    - AdamSavage, 20261018: Added the generation counter.
+    - AdamSavage, 20261018: Added change tracking with saved_generation and changed_rows.
+    - AdamSavage, 20261018: Added extend_columns.
+    - AdamSavage, 20261018: Added copy and mark_copy_saved.
+    - AdamSavage, 20261018: append_values checks every value before any column grows.
+    """
+
+    def __init__(self, employee_data=()):
+        """
+        Initializes a new EmployeeTable, optionally filled from Employee-like objects.
+
+        Args:
+            employee_data (iterable): Employee-like objects to copy into the table (default is empty).
+        """
+        self.first_names: list = []
+        self.last_names: list = []
+        self.review_dates: array = array("i")
+        self.review_ratings: array = array("b")
+        self.generation: int = 0
+        self.saved_generation: int = 0
+        self.changed_rows: set = set()
+        self.extend(employee_data)
+
+    def __len__(self):
+        """
+        Returns the number of rows in the table.
+
+        Returns:
+            int: The number of rows.
+        """
+        return len(self.review_ratings)
+
+    def __iter__(self):
+        """
+        Iterates over the rows of the table.
+
+        Returns:
+            iterator: EmployeeRow views in row order.
+        """
+        for index in range(len(self.review_ratings)):
+            yield EmployeeRow(self, index)
+
+    def __getitem__(self, index: int):
+        """
+        Gets a view of the row at the given position.
+
+        Args:
+            index (int): The position of the row, negative values count from the end.
+
+        Returns:
+            EmployeeRow: A view of the row.
+
+        Raises:
+            IndexError: If the position is out of range.
+        """
+        row_count = len(self.review_ratings)
+        if index < 0:
+            index += row_count
+        if not 0 <= index < row_count:
+            raise IndexError("EmployeeTable index out of range")
+        return EmployeeRow(self, index)
+
+    def append(self, employee):
+        """
+        Adds a row to the table copied from an Employee-like object.
+
+        Args:
+            employee (Employee): The already validated employee data to add.
+        """
+        self.append_values(employee.first_name, employee.last_name, employee.review_ordinal, employee.review_rating)
+
+    def append_values(self, first_name: str, last_name: str, review_ordinal: int, review_rating: int):
+        """
+        Adds a row to the table from already validated column values.
+
+        Args:
+            first_name (str): The employee's first name.
+            last_name (str): The employee's last name.
+            review_ordinal (int): The review date as a date ordinal.
+            review_rating (int): The review rating (1-5), or a float with such a value.
+
+        Raises:
+            ValueError: If the review rating is not between 1 and 5, before any column has grown.
+        """
+        first_name, last_name = normalize_name(first_name), normalize_name(last_name)
+        rating = int(review_rating)  # a float rating such as 3.0 passes the Employee validation
+        if rating != review_rating or not 1 <= rating <= 5:
+            raise ValueError("Please choose only values 1 through 5")
+        review_ordinal = int(review_ordinal)
+        self.first_names.append(first_name)
+        self.last_names.append(last_name)
+        self.review_dates.append(review_ordinal)
+        self.review_ratings.append(rating)
+        self.generation += 1
+
+    def extend(self, employee_data):
+        """
+        Adds rows to the table copied from Employee-like objects.
+
+        Args:
+            employee_data (iterable): The already validated employee data to add.
+        """
+        for employee in employee_data:
+            self.append(employee)
+
+    def extend_columns(self, first_names: list, last_names: list, review_dates: array, review_ratings: array):
+        """
+        Adds rows to the table from whole columns of already validated values, such as a startup snapshot.
+
+        Args:
+            first_names (list): The first names, already in title case.
+            last_names (list): The last names, already in title case.
+            review_dates (array): The review dates as date ordinals.
+            review_ratings (array): The review ratings (1-5).
+
+        Raises:
+            ValueError: If the columns are not all the same length.
+        """
+        if not len(first_names) == len(last_names) == len(review_dates) == len(review_ratings):
+            raise ValueError("The columns should all be the same length.")
+        self.first_names.extend(first_names)
+        self.last_names.extend(last_names)
+        self.review_dates.extend(review_dates)
+        self.review_ratings.extend(review_ratings)
+        self.generation += 1
+
+    def clear(self):
+        """
+        Removes all rows from the table.
+        """
+        self.first_names.clear()
+        self.last_names.clear()
+        del self.review_dates[:]
+        del self.review_ratings[:]
+        self.changed_rows.clear()
+        self.generation += 1
+
+    def is_dirty(self):
+        """
+        Checks whether the table changed since it was last loaded or saved.
+
+        Returns:
+            bool: True if rows were added, changed, or cleared since mark_saved.
+        """
+        return self.generation != self.saved_generation
+
+    def mark_saved(self):
+        """
+        Records that the table as it is now matches the saved file.
+        """
+        self.saved_generation = self.generation
+        self.changed_rows.clear()
+
+    def copy(self):
+        """
+        Copies the rows of the table without a lock, so a copy can be saved while the table keeps changing.
+
+        The generation and the row count are read before the columns are copied up to that row count.
+        Every change counted by that generation is finished, so it is in the copy, and a change made
+        while copying leaves the table dirty after mark_copy_saved.
+
+        Returns:
+            EmployeeTable: A copy with the changed rows of the table and its generation when the copy started.
+        """
+        generation = self.generation
+        row_count = len(self.review_ratings)  # an append fills the ratings column last
+        changed_rows = {index for index in set(self.changed_rows) if index < row_count}
+        table_copy = EmployeeTable()
+        table_copy.extend_columns(self.first_names[:row_count], self.last_names[:row_count],
+                                  self.review_dates[:row_count], self.review_ratings[:row_count])
+        table_copy.generation = generation
+        table_copy.changed_rows = changed_rows
+        return table_copy
+
+    def mark_copy_saved(self, table_copy, saved_rows: set):
+        """
+        Records that a copy made by copy was saved, keeping the rows changed since as changed.
+
+        Args:
+            table_copy (EmployeeTable): The saved copy.
+            saved_rows (set): The changed rows of the copy when it was saved.
+        """
+        self.saved_generation = table_copy.generation
+        columns = ((self.first_names, table_copy.first_names), (self.last_names, table_copy.last_names),
+                   (self.review_dates, table_copy.review_dates), (self.review_ratings, table_copy.review_ratings))
+        for index in saved_rows:
+            # Discarded before comparing, so a change made meanwhile is either seen here or adds the row again.
+            self.changed_rows.discard(index)
+            if index >= len(self.review_ratings) or any(column[index] != saved[index] for column, saved in columns):
+                self.changed_rows.add(index)
+
+    def get_value(self, field: str, index: int):
+        """
+        Gets one field of one row.
+
+        Args:
+            field (str): The Employee property name of the field.
+            index (int): The position of the row.
+
+        Returns:
+            object: The field value, in the same form the Employee property returns it.
+        """
+        if field == "first_name":
+            return self.first_names[index]
+        if field == "last_name":
+            return self.last_names[index]
+        if field == "review_date":
+            return format_review_date(self.review_dates[index])
+        return self.review_ratings[index]
+
+    def set_value(self, field: str, index: int, value):
+        """
+        Validates a value the same way Employee does and stores it in one field of one row.
+
+        Args:
+            field (str): The Employee property name of the field.
+            index (int): The position of the row.
+            value (object): The value to set.
+
+        Raises:
+            ValueError: If the value does not pass the Employee validation.
+        """
+        employee = Employee()
+        setattr(employee, field, value)  # reuse the Employee validation rules
+        if field == "first_name":
+            self.first_names[index] = employee.first_name
+        elif field == "last_name":
+            self.last_names[index] = employee.last_name
+        elif field == "review_date":
+            self.review_dates[index] = employee.review_ordinal
+        else:
+            self.review_ratings[index] = int(employee.review_rating)  # a rating of 3.0 is stored as 3
+        self.changed_rows.add(index)
+        self.generation += 1
+
+
+employees: EmployeeTable = EmployeeTable()  # a table of employees data
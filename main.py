@@ -1,54 +1,297 @@
-# ------------------------------------------------------------------------------------------------- #
-# Title: main.py
-# Description: The application to collect and save employee data
-# ChangeLog: (Who, When, What)
-# RRoot,1.5.2030,Created Script
-# AdamSavage,20241207,Modified script to work with modules
-# ------------------------------------------------------------------------------------------------- #
-
-import data_classes as dat
-import processing_classes as proc
-import presentation_classes as pres
-
-
-FILE_NAME: str = "EmployeeRatings.json"
-menu_choice = ''
-
-
-# Beginning of the main body of this script
-employees = proc.FileProcessor.read_employee_data_from_file(file_name=FILE_NAME,
-                                                            employee_data=dat.employees,
-                                                            employee_type=dat.Employee)  # Note this is the class name (ignore the warning)
-
-# Repeat the follow tasks
-while True:
-    pres.IO.output_menu(menu=dat.MENU)
-
-    menu_choice = pres.IO.input_menu_choice()
-
-    if menu_choice == "1":  # Display current data
-        try:
-            pres.IO.output_employee_data(employee_data=employees)
-        except Exception as e:
-            pres.IO.output_error_messages(e)
-        continue
-
-    elif menu_choice == "2":  # Get new data (and display the change)
-        try:
-            employees = pres.IO.input_employee_data(employee_data=employees,
-                                               employee_type=dat.Employee)  # Note this is the class name (ignore the warning)
-            pres.IO.output_employee_data(employee_data=employees)
-        except Exception as e:
-            pres.IO.output_error_messages(e)
-        continue
-
-    elif menu_choice == "3":  # Save data in a file
-        try:
-            proc.FileProcessor.write_employee_data_to_file(file_name=FILE_NAME, employee_data=employees)
-            print(f"Data was saved to the {FILE_NAME} file.")
-        except Exception as e:
-            pres.IO.output_error_messages(e)
-        continue
-
-    elif menu_choice == "4":  # End the program
-        break  # out of the while loop
+# ------------------------------------------------------------------------------------------------- #
+# Title: main.py
+# Description: The application to collect and save employee data
+# ChangeLog: (Who, When, What)
+# RRoot,1.5.2030,Created Script
+# AdamSavage,20241207,Modified script to work with modules
+# AdamSavage,20261018,Save new rows to the file's journal instead of rewriting the file
+# AdamSavage,20261018,Added --file and --format to pick the storage backend
+# AdamSavage,20261018,Added --offset and --limit to page the displayed data
+# AdamSavage,20261018,Added the import, export, stats, and validate batch commands
+# AdamSavage,20261018,Added --workers to load json lines files with several processes
+# AdamSavage,20261018,Added the rating analytics menu choice and batch command
+# AdamSavage,20261018,Input upserts by review key and added the dedup batch command and import --upsert
+# AdamSavage,20261018,Added the serve command that runs the asyncio ratings service
+# AdamSavage,20261018,Added --lazy to show the menu without reading the file's rows
+# AdamSavage,20261018,Added --metrics and --profile
+# AdamSavage,20261018,Added --tolerant and --error-report to load past invalid rows
+# AdamSavage,20261018,Added --shards to load a directory or glob of rating files and the merge command
+# AdamSavage,20261018,Save writes only the changed rows and skips saves with nothing to write
+# AdamSavage,20261018,Start from the startup snapshot and import the batch commands only when one is run
+# AdamSavage,20261018,Added --sort, --descending, --top, and --rating to show sorted and top N views
+# AdamSavage,20261018,Added --autosave, --autosave-rows, and --no-fsync to save from a background thread
+# AdamSavage,20261018,Write the startup snapshot after a save only when the whole file was loaded
+# AdamSavage,20261018,The rows --lazy saves are read from the file afterwards instead of being kept as added rows
+# AdamSavage,20261018,Import the analytics, metrics, query, and storage classes only where they are used
+# ------------------------------------------------------------------------------------------------- #
+
+import argparse
+import atexit
+import contextlib
+import sys
+import data_classes as dat
+import processing_classes as proc
+import presentation_classes as pres
+
+
+FILE_NAME: str = "EmployeeRatings.json"
+menu_choice = ''
+
+
+def check_choice(option: str, value, choices):
+    """ This function stops the script with a usage error when an option's value is not one of its choices
+
+    The choices come from modules that are imported only when the option is used, so argparse
+    cannot check them itself.
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created function
+
+    :param option: the option as typed, such as "--sort"
+    :param value: the value given, or None when the option was not given
+    :param choices: the values the option accepts
+    :return: None
+    """
+    if value is not None and value not in choices:
+        parser.error(f"argument {option}: invalid choice: {value!r} (choose from {', '.join(map(repr, choices))})")
+
+
+parser = argparse.ArgumentParser(description="Collect and save employee rating data.")
+parser.add_argument("--file", default=FILE_NAME, help="the ratings file to load and save")
+parser.add_argument("--format",
+                    help="the storage format of the file (default: picked by the file extension, "
+                         "before any .gz, .bz2, or .xz extension)")
+parser.add_argument("--workers", type=int,
+                    help="load a json lines file with this many processes (default: one process)")
+parser.add_argument("--lazy", action="store_true",
+                    help="read rows only when they are shown, and save new rows without checking for duplicates")
+parser.add_argument("--shards", help="load every rating file in this directory or glob pattern instead of --file, "
+                                     "and save the combined rows to --file")
+parser.add_argument("--merge-by-date", action="store_true", help="with --shards, order the rows by review date")
+parser.add_argument("--tolerant", action="store_true",
+                    help="skip invalid rows instead of stopping at the first one, and list them after loading "
+                         "(skipped rows are dropped if the file is later rewritten)")
+parser.add_argument("--error-report", help="load like --tolerant and also write the skipped rows to this JSON file")
+parser.add_argument("--no-snapshot", action="store_true",
+                    help="always read the file at startup instead of its snapshot, and do not write a snapshot")
+parser.add_argument("--autosave", type=float, metavar="SECONDS",
+                    help="save changes from a background thread this many seconds after the first unsaved one, "
+                         "and when the program ends")
+parser.add_argument("--autosave-rows", type=int, default=proc.AUTOSAVE_ROWS,
+                    help=f"with --autosave, save as soon as this many rows changed (default: {proc.AUTOSAVE_ROWS})")
+parser.add_argument("--no-fsync", action="store_true",
+                    help="with --autosave, do not wait for each save to reach the disk before it replaces the file")
+parser.add_argument("--metrics", help="write load, save, and display timers and counters to this file at exit "
+                                      "(Prometheus text for .prom or .txt, JSON otherwise)")
+parser.add_argument("--profile", help="profile the whole run with cProfile or tracemalloc")
+parser.add_argument("--profile-output", default="employee_ratings.profile", help="file for the --profile capture")
+parser.add_argument("--offset", type=int, default=0, help="number of rows to skip when showing data")
+parser.add_argument("--limit", type=int, help="largest number of rows to show at a time (default: all)")
+parser.add_argument("--sort",
+                    help="show the rows sorted by this field, names by last then first name (default: file order)")
+parser.add_argument("--descending", action="store_true",
+                    help="with --sort, show the largest values first, such as the most recent reviews")
+parser.add_argument("--top", type=int, help="show only the first rows of the order, picked without a full sort")
+parser.add_argument("--rating", type=int, choices=(1, 2, 3, 4, 5), help="show only the rows with this rating")
+commands = parser.add_subparsers(dest="command", title="batch commands",
+                                 description="run one command on the ratings file without the menu")
+import_parser = commands.add_parser("import", help="append the valid rows of files or standard input ('-')")
+import_parser.add_argument("sources", nargs="+")
+import_parser.add_argument("--input-format", help="format of the sources")
+import_parser.add_argument("--upsert", action="store_true",
+                           help="update reviews that are already in the file instead of adding duplicates")
+export_parser = commands.add_parser("export", help="write the valid rows to a file or standard output ('-')")
+export_parser.add_argument("--output", default="-")
+export_parser.add_argument("--output-format", help="format of the output")
+commands.add_parser("stats", help="show summary statistics of the valid rows")
+analytics_parser = commands.add_parser("analytics", help="show the rating histogram and per period summaries")
+analytics_parser.add_argument("--period", default="quarter", help="month or quarter")
+merge_parser = commands.add_parser("merge", help="replace the file with the valid rows of a directory or glob "
+                                                   "of rating files, in review date order")
+merge_parser.add_argument("path")
+merge_parser.add_argument("--input-format", help="format of the rating files")
+merge_parser.add_argument("--memory-rows", type=int, default=proc.DEDUP_MEMORY_ROWS,
+                          help="rows to sort in memory before spilling to disk")
+dedup_parser = commands.add_parser("dedup", help="rewrite the file keeping only the last row of each review")
+dedup_parser.add_argument("--memory-rows", type=int, default=proc.DEDUP_MEMORY_ROWS,
+                          help="rows to sort in memory before spilling to disk")
+serve_parser = commands.add_parser("serve", help="keep the data in memory and serve clients over a local socket")
+serve_parser.add_argument("--host", default="127.0.0.1")
+serve_parser.add_argument("--port", type=int, default=8765)
+serve_parser.add_argument("--socket", help="path of a Unix socket to listen on instead of TCP")
+serve_parser.add_argument("--save-interval", type=float,
+                          help="seconds between saves of added rows, 0 to save after every add (default: 1)")
+validate_parser = commands.add_parser("validate", help="check the rows of files or standard input ('-')")
+validate_parser.add_argument("sources", nargs="+")
+validate_parser.add_argument("--input-format", help="format of the sources")
+arguments = parser.parse_args()
+FILE_NAME = arguments.file
+arguments.tolerant = arguments.tolerant or bool(arguments.error_report)
+if arguments.tolerant and (arguments.lazy or arguments.workers):
+    parser.error("--tolerant cannot be combined with --lazy or --workers")
+if arguments.shards and (arguments.lazy or arguments.tolerant):
+    parser.error("--shards cannot be combined with --lazy or --tolerant")
+if arguments.descending and not arguments.sort:
+    parser.error("--descending needs --sort")
+if arguments.lazy and (arguments.sort or arguments.top is not None or arguments.rating):
+    parser.error("--sort, --top, and --rating cannot be combined with --lazy")
+if arguments.autosave is not None and (arguments.lazy or arguments.autosave < 0):
+    parser.error("--autosave needs 0 or more seconds and cannot be combined with --lazy")
+format_options = {"--format": arguments.format, "--input-format": getattr(arguments, "input_format", None),
+                  "--output-format": getattr(arguments, "output_format", None)}
+if any(format_options.values()):
+    import storage_classes as storage
+    for option, format_name in format_options.items():
+        check_choice(option, format_name, [backend.name for backend in storage.BACKENDS])
+if arguments.sort or arguments.top is not None or arguments.rating:
+    import query_classes as query  # imported here, so only sorted and filtered views load the query classes
+    check_choice("--sort", arguments.sort, query.SORT_KEYS)
+if arguments.command == "analytics":
+    import analytics_classes as ana
+    check_choice("--period", arguments.period, ana.PERIODS)
+if arguments.metrics or arguments.profile:
+    import metrics_classes as met  # imported here, so a run without --metrics or --profile does not need it
+    check_choice("--profile", arguments.profile, met.PROFILE_MODES)
+
+if arguments.metrics:  # registered first, so the metrics are written after the profile capture closes
+    met.Metrics.enable(setter_classes=(dat.Person, dat.Employee))
+    atexit.register(met.Metrics.write_file, arguments.metrics)
+if arguments.profile:
+    profile_capture = contextlib.ExitStack()
+    profile_capture.enter_context(met.Metrics.capture_profile(arguments.profile, arguments.profile_output))
+    atexit.register(profile_capture.close)
+
+if arguments.command:  # Run the batch command instead of the menu
+    import batch_classes as batch  # imported here, so starting the menu does not load the batch commands
+    sys.exit(batch.BatchProcessor.run_command(arguments, dat.Employee))
+
+
+# Beginning of the main body of this script
+load_report = None
+load_status: dict = {"complete": True}  # False when a load error left rows of the file out of the data
+if arguments.shards:
+    shard_timings: list = []
+    employees = proc.FileProcessor.read_employee_shards(path=arguments.shards,
+                                                        employee_data=dat.employees,
+                                                        employee_type=dat.Employee,
+                                                        backend_name=arguments.format,
+                                                        workers=arguments.workers,
+                                                        merge_by_date=arguments.merge_by_date,
+                                                        shard_timings=shard_timings)
+    pres.IO.output_shard_timings(shard_timings)
+elif arguments.workers:
+    employees = proc.FileProcessor.read_employee_data_parallel(file_name=FILE_NAME,
+                                                               employee_data=dat.employees,
+                                                               employee_type=dat.Employee,
+                                                               workers=arguments.workers,
+                                                               backend_name=arguments.format,
+                                                               load_status=load_status)
+else:
+    load_report = proc.FileProcessor.new_load_report(FILE_NAME) if arguments.tolerant else None
+    employees = proc.FileProcessor.read_employee_data_from_file(file_name=FILE_NAME,
+                                                                employee_data=dat.employees,
+                                                                employee_type=dat.Employee,  # Note this is the class name (ignore the warning)
+                                                                backend_name=arguments.format,
+                                                                lazy=arguments.lazy,
+                                                                load_report=load_report,
+                                                                snapshot=not arguments.no_snapshot,
+                                                                load_status=load_status)
+    if load_report is not None:
+        pres.IO.output_load_report(load_report)
+        if arguments.error_report:
+            proc.FileProcessor.write_load_report(arguments.error_report, load_report)
+if isinstance(employees, proc.LazyEmployeeData):  # indexing would read every row, so new rows are only appended
+    save_rows = employees.added_rows
+    saved_row_count: int = 0
+else:
+    save_rows = employees
+    saved_row_count: int = len(employees)  # rows already in the file, so a save only writes the changes
+if arguments.shards or not load_status["complete"]:
+    saved_row_count = None  # the rows are not where they are in --file, so the first save rewrites it
+index = None  # built when the first review is entered, since building it takes longer than loading a snapshot
+analytics = None  # built when analytics are first shown, then caches its results until the employee data changes
+ordering = None  # keeps the shown order until the employee data changes
+if arguments.sort or arguments.top is not None or arguments.rating:
+    ordering = query.EmployeeOrdering(employees)
+autosaver = None  # saves from a background thread, so entering data never waits for a save
+if arguments.autosave is not None:
+    autosaver = proc.AutoSaver(FILE_NAME, employees, arguments.format, interval=arguments.autosave,
+                               max_rows=arguments.autosave_rows, fsync=not arguments.no_fsync,
+                               snapshot=load_status["complete"] and not arguments.no_snapshot,
+                               saved=saved_row_count is not None)
+    autosaver.start()
+    atexit.register(autosaver.stop)  # also saves the last changes when Ctrl+C ends the program
+
+# Repeat the follow tasks
+while True:
+    pres.IO.output_menu(menu=dat.MENU)
+
+    menu_choice = pres.IO.input_menu_choice()
+
+    if menu_choice == "1":  # Display current data
+        try:
+            pres.IO.write_employee_data(employee_data=employees, offset=arguments.offset, limit=arguments.limit,
+                                        positions=None if ordering is None else ordering.positions(
+                                            arguments.sort, arguments.descending, arguments.top, arguments.rating))
+        except Exception as e:
+            pres.IO.output_error_messages(e)
+        continue
+
+    elif menu_choice == "2":  # Get new data (and display the change)
+        try:
+            if index is None and not isinstance(employees, proc.LazyEmployeeData):
+                import query_classes as query  # imported here, so the menu starts without the query classes
+                index = query.EmployeeIndex(employees)  # updates a review that is entered again
+            employees = pres.IO.input_employee_data(employee_data=employees,
+                                               employee_type=dat.Employee,  # Note this is the class name (ignore the warning)
+                                               employee_index=index)
+            if autosaver is not None:
+                autosaver.changed()
+            pres.IO.write_employee_data(employee_data=employees, offset=arguments.offset, limit=arguments.limit,
+                                        positions=None if ordering is None else ordering.positions(
+                                            arguments.sort, arguments.descending, arguments.top, arguments.rating))
+        except Exception as e:
+            pres.IO.output_error_messages(e)
+        continue
+
+    elif menu_choice == "3":  # Save data in a file
+        try:
+            if autosaver is not None:
+                rows_written = autosaver.flush()
+                if rows_written is not None:
+                    pres.IO.output_save_result(FILE_NAME, rows_written)
+                continue
+            rows_written = proc.FileProcessor.write_employee_data_to_file(file_name=FILE_NAME,
+                                                                          employee_data=save_rows,
+                                                                          backend_name=arguments.format,
+                                                                          start_row=saved_row_count)
+            if rows_written is not None:
+                if isinstance(employees, proc.LazyEmployeeData):
+                    employees.mark_saved()  # the saved rows are now read from the file
+                saved_row_count = len(save_rows)
+                pres.IO.output_save_result(FILE_NAME, rows_written)
+                if rows_written and isinstance(employees, dat.EmployeeTable):
+                    if load_status["complete"] and not arguments.no_snapshot:
+                        proc.FileProcessor.write_employee_snapshot(FILE_NAME, employees)  # so the next start is quick
+                    else:
+                        proc.FileProcessor.delete_employee_snapshot(FILE_NAME)  # the data is not the whole file
+        except Exception as e:
+            pres.IO.output_error_messages(e)
+        continue
+
+    elif menu_choice == "4":  # End the program
+        if autosaver is not None:
+            rows_written = autosaver.stop()
+            if rows_written:
+                pres.IO.output_save_result(FILE_NAME, rows_written)
+        break  # out of the while loop
+
+    elif menu_choice == "5":  # Show rating analytics
+        try:
+            if analytics is None:
+                import analytics_classes as ana  # imported here, so the menu starts without the analytics classes
+                analytics = ana.RatingAnalytics(employees)
+            pres.IO.output_rating_analytics(summary=analytics.summary())
+        except Exception as e:
+            pres.IO.output_error_messages(e)
+        continue
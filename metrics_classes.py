@@ -0,0 +1,255 @@
+# ------------------------------------------------------------------------------------------------- #
+# Title: metrics_classes.py
+# Description: The module of opt-in instrumentation: timers, counters, and profiling captures
+# ChangeLog: (Who, When, What)
+# AdamSavage,20261018,Created module
+# AdamSavage,20261018,Import cProfile and tracemalloc only when a capture starts
+# ------------------------------------------------------------------------------------------------- #
+
+import contextlib
+import json
+import time
+
+METRIC_PREFIX: str = "employee_ratings_"  # prefix of the metric names in the Prometheus text format
+PROFILE_MODES: tuple = ("cprofile", "tracemalloc")
+TRACEMALLOC_TOP_LINES: int = 25  # allocation sites listed by a tracemalloc capture
+NO_TIMER = contextlib.nullcontext()  # what timer gives while metrics are disabled
+
+
+class Metrics:
+    """
+    Opt-in timers and counters for the load, save, validation, and display paths
+
+    Metrics start disabled. While disabled, counting does nothing and timer gives a shared no-op
+    context manager, and the Employee setters are not wrapped at all, so the cost is one flag check
+    per batch of rows. enable turns them on, and the results can be written as JSON or as a
+    Prometheus text dump. capture_profile adds an optional cProfile or tracemalloc capture.
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created Class
+    """
+    enabled: bool = False
+    counters: dict = {}  # name -> count
+    timers: dict = {}  # name -> [number of timed calls, total seconds]
+    wrapped_properties: list = []  # (class, attribute name, original property) of the wrapped setters
+
+    @staticmethod
+    def enable(setter_classes: tuple = ()):
+        """ This function turns the metrics on, optionally timing the property setters of classes
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param setter_classes: classes whose property setters are timed, such as Person and Employee
+        :return: None
+        """
+        Metrics.enabled = True
+        for cls in setter_classes:
+            for name, attribute in list(vars(cls).items()):
+                if isinstance(attribute, property) and attribute.fset is not None:
+                    Metrics.wrapped_properties.append((cls, name, attribute))
+                    setattr(cls, name, property(attribute.fget, Metrics.time_setter(attribute.fset),
+                                                attribute.fdel, attribute.__doc__))
+
+    @staticmethod
+    def disable():
+        """ This function turns the metrics off and puts back the original property setters
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :return: None
+        """
+        Metrics.enabled = False
+        while Metrics.wrapped_properties:
+            cls, name, attribute = Metrics.wrapped_properties.pop()
+            setattr(cls, name, attribute)
+
+    @staticmethod
+    def reset():
+        """ This function clears every counter and timer
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :return: None
+        """
+        Metrics.counters.clear()
+        Metrics.timers.clear()
+
+    @staticmethod
+    def time_setter(setter):
+        """ This function wraps a property setter so its calls are counted and timed under "setter"
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param setter: the original setter function
+        :return: the wrapped setter function
+        """
+        perf_counter = time.perf_counter
+
+        def timed_setter(instance, value):
+            start = perf_counter()
+            try:
+                setter(instance, value)
+            except ValueError:
+                Metrics.count("setter_rejections")
+                raise
+            finally:
+                Metrics.add_time("setter", perf_counter() - start)
+        return timed_setter
+
+    @staticmethod
+    def count(name: str, amount: int = 1):
+        """ This function adds to a counter while metrics are enabled
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param name: name of the counter
+        :param amount: amount to add
+        :return: None
+        """
+        if Metrics.enabled:
+            Metrics.counters[name] = Metrics.counters.get(name, 0) + amount
+
+    @staticmethod
+    def add_time(name: str, seconds: float):
+        """ This function adds one timed call to a timer
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param name: name of the timer
+        :param seconds: duration of the call
+        :return: None
+        """
+        timer = Metrics.timers.get(name)
+        if timer is None:
+            Metrics.timers[name] = [1, seconds]
+        else:
+            timer[0] += 1
+            timer[1] += seconds
+
+    @staticmethod
+    def timer(name: str):
+        """ This function gives a context manager that times its block under a timer name while metrics are enabled
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param name: name of the timer
+        :return: context manager
+        """
+        if not Metrics.enabled:
+            return NO_TIMER
+        return Metrics.timed_block(name)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def timed_block(name: str):
+        """ This function times a block of code under a timer name
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param name: name of the timer
+        :return: context manager
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            Metrics.add_time(name, time.perf_counter() - start)
+
+    @staticmethod
+    def to_dict() -> dict:
+        """ This function gets the counters and timers as a dictionary
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :return: dictionary with the counters and timers keys
+        """
+        return {"counters": dict(sorted(Metrics.counters.items())),
+                "timers": {name: {"count": count, "seconds": seconds}
+                           for name, (count, seconds) in sorted(Metrics.timers.items())}}
+
+    @staticmethod
+    def to_prometheus() -> str:
+        """ This function formats the counters and timers in the Prometheus text exposition format
+
+        Counters become <name>_total counters and timers become <name>_seconds summaries.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :return: the text dump
+        """
+        lines: list = []
+        for name, value in sorted(Metrics.counters.items()):
+            metric = f"{METRIC_PREFIX}{name}_total"
+            lines.extend((f"# TYPE {metric} counter", f"{metric} {value}"))
+        for name, (count, seconds) in sorted(Metrics.timers.items()):
+            metric = f"{METRIC_PREFIX}{name}_seconds"
+            lines.extend((f"# TYPE {metric} summary", f"{metric}_count {count}", f"{metric}_sum {seconds:.9f}"))
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def write_file(file_name: str):
+        """ This function writes the metrics to a file, as Prometheus text for .prom or .txt files and JSON otherwise
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of file to write to
+        :return: None
+        """
+        with open(file_name, "w") as file:
+            if file_name.endswith((".prom", ".txt")):
+                file.write(Metrics.to_prometheus())
+            else:
+                json.dump(Metrics.to_dict(), file, indent=2)
+                file.write("\n")
+
+    @staticmethod
+    @contextlib.contextmanager
+    def capture_profile(mode: str, file_name: str):
+        """ This function profiles a block of code with cProfile or tracemalloc and writes the result to a file
+
+        cProfile writes pstats data that "python -m pstats" or snakeviz can read. tracemalloc writes
+        the peak memory and the lines that allocated the most memory still in use at the end.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Import the profilers only when a capture starts
+
+        :param mode: "cprofile" or "tracemalloc"
+        :param file_name: string data with name of file to write the capture to
+        :return: context manager
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Please choose a profile mode from {', '.join(PROFILE_MODES)}")
+        if mode == "cprofile":
+            import cProfile  # the profilers are imported only when a capture is asked for
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                profiler.dump_stats(file_name)
+            return
+        import tracemalloc
+        tracemalloc.start()
+        try:
+            yield
+        finally:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            with open(file_name, "w") as file:
+                file.write(f"Peak traced memory: {peak} bytes\n")
+                for statistic in snapshot.statistics("lineno")[:TRACEMALLOC_TOP_LINES]:
+                    file.write(f"{statistic}\n")
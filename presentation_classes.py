@@ -3,8 +3,29 @@
 # Description: The module of presentation classes
 # ChangeLog: (Who, When, What)
 # AdamSavage,20241208,Created module
+# AdamSavage,20261018,Added buffered, paged output of employee data
+# AdamSavage,20261018,Added output of batch command reports and stats
+# AdamSavage,20261018,Added the rating analytics menu choice and output
+# AdamSavage,20261018,Input upserts through an employee index when one is given
+# AdamSavage,20261018,Time the display of employee data and count errors with Metrics
+# AdamSavage,20261018,Added output of tolerant load reports
+# AdamSavage,20261018,Added output of shard load timings
+# AdamSavage,20261018,Added output of the rows written by a save
+# AdamSavage,20261018,Show rows in a given order, for sorted and top N displays
+# AdamSavage,20261018,The batch report shows the invalid rows already in the ratings file
 # ------------------------------------------------------------------------------------------------- #
 
+import sys
+import metrics_classes as met
+
+RATING_LABELS: dict = {5: "5 (Leading)",
+                       4: "4 (Strong)",
+                       3: "3 (Solid)",
+                       2: "2 (Building)",
+                       1: "1 (Not Meeting Expectations)"}
+RATING_MESSAGES: dict = {rating: " {} {} is rated as " + label for rating, label in RATING_LABELS.items()}
+WRITE_CHUNK_ROWS: int = 10_000  # rows formatted into one buffer before each write to the screen
+LOAD_REPORT_ROWS: int = 10  # invalid fields of a load report listed on screen, the rest are counted by reason
 
 class IO:
     """
@@ -21,12 +42,14 @@ class IO:
 
         ChangeLog: (Who, When, What)
         RRoot,1.3.2030,Created function
+        AdamSavage,20261018,Count the errors with Metrics
 
         :param message: string with message data to display
         :param error: Exception object with technical message to display
 
         :return: None
         """
+        met.Metrics.count("errors")
 
         print(message, end="\n\n")
         if error is not None:
@@ -52,14 +75,15 @@ class IO:
 
         ChangeLog: (Who, When, What)
         RRoot,1.1.2030,Created function
+        AdamSavage,20261018,Added choice 5 for rating analytics
 
         :return: string with the users choice
         """
         choice = "0"
         try:
             choice = input("Enter your menu choice number: ")
-            if choice not in ("1", "2", "3", "4"):  # Note these are strings
-                raise Exception("Please, choose only 1, 2, 3, or 4")
+            if choice not in ("1", "2", "3", "4", "5"):  # Note these are strings
+                raise Exception("Please, choose only 1, 2, 3, 4, or 5")
         except Exception as e:
             IO.output_error_messages(e.__str__())  # passing the exception object to avoid the technical message
 
@@ -71,39 +95,246 @@ class IO:
 
         ChangeLog: (Who, When, What)
         RRoot,1.1.2030,Created function
+        AdamSavage,20261018,Look up the rating message in RATING_MESSAGES
+        AdamSavage,20261018,Time the display with Metrics
 
         :param employee_data: list of employee object data to be displayed
 
         :return: None
         """
-        message: str = ''
-        print()
-        print("-" * 50)
-        for employee in employee_data:
-            if employee.review_rating == 5:
-                message = " {} {} is rated as 5 (Leading)"
-            elif employee.review_rating == 4:
-                message = " {} {} is rated as 4 (Strong)"
-            elif employee.review_rating == 3:
-                message = " {} {} is rated as 3 (Solid)"
-            elif employee.review_rating == 2:
-                message = " {} {} is rated as 2 (Building)"
-            elif employee.review_rating == 1:
-                message = " {} {} is rated as 1 (Not Meeting Expectations)"
-
-            print(message.format(employee.first_name, employee.last_name, employee.review_date, employee.review_rating))
-        print("-" * 50)
-        print()
+        with met.Metrics.timer("render"):
+            print()
+            print("-" * 50)
+            for employee in employee_data:
+                message = RATING_MESSAGES[employee.review_rating]
+                print(message.format(employee.first_name, employee.last_name, employee.review_date,
+                                     employee.review_rating))
+            print("-" * 50)
+            print()
+        met.Metrics.count("rows_rendered", len(employee_data))
+
+    @staticmethod
+    def write_employee_data(employee_data: list, offset: int = 0, limit: int = None,
+                            chunk_rows: int = WRITE_CHUNK_ROWS, positions=None):
+        """ This function displays employee data to the user with a few large writes instead of a print per row
+
+        The lines are the same as output_employee_data's. They are built in one buffer and written with a
+        single sys.stdout.write, or one write per chunk_rows rows for large lists. Offset and limit show
+        one page of the rows. Positions, such as an order from EmployeeOrdering, show those rows in that order.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Time the display with Metrics
+        AdamSavage,20261018,Show the rows at positions when they are given
+
+        :param employee_data: list of employee object data to be displayed
+        :param offset: number of rows to skip
+        :param limit: largest number of rows to show, or None for all of them
+        :param chunk_rows: number of rows formatted before each write
+        :param positions: row positions to show in order, or None for every row in row order
+
+        :return: None
+        """
+        with met.Metrics.timer("render"):
+            row_count = len(employee_data) if positions is None else len(positions)
+            start = min(max(offset, 0), row_count)
+            end = row_count if limit is None else min(start + max(limit, 0), row_count)
+            write = sys.stdout.write
+            messages = RATING_MESSAGES
+            lines: list = ["\n", "-" * 50, "\n"]
+            for chunk_start in range(start, end, chunk_rows):
+                for first_name, last_name, review_rating in IO.iter_display_rows(employee_data, chunk_start,
+                                                                                 min(chunk_start + chunk_rows, end),
+                                                                                 positions):
+                    lines.append(messages[review_rating].format(first_name, last_name))
+                    lines.append("\n")
+                if len(lines) >= 2 * chunk_rows:
+                    write("".join(lines))
+                    lines.clear()
+            if start > 0 or end < row_count:
+                lines.append(f" Showing rows {start + 1}-{end} of {row_count}\n" if end > start
+                             else f" No rows to show ({row_count} in total)\n")
+            lines.extend(("-" * 50, "\n\n"))
+            write("".join(lines))
+        met.Metrics.count("rows_rendered", end - start)
+
+    @staticmethod
+    def iter_display_rows(employee_data: list, start: int, end: int, positions=None):
+        """ This function yields the first name, last name, and review rating of a range of rows
+
+        Columns of an EmployeeTable are read directly instead of through row views.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Read the range from positions when they are given
+
+        :param employee_data: list of employee object data
+        :param start: position of the first row
+        :param end: position after the last row
+        :param positions: row positions that start and end index into, or None to index the rows directly
+
+        :return: generator of (first name, last name, review rating) tuples
+        """
+        if positions is not None:
+            if hasattr(employee_data, "review_ratings"):
+                first_names, last_names = employee_data.first_names, employee_data.last_names
+                review_ratings = employee_data.review_ratings
+                for row in positions[start:end]:
+                    yield first_names[row], last_names[row], review_ratings[row]
+            else:
+                for row in positions[start:end]:
+                    employee = employee_data[row]
+                    yield employee.first_name, employee.last_name, employee.review_rating
+        elif hasattr(employee_data, "review_ratings"):
+            yield from zip(employee_data.first_names[start:end], employee_data.last_names[start:end],
+                           employee_data.review_ratings[start:end])
+        else:
+            for row in range(start, end):
+                employee = employee_data[row]
+                yield employee.first_name, employee.last_name, employee.review_rating
+
+    @staticmethod
+    def output_batch_report(report: dict):
+        """ This function displays the row counts and speed of a batch command on standard error
+
+        Standard error keeps the report apart from data a command writes to standard output.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Show the invalid rows already in the ratings file
+
+        :param report: dictionary with the command, accepted, rejected, seconds, and errors keys,
+                       and optionally a duplicates key, a file_rejected key with the invalid rows
+                       already in the ratings file, or a shards key with the rows of each file
+
+        :return: None
+        """
+        seconds = max(report["seconds"], 1e-9)
+        rows = report["accepted"] + report["rejected"]
+        print(f"{report['command']}: {report['accepted']} rows accepted, {report['rejected']} rows rejected, "
+              f"{rows / seconds:,.0f} rows/sec", file=sys.stderr)
+        if "duplicates" in report:
+            print(f"  {report['duplicates']} duplicate reviews merged", file=sys.stderr)
+        if report.get("file_rejected"):
+            print(f"  {report['file_rejected']} invalid rows already in the file", file=sys.stderr)
+        for file_name, rows in report.get("shards", {}).items():
+            print(f"  {file_name}: {rows} rows", file=sys.stderr)
+        for error in report["errors"]:
+            print(f"  rejected row {error[0]}: {error[1]}", file=sys.stderr)
+        if report["rejected"] > len(report["errors"]):
+            print(f"  ... and {report['rejected'] - len(report['errors'])} more", file=sys.stderr)
+
+    @staticmethod
+    def output_load_report(report: dict):
+        """ This function displays the rows skipped by a tolerant load, once the whole file is loaded
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param report: dictionary with the file, accepted, rejected, errors, and reasons keys
+
+        :return: None
+        """
+        if not report["rejected"]:
+            return
+        lines = [f"{report['file']}: {report['accepted']} rows loaded, {report['rejected']} invalid rows skipped"]
+        lines.extend(f"  {count} x {reason}"
+                     for reason, count in sorted(report["reasons"].items(), key=lambda item: -item[1]))
+        lines.extend(f"  row {error['row']}, {error['field'] or 'row'}: {error['reason']}"
+                     for error in report["errors"][:LOAD_REPORT_ROWS])
+        print("\n".join(lines))
+
+    @staticmethod
+    def output_save_result(file_name: str, rows_written: int):
+        """ This function displays how many rows a save wrote, or that there was nothing to save
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of the saved file
+        :param rows_written: number of rows the save wrote
+
+        :return: None
+        """
+        if rows_written:
+            print(f"Data was saved to the {file_name} file ({rows_written} rows written).")
+        else:
+            print(f"There were no changes to save to the {file_name} file.")
+
+    @staticmethod
+    def output_shard_timings(shard_timings: list):
+        """ This function displays the rows and read and parse times of each file loaded by the shard loader
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param shard_timings: list of dictionaries with the file, bytes, rows, read_seconds, and
+                              parse_seconds keys, and an error key for a file that failed
+
+        :return: None
+        """
+        lines: list = []
+        for timing in shard_timings:
+            if "error" in timing:
+                lines.append(f"{timing['file']}: not loaded, {timing['error']}")
+            else:
+                lines.append(f"{timing['file']}: {timing['rows']} rows, {timing['bytes']:,} bytes, "
+                             f"read {timing['read_seconds'] * 1000:.1f} ms, "
+                             f"parse {timing['parse_seconds'] * 1000:.1f} ms")
+        print("\n".join(lines))
+
+    @staticmethod
+    def output_rating_stats(stats: dict):
+        """ This function displays summary statistics of employee rating data
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param stats: dictionary with the rows, employees, first_date, last_date, and ratings keys
+
+        :return: None
+        """
+        print(f"Rows: {stats['rows']}")
+        print(f"Employees: {stats['employees']}")
+        print(f"Review dates: {stats['first_date']} to {stats['last_date']}")
+        for rating in sorted(stats["ratings"], reverse=True):
+            print(f"  {RATING_LABELS[rating]}: {stats['ratings'][rating]}")
+
+    @staticmethod
+    def output_rating_analytics(summary: dict):
+        """ This function displays the rating histogram and the per period rating summaries
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param summary: dictionary made by RatingAnalytics.summary
+
+        :return: None
+        """
+        lines: list = ["", "-" * 50, " Rating histogram:"]
+        total = max(summary["overall"]["reviews"], 1)
+        for rating in sorted(summary["histogram"], reverse=True):
+            count = summary["histogram"][rating]
+            lines.append(f"  {RATING_LABELS[rating]:<30} {count:>9}  {'#' * round(40 * count / total)}")
+        lines.append(f" Reviews per {summary['period']}: (mean, median, % Not Meeting Expectations)")
+        for key, period in list(summary["periods"].items()) + [("All", summary["overall"])]:
+            if period["reviews"]:
+                lines.append(f"  {key:<8} {period['reviews']:>9} reviews  {period['mean']:.2f}  "
+                             f"{period['median']:.1f}  {period['not_meeting_percent']:5.1f}%")
+        lines.extend(("-" * 50, "", ""))
+        sys.stdout.write("\n".join(lines))
 
     @staticmethod
     # def input_employee_data(employee_data: list, employee_type: dat.Employee):
-    def input_employee_data(employee_data: list, employee_type: object):
+    def input_employee_data(employee_data: list, employee_type: object, employee_index: object = None):
         """ This function gets the first name, last name, and GPA from the user
 
         ChangeLog: (Who, When, What)
         RRoot,1.1.2030,Created function
+        AdamSavage,20261018,Upsert the review through employee_index when one is given
 
         :param employee_data: list of dictionary rows to be filled with input data
+        :param employee_index: an EmployeeIndex over employee_data, so a review that is already there is updated
 
         :return: list
         """
@@ -115,7 +346,10 @@ class IO:
             employee_object.last_name = input("What is the employee's last name? ")
             employee_object.review_date = input("What is their review date (in YYYY-MM-DD format)? ")
             employee_object.review_rating = int(input("What is their review rating? "))
-            employee_data.append(employee_object)
+            if employee_index is None:
+                employee_data.append(employee_object)
+            else:
+                employee_index.upsert(employee_object)
 
         except ValueError as e:
             IO.output_error_messages("That value is not the correct type of data!", e)
@@ -3,15 +3,67 @@
 # Description: The module of processing classes
 # ChangeLog: (Who, When, What)
 # AdamSavage,20241208,Created module
+# AdamSavage,20261018,Added streaming JSON array reader
+# AdamSavage,20261018,Build employees in validated batches with from_records
+# AdamSavage,20261018,Added the journaled save mode and atomic compaction
+# AdamSavage,20261018,Read and write through the storage backends
+# AdamSavage,20261018,Added iter_file_records for streaming a file's rows
+# AdamSavage,20261018,Added the parallel json lines loader
+# AdamSavage,20261018,Parallel loader workers scan a memory map of the file
+# AdamSavage,20261018,Added upserting loads and the external sort deduplication
+# AdamSavage,20261018,Added the lazy loading LazyEmployeeData collection
+# AdamSavage,20261018,Time and count the load and save paths with Metrics
+# AdamSavage,20261018,Read and write compressed files through the storage codecs
+# AdamSavage,20261018,Added tolerant loads that skip invalid rows and report them together
+# AdamSavage,20261018,Added the multi-file shard loader and the streaming merge by review date
+# AdamSavage,20261018,Saves skip unchanged data and write only the changed and added rows
+# AdamSavage,20261018,Added the startup snapshot and import the worker pools only when they are used
+# AdamSavage,20261018,Added the AutoSaver background save thread
+# AdamSavage,20261018,Atomic saves keep the permissions of the file they replace
+# AdamSavage,20261018,Full saves replace the file atomically for every storage format
 # ------------------------------------------------------------------------------------------------- #
 
+import glob
+import hashlib
+import heapq
 import json
+import os
+import stat
+import struct
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from contextlib import ExitStack
+from datetime import date
+from itertools import chain, islice
+from operator import attrgetter, itemgetter
+import metrics_classes as met
 import presentation_classes as pres
+import storage_classes as storage
+
+RECORD_BATCH_SIZE: int = 10_000  # rows validated and built together by employee_type.from_records
+RANGES_PER_WORKER: int = 4  # byte ranges per worker process, so uneven ranges still keep every worker busy
+MIN_RANGE_BYTES: int = 1024 * 1024  # smallest byte range worth handing to a worker process
+DEDUP_MEMORY_ROWS: int = 1_000_000  # rows sorted in memory before deduplication spills a sorted run to disk
+SHARD_READ_THREADS: int = 8  # shard files read from disk at the same time by the shard loader
+MAX_LOAD_ERRORS: int = 1_000  # invalid fields listed in a load report, the rest are only counted by reason
+RECORD_ERRORS: tuple = (ValueError, KeyError, TypeError, AttributeError)  # ways a dictionary row can be invalid
+JOURNAL_SUFFIX: str = ".journal"  # the save journal of "EmployeeRatings.json" is "EmployeeRatings.json.journal"
+JOURNAL_COMPACT_BYTES: int = 64 * 1024 * 1024  # journal size that triggers a compaction after a save
+SNAPSHOT_SUFFIX: str = ".snapshot"  # the startup snapshot of "EmployeeRatings.json" is "EmployeeRatings.json.snapshot"
+SNAPSHOT_SIGNATURE: bytes = b"EMPS"
+SNAPSHOT_VERSION: int = 1  # changes whenever the snapshot layout does, so old snapshots are ignored
+SNAPSHOT_HEADER = struct.Struct("<4sII")  # signature, version, and byte length of the json metadata
+HASH_CHUNK_SIZE: int = 1024 * 1024  # bytes read per step while hashing a ratings file
+AUTOSAVE_INTERVAL: float = 30.0  # seconds an autosave waits after the first unsaved change, to save changes together
+AUTOSAVE_ROWS: int = 1_000  # changed or added rows that make an autosave start without waiting for the interval
 
 
 class FileProcessor:
     """
-    A collection of processing layer functions that work with Json files
+    A collection of processing layer functions that work with Json files and the other storage formats
 
     ChangeLog: (Who, When, What)
     RRoot,1.1.2030,Created Class
@@ -19,59 +71,362 @@ class FileProcessor:
 
     @staticmethod
     # def read_employee_data_from_file(file_name: str, employee_data: list, employee_type: dat.Employee):
-    def read_employee_data_from_file(file_name: str, employee_data: list, employee_type: object):
+    def read_employee_data_from_file(file_name: str, employee_data: list, employee_type: object,
+                                     backend_name: str = None, employee_index: object = None, lazy: bool = False,
+                                     load_report: dict = None, snapshot: bool = False, load_status: dict = None):
         """ This function reads data from a json file and loads it into a list of dictionary rows
 
         ChangeLog: (Who, When, What)
         RRoot,1.1.2030,Created function
+        AdamSavage,20261018,Parse the file one record at a time instead of with json.load
+        AdamSavage,20261018,Build the employee objects in batches with employee_type.from_records
+        AdamSavage,20261018,Replay rows saved to the journal after the file's rows
+        AdamSavage,20261018,Read other storage formats, picked by backend_name or the file extension
+        AdamSavage,20261018,Upsert the rows through employee_index when one is given
+        AdamSavage,20261018,Return a LazyEmployeeData instead of reading the rows when lazy is True
+        AdamSavage,20261018,Time parsing and validation and count the rows and bytes read
+        AdamSavage,20261018,Skip invalid rows and record them in load_report when one is given
+        AdamSavage,20261018,Load from and write the startup snapshot when snapshot is True
+        AdamSavage,20261018,Record in load_status whether the whole file was loaded
 
         :param file_name: string data with name of file to read from
         :param employee_data: list of dictionary rows to be filled with file data
         :param employee_type: an reference to the Employee class
+        :param backend_name: name of the storage format, or None to go by the file extension
+        :param employee_index: an EmployeeIndex over employee_data to upsert the rows with, or None to append them
+        :param lazy: True to return a LazyEmployeeData that reads rows only when they are used, with
+                     employee_data holding the rows added to it
+        :param load_report: a report from new_load_report to record invalid rows in and keep loading, or
+                            None to stop at the first invalid row and display its error
+        :param snapshot: True to load an empty EmployeeTable from the file's startup snapshot when the
+                         snapshot matches the file, and to write a new snapshot after a clean load
+        :param load_status: a dictionary whose "complete" key is set to True if every row of the file and its
+                            journal was loaded without an error, and to False otherwise, or None
         :return: list
         """
+        if load_status is not None:
+            load_status["complete"] = False  # until the last row is loaded
+        backend = storage.StorageBackend.for_file_name(file_name, backend_name)
+        snapshot_key = None
+        if (snapshot and not lazy and employee_index is None and hasattr(employee_data, "extend_columns")
+                and not len(employee_data) and os.path.exists(file_name)):
+            snapshot_key = FileProcessor.get_snapshot_key(file_name)  # taken before parsing, in case the file changes
+            if FileProcessor.read_employee_snapshot(file_name, employee_data, snapshot_key):
+                met.Metrics.count("rows_accepted", len(employee_data))
+                if load_report is not None:
+                    load_report["accepted"] += len(employee_data)
+                if load_status is not None:
+                    load_status["complete"] = True
+                return employee_data
+        if lazy:
+            if not os.path.exists(file_name):
+                pres.IO.output_error_messages("Text file must exist before running this script!",
+                                              FileNotFoundError(file_name))
+            try:
+                lazy_data = LazyEmployeeData(file_name, employee_type, backend_name, employee_data)
+                if load_status is not None:
+                    load_status["complete"] = True  # the rows are read from the file when they are used
+                return lazy_data
+            except Exception as e:
+                pres.IO.output_error_messages("There was a non-specific error!", e)
+                return employee_data
+        add_employees = employee_data.extend if employee_index is None else employee_index.upsert_many
         try:
-            with open(file_name, "r") as file:
-                list_of_dictionary_data = json.load(file)  # the load function returns a list of dictionary rows.
-                for employee in list_of_dictionary_data:
-                    employee_object = employee_type()
-                    employee_object.first_name = employee["FirstName"]
-                    employee_object.last_name = employee["LastName"]
-                    employee_object.review_date = employee["ReviewDate"]
-                    employee_object.review_rating = employee["ReviewRating"]
-                    employee_data.append(employee_object)
+            # Records are parsed one at a time so the whole list of dictionary rows is never held in memory.
+            records = backend.iter_records(file_name)
+            row_number = 0
+            while True:
+                with met.Metrics.timer("parse"):
+                    batch = list(islice(records, RECORD_BATCH_SIZE))
+                if not batch:
+                    break
+                try:
+                    with met.Metrics.timer("validate"):
+                        employee_list = employee_type.from_records(batch)
+                except RECORD_ERRORS:
+                    if load_report is None:
+                        # Keep the rows before the bad one, then let the bad row's error be reported.
+                        for record in batch:
+                            try:
+                                add_employees(employee_type.from_records([record]))
+                            except RECORD_ERRORS:
+                                met.Metrics.count("rows_rejected")
+                                raise
+                            met.Metrics.count("rows_accepted")
+                        continue
+                    # Only a batch with a bad row is checked row by row, so valid batches load at full speed.
+                    employee_list = FileProcessor.check_records(batch, employee_type, load_report, row_number + 1)
+                    met.Metrics.count("rows_rejected", len(batch) - len(employee_list))
+                row_number += len(batch)
+                add_employees(employee_list)
+                met.Metrics.count("rows_accepted", len(employee_list))
+                if load_report is not None:
+                    load_report["accepted"] += len(employee_list)
+            if met.Metrics.enabled:
+                met.Metrics.count("bytes_read", os.path.getsize(file_name))
         except FileNotFoundError as e:
             # raise FileNotFoundError("Text file must exist before running this script!")
             pres.IO.output_error_messages("Text file must exist before running this script!", e)
+            return employee_data
         except Exception as e:
             # raise Exception("There was a non-specific error!")
             pres.IO.output_error_messages("There was a non-specific error!", e)
+            return employee_data
+
+        if backend is storage.JsonBackend and os.path.exists(file_name + JOURNAL_SUFFIX):
+            try:
+                records = FileProcessor.iter_journal_records(file_name)
+                while batch := list(islice(records, RECORD_BATCH_SIZE)):
+                    add_employees(employee_type.from_records(batch))
+                    met.Metrics.count("rows_accepted", len(batch))
+                if met.Metrics.enabled:
+                    met.Metrics.count("bytes_read", os.path.getsize(file_name + JOURNAL_SUFFIX))
+            except Exception as e:
+                pres.IO.output_error_messages("There was a problem reading the save journal!", e)
+                return employee_data
+        complete = load_report is None or not load_report["rejected"]
+        if load_status is not None:
+            load_status["complete"] = complete
+        if snapshot_key is not None and complete:
+            FileProcessor.write_employee_snapshot(file_name, employee_data, snapshot_key)
         return employee_data
 
     @staticmethod
-    def write_employee_data_to_file(file_name: str, employee_data: list):
+    def new_load_report(file_name: str) -> dict:
+        """ This function starts the report of a tolerant load
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of the file being loaded
+        :return: dictionary with the file, accepted, rejected, errors, and reasons keys
+        """
+        return {"file": file_name, "accepted": 0, "rejected": 0, "errors": [], "reasons": {}}
+
+    @staticmethod
+    def check_records(records: list, employee_type: object, load_report: dict, first_row: int) -> list:
+        """ This function builds employees from the valid rows of a batch and records the invalid ones in a report
+
+        Each invalid field adds a dictionary with the row, field, and reason keys to the report's
+        errors, up to MAX_LOAD_ERRORS of them, and is counted under its reason in the report's reasons.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param records: list of dictionary rows
+        :param employee_type: an reference to the Employee class
+        :param load_report: the report from new_load_report
+        :param first_row: row number of the first row in the file, from 1
+        :return: list of employee objects built from the valid rows
+        """
+        valid_records: list = []
+        errors, reasons = load_report["errors"], load_report["reasons"]
+        for row, record in enumerate(records, first_row):
+            record_errors = employee_type.find_record_errors(record)
+            if not record_errors:
+                valid_records.append(record)
+                continue
+            load_report["rejected"] += 1
+            for field, reason in record_errors:
+                key = f"{field}: {reason}" if field else reason
+                reasons[key] = reasons.get(key, 0) + 1
+                if len(errors) < MAX_LOAD_ERRORS:
+                    errors.append({"row": row, "field": field, "reason": reason})
+        return employee_type.from_records(valid_records)
+
+    @staticmethod
+    def write_load_report(file_name: str, load_report: dict):
+        """ This function writes the report of a tolerant load to a json file
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of file to write to
+        :param load_report: the report from new_load_report
+        :return: None
+        """
+        try:
+            with open(file_name, "w") as file:
+                json.dump(load_report, file, indent=2)
+                file.write("\n")
+        except Exception as e:
+            pres.IO.output_error_messages("There was a non-specific error!", e)
+
+    @staticmethod
+    def read_employee_data_parallel(file_name: str, employee_data: list, employee_type: object,
+                                    workers: int = None, backend_name: str = None, load_status: dict = None):
+        """ This function reads a json lines file with several processes and loads it into a list of employees
+
+        The file is split into byte ranges that start and end on line breaks. Each range is parsed and
+        validated by employee_type.from_records in a worker process, and the results are added to the
+        list in the original row order. Other storage formats and compressed files cannot be split
+        this way and are read by read_employee_data_from_file.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Import the process pool only when it is used
+        AdamSavage,20261018,Record in load_status whether the whole file was loaded
+
+        :param file_name: string data with name of file to read from
+        :param employee_data: list of employee objects to be filled with file data
+        :param employee_type: an reference to the Employee class
+        :param workers: number of worker processes, or None for one per CPU
+        :param backend_name: name of the storage format, or None to go by the file extension
+        :param load_status: a dictionary whose "complete" key is set to True if every row of the file was
+                            loaded without an error, and to False otherwise, or None
+        :return: list
+        """
+        backend = storage.StorageBackend.for_file_name(file_name, backend_name)
+        if backend is not storage.JsonLinesBackend or not storage.StorageBackend.can_map(file_name):
+            return FileProcessor.read_employee_data_from_file(file_name, employee_data, employee_type, backend_name,
+                                                              load_status=load_status)
+        if load_status is not None:
+            load_status["complete"] = False  # until the last range is loaded
+        workers = workers or os.cpu_count() or 1
+        try:
+            file_size = os.path.getsize(file_name)
+            range_count = max(1, min(workers * RANGES_PER_WORKER, file_size // MIN_RANGE_BYTES + 1))
+            bounds = [file_size * index // range_count for index in range(range_count + 1)]
+            if workers == 1 or range_count == 1:
+                employee_data.extend(FileProcessor.read_json_lines_range(file_name, 0, file_size, employee_type))
+            else:
+                from concurrent.futures import ProcessPoolExecutor  # imported here, it is slow to import
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    for employee_list in executor.map(FileProcessor.read_json_lines_range,
+                                                      [file_name] * range_count, bounds[:-1], bounds[1:],
+                                                      [employee_type] * range_count):
+                        employee_data.extend(employee_list)
+            if load_status is not None:
+                load_status["complete"] = True
+        except FileNotFoundError as e:
+            pres.IO.output_error_messages("Text file must exist before running this script!", e)
+        except Exception as e:
+            pres.IO.output_error_messages("There was a non-specific error!", e)
+        return employee_data
+
+    @staticmethod
+    def read_json_lines_range(file_name: str, start: int, end: int, employee_type: object) -> list:
+        """ This function parses and validates the json lines that start within a byte range of a file
+
+        A line belongs to the range its first byte falls in, so ranges split anywhere in a file
+        together read every line exactly once.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Scan a memory map of the file instead of reading it
+
+        :param file_name: string data with name of file to read from
+        :param start: offset of the first byte of the range
+        :param end: offset after the last byte of the range
+        :param employee_type: an reference to the Employee class
+        :return: list of employee objects
+        """
+        with storage.StorageBackend.map_file(file_name) as buffer:
+            records = list(storage.JsonLinesBackend.iter_buffer_records(buffer, start, end))
+        return employee_type.from_records(records)
+
+    @staticmethod
+    def iter_file_records(file_name: str, backend_name: str = None):
+        """ This function yields the dictionary rows of a file, including rows saved to its journal
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of file to read from
+        :param backend_name: name of the storage format, or None to go by the file extension
+        :return: generator of dictionary rows
+        """
+        backend = storage.StorageBackend.for_file_name(file_name, backend_name)
+        yield from backend.iter_records(file_name)
+        if backend is storage.JsonBackend and os.path.exists(file_name + JOURNAL_SUFFIX):
+            yield from FileProcessor.iter_journal_records(file_name)
+
+    @staticmethod
+    def iter_json_array_records(file, chunk_size: int = storage.READ_CHUNK_SIZE):
+        """ This function yields the dictionary rows of a json array one at a time
+
+        Only the current chunk of the file and the record being decoded are kept in memory,
+        so peak memory stays flat no matter how many rows the file holds.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file: an open text file positioned at the start of a json array
+        :param chunk_size: number of characters to read from the file per step
+        :return: generator of dictionary rows
+        """
+        return storage.JsonBackend.iter_file_records(file, chunk_size)
+
+    @staticmethod
+    def write_employee_data_to_file(file_name: str, employee_data: list, backend_name: str = None,
+                                    start_row: int = None, fsync: bool = True) -> int:
         """ This function writes data to a json file with data from a list of dictionary rows
 
+        Without start_row the whole file is rewritten. With start_row only what changed since the
+        last load or save is written: nothing when no row changed, only the new rows when rows were
+        only added, and the changed records patched in place when the storage format can index its
+        records and each changed record still encodes to the same number of bytes. Any other change
+        replaces the file atomically.
+
         ChangeLog: (Who, When, What)
         RRoot,1.1.2030,Created function
+        AdamSavage,20261018,Write other storage formats, picked by backend_name or the file extension
+        AdamSavage,20261018,Time the write and count the rows and bytes written
+        AdamSavage,20261018,Skip unchanged saves, write only the changed rows, and return the rows written
+        AdamSavage,20261018,Replace the whole file atomically for every storage format
+        AdamSavage,20261018,Added fsync
 
         :param file_name: string data with name of file to write to
         :param employee_data: list of dictionary rows to be writen to the file
+        :param backend_name: name of the storage format, or None to go by the file extension
+        :param start_row: number of rows at the front of the list that the file held after the last load or save,
+                          or None to rewrite the whole file
+        :param fsync: True to flush the written data to disk before returning, False to leave it to the system
 
-        :return: None
+        :return: number of rows written, or None if the data could not be saved
         """
         try:
-            list_of_dictionary_data: list = []
-            for employee in employee_data:  # Convert List of employee objects to list of dictionary rows.
-                employee_json: dict = {"FirstName": employee.first_name,
-                                       "LastName": employee.last_name,
-                                       "ReviewDate": employee.review_date,
-                                       "ReviewRating": employee.review_rating
-                                       }
-                list_of_dictionary_data.append(employee_json)
+            backend = storage.StorageBackend.for_file_name(file_name, backend_name)
+            row_count = len(employee_data)
+            changed_rows = None  # None rewrites the whole file
+            if start_row is not None and start_row <= row_count and os.path.exists(file_name):
+                changed_rows = FileProcessor.get_changed_rows(employee_data, start_row)
+            if changed_rows == [] and start_row == row_count:
+                return 0  # nothing changed, so the file is left alone
+            if changed_rows == []:
+                if FileProcessor.append_employee_data_to_file(file_name, employee_data, start_row,
+                                                              backend_name, fsync) != row_count:
+                    return None  # the error was already shown
+                FileProcessor.mark_rows_saved(employee_data, range(start_row, row_count))
+                return row_count - start_row
 
-            with open(file_name, "w") as file:
-                json.dump(list_of_dictionary_data, file)
+            stored_size = os.path.getsize(file_name) if met.Metrics.enabled and changed_rows else 0
+            with met.Metrics.timer("write"):
+                patched_bytes = None
+                if changed_rows:
+                    patched_bytes = FileProcessor.patch_file_records(
+                        file_name, backend,
+                        {row: storage.record_from_employee(employee_data[row]) for row in changed_rows}, fsync)
+                if patched_bytes is not None:
+                    backend.append_records(file_name, (storage.record_from_employee(employee_data[row])
+                                                       for row in range(start_row, row_count)), fsync)
+                    rows_written = len(changed_rows) + row_count - start_row
+                    saved_rows = chain(changed_rows, range(start_row, row_count))
+                    bytes_written = patched_bytes + os.path.getsize(file_name) - stored_size
+                else:
+                    # Convert List of employee objects to list of dictionary rows.
+                    list_of_dictionary_data: list = [storage.record_from_employee(employee)
+                                                     for employee in employee_data]
+                    # Written atomically, so a row that cannot be stored leaves the old file in place
+                    FileProcessor.replace_file_records(file_name, list_of_dictionary_data, backend_name, fsync)
+                    rows_written = len(list_of_dictionary_data)
+                    saved_rows = range(row_count)
+                    bytes_written = os.path.getsize(file_name) if met.Metrics.enabled else 0
+            if met.Metrics.enabled:
+                met.Metrics.count("rows_written", rows_written)
+                met.Metrics.count("bytes_written", bytes_written)
+            FileProcessor.mark_rows_saved(employee_data, saved_rows)
+            return rows_written
         except TypeError as e:
             # raise TypeError("Please check that the data is a valid JSON format")
             pres.IO.output_error_messages("Please check that the data is a valid JSON format", e)
@@ -81,3 +436,1141 @@ class FileProcessor:
         except Exception as e:
             # raise Exception("There was a non-specific error!")
             pres.IO.output_error_messages("There was a non-specific error!", e)
+        return None
+
+    @staticmethod
+    def get_changed_rows(employee_data, row_count: int) -> list:
+        """ This function finds the rows changed since the last load or save among the first rows of the data
+
+        An EmployeeTable keeps the positions of its changed rows, and Employee objects have a changed flag.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param employee_data: list of employee objects or an EmployeeTable
+        :param row_count: number of rows at the front of the data to look at
+        :return: sorted list of row positions
+        """
+        changed_rows = getattr(employee_data, "changed_rows", None)
+        if changed_rows is not None:
+            return sorted(row for row in changed_rows if row < row_count)
+        return [row for row in range(row_count) if getattr(employee_data[row], "changed", False)]
+
+    @staticmethod
+    def mark_rows_saved(employee_data, rows):
+        """ This function clears the change tracking of rows that were written to the file
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param employee_data: list of employee objects or an EmployeeTable
+        :param rows: positions of the written rows, every row for an EmployeeTable
+        :return: None
+        """
+        mark_saved = getattr(employee_data, "mark_saved", None)
+        if mark_saved is not None:
+            mark_saved()
+            return
+        for row in rows:
+            employee = employee_data[row]
+            if getattr(employee, "changed", False):
+                employee.changed = False
+
+    @staticmethod
+    def patch_file_records(file_name: str, backend, records: dict, fsync: bool = True):
+        """ This function overwrites records in place when each new record is the same size as the old one
+
+        Nothing is written unless every record fits, so a file is either patched completely or left
+        alone. A crash while patching can leave some records old and some new, but each record is
+        always a whole old or new record.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Added fsync
+
+        :param file_name: string data with name of file to patch
+        :param backend: the storage backend of the file
+        :param records: dictionary of row position -> new dictionary row
+        :param fsync: True to flush the patched bytes to disk before returning
+        :return: number of bytes written, or None if the records could not be patched
+        """
+        if not (backend.can_index and storage.StorageBackend.can_map(file_name)):
+            return None
+        rows = sorted(records)
+        patches: list = []
+        with storage.StorageBackend.map_file(file_name) as buffer:
+            offsets = list(islice(backend.iter_buffer_offsets(buffer), rows[-1] + 2))
+            if len(offsets) <= rows[-1]:
+                return None
+            offsets.append(len(buffer))  # the end of the last record when the last row changed
+            for row in rows:
+                data = backend.encode_record(records[row])
+                if len(data) != offsets[row + 1] - offsets[row]:
+                    return None
+                patches.append((offsets[row], data))
+        with open(file_name, "r+b") as file:
+            for offset, data in patches:
+                file.seek(offset)
+                file.write(data)
+            if fsync:
+                file.flush()
+                os.fsync(file.fileno())
+        return sum(len(data) for _, data in patches)
+
+    @staticmethod
+    def get_stored_size(file_name: str) -> int:
+        """ This function gets the number of bytes a ratings file and its save journal take up
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of the file
+        :return: number of bytes, 0 for files that do not exist
+        """
+        return sum(os.path.getsize(name) for name in (file_name, file_name + JOURNAL_SUFFIX) if os.path.exists(name))
+
+    @staticmethod
+    def get_file_identity(file_name: str):
+        """ This function gets values that change whenever a file is rewritten or replaced
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of the file
+        :return: list of the inode number, size, and modification time, or None if the file does not exist
+        """
+        try:
+            status = os.stat(file_name)
+        except FileNotFoundError:
+            return None
+        return [status.st_ino, status.st_size, status.st_mtime_ns]
+
+    @staticmethod
+    def create_temp_file(file_name: str, suffix: str = ".tmp") -> str:
+        """ This function creates an empty temporary file next to a file, with the permissions of that file
+
+        mkstemp makes files only the owner can read, and os.replace would carry that over to the
+        file being replaced, so the mode of the file is copied, or the umask applied for a new file.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of the file the temporary file will replace
+        :param suffix: end of the temporary file name
+        :return: string data with name of the temporary file
+        """
+        directory = os.path.dirname(os.path.abspath(file_name))
+        file_descriptor, temp_file_name = tempfile.mkstemp(prefix=os.path.basename(file_name) + ".", suffix=suffix,
+                                                           dir=directory)
+        os.close(file_descriptor)
+        try:
+            mode = stat.S_IMODE(os.stat(file_name).st_mode)
+        except FileNotFoundError:
+            umask = os.umask(0)  # the umask can only be read by setting it
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        os.chmod(temp_file_name, mode)
+        return temp_file_name
+
+    @staticmethod
+    def write_text_file_atomically(file_name: str, chunks, fsync: bool = True):
+        """ This function writes a text file by writing a temporary file and renaming it over the original
+
+        A crash part way through leaves the original file untouched, never a partly written one.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Compress the file through the codec its extension names
+        AdamSavage,20261018,Keep the permissions of the file
+
+        :param file_name: string data with name of file to write to
+        :param chunks: iterable of strings that make up the new file contents
+        :param fsync: True to flush the data to disk before the rename
+        :return: None
+        """
+        directory = os.path.dirname(os.path.abspath(file_name))
+        # The temporary file keeps the compression extension, so it is written through the same codec.
+        temp_file_name = FileProcessor.create_temp_file(
+            file_name, ".tmp" + storage.StorageBackend.get_codec_extension(file_name))
+        try:
+            with storage.StorageBackend.open_file(temp_file_name, "w") as file:
+                for chunk in chunks:
+                    file.write(chunk)
+            if fsync:
+                with open(temp_file_name, "rb") as file:
+                    os.fsync(file.fileno())
+            os.replace(temp_file_name, file_name)
+        except BaseException:
+            os.remove(temp_file_name)
+            raise
+        if fsync and hasattr(os, "O_DIRECTORY"):  # make the rename itself durable on POSIX systems
+            directory_descriptor = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(directory_descriptor)
+            finally:
+                os.close(directory_descriptor)
+
+    @staticmethod
+    def iter_journal_records(file_name: str):
+        """ This function yields the dictionary rows saved to the journal of a json file
+
+        The first line of a journal records the identity and the hash of the json file it belongs to.
+        A journal left over from before the json file was compacted or rewritten is ignored, and so
+        is a last line cut short by a crash.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Keep the journal of a copied or restored json file whose hash still matches
+
+        :param file_name: string data with name of the json file whose journal is read
+        :return: generator of dictionary rows
+        """
+        with open(file_name + JOURNAL_SUFFIX, "r") as file:
+            if not FileProcessor.is_journal_current(file_name, file.readline()):
+                return
+            for line in file:
+                if not line.endswith("\n"):
+                    return
+                yield json.loads(line)
+
+    @staticmethod
+    def is_journal_current(file_name: str, header: str, base: list = None) -> bool:
+        """ This function checks whether a journal header belongs to the current contents of its json file
+
+        The identity in the header matches as long as the json file is left alone. Copying, restoring,
+        or moving the file to another file system gives it a new inode, so then the hash of the file
+        taken when the journal was started decides.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of the json file
+        :param header: the first line of the journal
+        :param base: the get_file_identity of the json file, or None to get it now
+        :return: True if the journal rows are to be replayed after the json file's rows
+        """
+        if not header.endswith("\n"):
+            return False  # the header was cut short by a crash
+        header = json.loads(header)
+        if header.get("Base") == (base or FileProcessor.get_file_identity(file_name)):
+            return True
+        return "Hash" in header and header["Hash"] == FileProcessor.hash_files([file_name])
+
+    @staticmethod
+    def save_employee_data_to_journal(file_name: str, employee_data: list, start_row: int = 0,
+                                      fsync: bool = True) -> int:
+        """ This function saves only new employee rows by appending them to the json file's journal
+
+        The rows are written as json lines to a journal next to the json file, so a save costs time
+        for the new rows only. The journal is compacted into the json file once it grows large.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Record the hash of the json file and keep the journal of a copied json file
+
+        :param file_name: string data with name of the json file to save to
+        :param employee_data: list of employee objects
+        :param start_row: number of rows at the front of the list that are already saved
+        :param fsync: True to flush the journal to disk before returning
+        :return: number of rows saved in total, to be passed as start_row to the next save
+        """
+        journal_file_name = file_name + JOURNAL_SUFFIX
+        try:
+            if not os.path.exists(file_name):
+                FileProcessor.write_text_file_atomically(file_name, ["[]"], fsync=fsync)
+            base = FileProcessor.get_file_identity(file_name)
+            if os.path.exists(journal_file_name):
+                with open(journal_file_name, "r") as file:
+                    header = file.readline()
+                    if (header.endswith("\n") and json.loads(header).get("Base") != base
+                            and FileProcessor.is_journal_current(file_name, header, base)):
+                        # The json file was copied or restored with its journal, so the journal moves to the copy.
+                        header = json.dumps({"Base": base, "Hash": json.loads(header)["Hash"]}) + "\n"
+                        FileProcessor.write_text_file_atomically(journal_file_name, chain([header], file), fsync)
+
+            with open(journal_file_name, "a+") as file:
+                file.seek(0)
+                header = file.readline()
+                if not header.endswith("\n") or json.loads(header).get("Base") != base:
+                    # The journal is missing, stale, or its header is cut short, so start a new one.
+                    file.truncate(0)
+                    file.write(json.dumps({"Base": base, "Hash": FileProcessor.hash_files([file_name])}) + "\n")
+                else:
+                    # Drop a last line cut short by a crash so the new rows start on their own line.
+                    contents_end = file.seek(0, os.SEEK_END)
+                    if contents_end > 0:
+                        file.seek(contents_end - 1)
+                        if file.read(1) != "\n":
+                            file.seek(0)
+                            file.truncate(file.read().rfind("\n") + 1)
+
+                storage.JsonLinesBackend.write_file_records(
+                    file, (storage.record_from_employee(employee_data[row])
+                           for row in range(start_row, len(employee_data))))
+                file.flush()
+                if fsync:
+                    os.fsync(file.fileno())
+
+            if os.path.getsize(journal_file_name) > JOURNAL_COMPACT_BYTES:
+                FileProcessor.compact_employee_data_journal(file_name, fsync=fsync)
+            return len(employee_data)
+        except PermissionError as e:
+            pres.IO.output_error_messages("Please check the data file's read/write permission", e)
+        except Exception as e:
+            pres.IO.output_error_messages("There was a non-specific error!", e)
+        return start_row
+
+    @staticmethod
+    def append_employee_data_to_file(file_name: str, employee_data: list, start_row: int = 0,
+                                     backend_name: str = None, fsync: bool = True) -> int:
+        """ This function saves only new employee rows by appending them to the file
+
+        Storage formats that can be appended to get the new rows directly, and json files get
+        them through their journal.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Time the save and count the rows and bytes written
+        AdamSavage,20261018,Added fsync
+
+        :param file_name: string data with name of file to save to
+        :param employee_data: list of employee objects
+        :param start_row: number of rows at the front of the list that are already saved
+        :param backend_name: name of the storage format, or None to go by the file extension
+        :param fsync: True to flush the new rows to disk before returning
+        :return: number of rows saved in total, to be passed as start_row to the next save
+        """
+        try:
+            backend = storage.StorageBackend.for_file_name(file_name, backend_name)
+            stored_size = FileProcessor.get_stored_size(file_name) if met.Metrics.enabled else 0
+            with met.Metrics.timer("write"):
+                if not backend.can_append:
+                    saved_row_count = FileProcessor.save_employee_data_to_journal(file_name, employee_data, start_row,
+                                                                                  fsync=fsync)
+                else:
+                    backend.append_records(file_name, (storage.record_from_employee(employee_data[row])
+                                                       for row in range(start_row, len(employee_data))), fsync)
+                    saved_row_count = len(employee_data)
+            if met.Metrics.enabled:
+                met.Metrics.count("rows_written", saved_row_count - start_row)
+                met.Metrics.count("bytes_written", max(FileProcessor.get_stored_size(file_name) - stored_size, 0))
+            return saved_row_count
+        except PermissionError as e:
+            pres.IO.output_error_messages("Please check the data file's read/write permission", e)
+        except Exception as e:
+            pres.IO.output_error_messages("There was a non-specific error!", e)
+        return start_row
+
+    @staticmethod
+    def compact_employee_data_journal(file_name: str, fsync: bool = True):
+        """ This function merges the journal into the json file and removes the journal
+
+        The json file is replaced atomically, and replacing it makes the old journal stale, so a
+        crash at any point never loses rows or replays them twice.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of the json file to compact
+        :param fsync: True to flush the new json file to disk before it replaces the old one
+        :return: None
+        """
+        journal_file_name = file_name + JOURNAL_SUFFIX
+        if not os.path.exists(journal_file_name):
+            return
+
+        with storage.StorageBackend.open_file(file_name, "r") as file:
+            records = chain(FileProcessor.iter_json_array_records(file), FileProcessor.iter_journal_records(file_name))
+            FileProcessor.write_text_file_atomically(file_name, storage.JsonBackend.iter_text_chunks(records),
+                                                     fsync=fsync)
+        os.remove(journal_file_name)
+
+    @staticmethod
+    def replace_file_records(file_name: str, records, backend_name: str = None, fsync: bool = True):
+        """ This function replaces a file with dictionary rows by writing a temporary file and renaming it
+
+        The rows are streamed to the temporary file, so they never need to be in memory at once. The
+        journal of a json file is removed, since its rows are expected to be among the new rows.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Keep the permissions of the file
+
+        :param file_name: string data with name of file to replace
+        :param records: iterable of dictionary rows
+        :param backend_name: name of the storage format, or None to go by the file extension
+        :param fsync: True to flush the new file to disk before it replaces the old one
+        :return: None
+        """
+        backend = storage.StorageBackend.for_file_name(file_name, backend_name)
+        if backend is storage.JsonBackend:
+            FileProcessor.write_text_file_atomically(file_name, storage.JsonBackend.iter_text_chunks(records), fsync)
+        else:
+            temp_file_name = FileProcessor.create_temp_file(
+                file_name, ".tmp" + storage.StorageBackend.get_codec_extension(file_name))
+            try:
+                backend.write_records(temp_file_name, records)
+                if fsync:
+                    with open(temp_file_name, "rb") as file:
+                        os.fsync(file.fileno())
+                os.replace(temp_file_name, file_name)
+            except BaseException:
+                os.remove(temp_file_name)
+                raise
+        if os.path.exists(file_name + JOURNAL_SUFFIX):
+            os.remove(file_name + JOURNAL_SUFFIX)
+
+    @staticmethod
+    def get_snapshot_key(file_name: str) -> dict:
+        """ This function describes the current contents of a ratings file and its save journal
+
+        The size and modification time rule out most changes without reading the file, and the
+        hash catches changes that keep both, such as two saves within the same clock tick.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of the ratings file
+        :return: dictionary with the files, sizes, mtimes, and hash keys
+        """
+        names = [name for name in (file_name, file_name + JOURNAL_SUFFIX) if os.path.exists(name)]
+        stats = [os.stat(name) for name in names]
+        return {"files": [os.path.basename(name) for name in names],
+                "sizes": [stat.st_size for stat in stats],
+                "mtimes": [stat.st_mtime_ns for stat in stats],
+                "hash": FileProcessor.hash_files(names)}
+
+    @staticmethod
+    def hash_files(file_names: list) -> str:
+        """ This function hashes the contents of files in order
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_names: list of file names
+        :return: hex digest of the contents
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for file_name in file_names:
+            with open(file_name, "rb") as file:
+                while chunk := file.read(HASH_CHUNK_SIZE):
+                    digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def write_employee_snapshot(file_name: str, employee_table, snapshot_key: dict = None):
+        """ This function writes the validated columns of an EmployeeTable as the startup snapshot of a ratings file
+
+        Each distinct name is stored once, and the columns are stored as packed arrays, so loading the
+        snapshot needs no parsing or validation. The snapshot is replaced atomically. It is only a
+        cache, so it is not flushed to disk, and a snapshot cut short by a crash is just not used.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Keep the permissions of an earlier snapshot
+
+        :param file_name: string data with name of the ratings file the table holds
+        :param employee_table: an EmployeeTable with every row of the file
+        :param snapshot_key: the get_snapshot_key of the file when it was read, or None to describe it now
+        :return: None
+        """
+        try:
+            snapshot_key = snapshot_key or FileProcessor.get_snapshot_key(file_name)
+            name_ids: dict = {}
+            first_ids = array("i", [name_ids.setdefault(name, len(name_ids)) for name in employee_table.first_names])
+            last_ids = array("i", [name_ids.setdefault(name, len(name_ids)) for name in employee_table.last_names])
+            sections = ["\n".join(name_ids).encode("utf-8"), first_ids.tobytes(), last_ids.tobytes(),
+                        employee_table.review_dates.tobytes(), employee_table.review_ratings.tobytes()]
+            metadata = json.dumps({"key": snapshot_key, "byteorder": sys.byteorder, "rows": len(employee_table),
+                                   "names": len(name_ids), "sections": [len(section) for section in sections]})
+            metadata = metadata.encode("utf-8")
+            snapshot_file_name = file_name + SNAPSHOT_SUFFIX
+            temp_file_name = FileProcessor.create_temp_file(snapshot_file_name)
+            try:
+                with open(temp_file_name, "wb") as file:
+                    file.write(SNAPSHOT_HEADER.pack(SNAPSHOT_SIGNATURE, SNAPSHOT_VERSION, len(metadata)))
+                    file.write(metadata)
+                    file.writelines(sections)
+                os.replace(temp_file_name, snapshot_file_name)
+            except BaseException:
+                os.remove(temp_file_name)
+                raise
+        except Exception as e:
+            pres.IO.output_error_messages("There was a problem writing the startup snapshot!", e)
+
+    @staticmethod
+    def delete_employee_snapshot(file_name: str):
+        """ This function deletes the startup snapshot of a ratings file, if it has one
+
+        A table that does not hold the whole file must not replace the snapshot, but after a save
+        an earlier snapshot no longer describes the file either.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of the ratings file
+        :return: None
+        """
+        try:
+            os.remove(file_name + SNAPSHOT_SUFFIX)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            pres.IO.output_error_messages("There was a problem deleting the startup snapshot!", e)
+
+    @staticmethod
+    def read_employee_snapshot(file_name: str, employee_table, snapshot_key: dict = None) -> bool:
+        """ This function fills an EmployeeTable from the startup snapshot of a ratings file, if it still matches
+
+        A missing, outdated, or damaged snapshot is ignored, so the caller reads the file instead.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of the ratings file
+        :param employee_table: an empty EmployeeTable to fill
+        :param snapshot_key: the get_snapshot_key of the file, or None to describe it now
+        :return: True if the table was filled from the snapshot
+        """
+        try:
+            with open(file_name + SNAPSHOT_SUFFIX, "rb") as file:
+                signature, version, metadata_size = SNAPSHOT_HEADER.unpack(file.read(SNAPSHOT_HEADER.size))
+                if signature != SNAPSHOT_SIGNATURE or version != SNAPSHOT_VERSION:
+                    return False
+                metadata = json.loads(file.read(metadata_size))
+                if metadata["byteorder"] != sys.byteorder:
+                    return False
+                if metadata["key"] != (snapshot_key or FileProcessor.get_snapshot_key(file_name)):
+                    return False
+                sections = [file.read(size) for size in metadata["sections"]]
+            if [len(section) for section in sections] != metadata["sections"]:
+                return False  # the snapshot was cut short
+            names = [sys.intern(name) for name in str(sections[0], "utf-8").split("\n")] if metadata["names"] else []
+            columns = [array("i"), array("i"), array("i"), array("b")]
+            for column, section in zip(columns, sections[1:]):
+                column.frombytes(section)
+            if len(names) != metadata["names"] or any(len(column) != metadata["rows"] for column in columns):
+                return False
+            employee_table.extend_columns([names[name_id] for name_id in columns[0]],
+                                          [names[name_id] for name_id in columns[1]], columns[2], columns[3])
+            return True
+        except (OSError, ValueError, KeyError, TypeError, IndexError, struct.error):
+            return False
+
+    @staticmethod
+    def external_sort(items, key, max_items_in_memory: int, temp_dir: str):
+        """ This function sorts json-serializable items that may not fit in memory
+
+        Items are sorted in memory max_items_in_memory at a time. When there is more than one such
+        run, each run is spilled to a json lines file in temp_dir and the runs are merged as a stream.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param items: iterable of json-serializable items
+        :param key: function that gets the sort key of an item
+        :param max_items_in_memory: largest number of items to hold in memory
+        :param temp_dir: directory for the spilled runs
+        :return: generator of the items in sorted order
+        """
+        items = iter(items)
+        run_file_names: list = []
+        while run := list(islice(items, max_items_in_memory)):
+            run.sort(key=key)
+            if not run_file_names and len(run) < max_items_in_memory:
+                yield from run  # everything fit in one run, so nothing needs to be spilled
+                return
+            run_file_name = os.path.join(temp_dir, f"run{len(run_file_names)}.jsonl")
+            with open(run_file_name, "w") as file:
+                file.writelines(json.dumps(item) + "\n" for item in run)
+            run_file_names.append(run_file_name)
+            del run
+
+        def read_run(run_file_name: str):
+            with open(run_file_name, "r") as run_file:
+                for line in run_file:
+                    yield json.loads(line)
+            os.remove(run_file_name)
+
+        yield from heapq.merge(*[read_run(run_file_name) for run_file_name in run_file_names], key=key)
+
+    @staticmethod
+    def get_review_key(record: dict) -> tuple:
+        """ This function gets the key that identifies one review in a dictionary row
+
+        The review date is compared as a date ordinal, like EmployeeIndex does, so every accepted
+        form of the same day gives the same key. A date that cannot be read is compared as written.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Compare the review date as a date ordinal
+
+        :param record: dictionary row
+        :return: tuple of the title case last name, title case first name, review date ordinal (0 if the date
+                 cannot be read), and the review date as written if it cannot be read
+        """
+        review_date = record["ReviewDate"]
+        try:
+            review_ordinal, unread_date = date.fromisoformat(review_date).toordinal(), ""
+        except (TypeError, ValueError):
+            review_ordinal, unread_date = 0, str(review_date)
+        return record["LastName"].title(), record["FirstName"].title(), review_ordinal, unread_date
+
+    @staticmethod
+    def deduplicate_employee_file(file_name: str, backend_name: str = None,
+                                  max_rows_in_memory: int = DEDUP_MEMORY_ROWS) -> tuple:
+        """ This function rewrites a ratings file keeping only the last row of each review key
+
+        The rows are streamed with bounded memory: they are sorted by review key with an external
+        sort, duplicates are dropped as they stream past, and the survivors are sorted back into
+        file order before the file is replaced atomically. Later rows win, just like upserts.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Give each sort pass its own spill directory
+
+        :param file_name: string data with name of the ratings file
+        :param backend_name: name of the storage format, or None to go by the file extension
+        :param max_rows_in_memory: largest number of rows to sort in memory at once
+        :return: tuple of the number of rows read and the number of rows written
+        """
+        counts: list = [0, 0]
+        review_key = FileProcessor.get_review_key
+
+        def numbered_records():
+            for number, record in enumerate(FileProcessor.iter_file_records(file_name, backend_name)):
+                counts[0] += 1
+                yield [number, record]
+
+        def last_of_each_key(items):
+            previous = None
+            for item in items:
+                if previous is not None and review_key(item[1]) != review_key(previous[1]):
+                    yield previous
+                previous = item
+            if previous is not None:
+                yield previous
+
+        def kept_records(items):
+            for _, record in items:
+                counts[1] += 1
+                yield record
+
+        directory = os.path.dirname(os.path.abspath(file_name))
+        with tempfile.TemporaryDirectory(dir=directory) as temp_dir:
+            # Each sort spills to its own directory, since both read their runs while the second one writes
+            by_key = FileProcessor.external_sort(numbered_records(), lambda item: (review_key(item[1]), item[0]),
+                                                 max_rows_in_memory, tempfile.mkdtemp(dir=temp_dir))
+            in_file_order = FileProcessor.external_sort(last_of_each_key(by_key), itemgetter(0),
+                                                        max_rows_in_memory, tempfile.mkdtemp(dir=temp_dir))
+            FileProcessor.replace_file_records(file_name, kept_records(in_file_order), backend_name)
+        return counts[0], counts[1]
+
+    @staticmethod
+    def find_shard_files(path: str, backend_name: str = None) -> list:
+        """ This function finds the rating files of a directory or a glob pattern
+
+        Without a storage format, only files with the extension of a storage format are picked.
+        Journals are never picked, since they are read with the file they belong to.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param path: a directory, or a glob pattern such as "ratings/*.jsonl"
+        :param backend_name: name of the storage format of every file, or None to go by each file extension
+        :return: sorted list of file names
+        """
+        file_names = glob.glob(os.path.join(path, "*") if os.path.isdir(path) else path)
+        return sorted(name for name in file_names
+                      if os.path.isfile(name) and not name.endswith(JOURNAL_SUFFIX)
+                      and (backend_name or storage.StorageBackend.is_ratings_file_name(name)))
+
+    @staticmethod
+    def read_shard_data(file_name: str, backend_name: str = None) -> tuple:
+        """ This function reads the bytes of a shard file, so they can be parsed in another process
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of file to read from
+        :param backend_name: name of the storage format, or None to go by the file extension
+        :return: tuple of the bytes, or None for a format that is read by name, and the seconds taken
+        """
+        start = time.perf_counter()
+        data = None
+        if hasattr(storage.StorageBackend.for_file_name(file_name, backend_name), "iter_file_records"):
+            with open(file_name, "rb") as file:
+                data = file.read()
+        return data, time.perf_counter() - start
+
+    @staticmethod
+    def parse_shard(file_name: str, data, employee_type: object, backend_name: str = None,
+                    sort_by_date: bool = False) -> tuple:
+        """ This function parses and validates the rows of a shard file, including rows saved to its journal
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of the file
+        :param data: the bytes of the file from read_shard_data, or None to read the file by name
+        :param employee_type: an reference to the Employee class
+        :param backend_name: name of the storage format, or None to go by the file extension
+        :param sort_by_date: True to sort the rows by review date, keeping rows of one date in file order
+        :return: tuple of the list of employee objects and the seconds taken
+        """
+        start = time.perf_counter()
+        if data is None:
+            records = FileProcessor.iter_file_records(file_name, backend_name)
+        else:
+            records = storage.StorageBackend.iter_data_records(file_name, data, backend_name)
+            backend = storage.StorageBackend.for_file_name(file_name, backend_name)
+            if backend is storage.JsonBackend and os.path.exists(file_name + JOURNAL_SUFFIX):
+                records = chain(records, FileProcessor.iter_journal_records(file_name))
+        employee_list: list = []
+        while batch := list(islice(records, RECORD_BATCH_SIZE)):
+            employee_list.extend(employee_type.from_records(batch))
+        if sort_by_date:
+            employee_list.sort(key=attrgetter("review_ordinal"))
+        return employee_list, time.perf_counter() - start
+
+    @staticmethod
+    def read_employee_shards(path: str, employee_data: list, employee_type: object, backend_name: str = None,
+                             workers: int = None, merge_by_date: bool = False, shard_timings: list = None):
+        """ This function reads the rating files of a directory or glob pattern into one list of employees
+
+        Threads read the files from disk, and each file is handed to a worker process to be parsed
+        and validated as soon as it has been read. A file with an invalid row is reported and left
+        out, and the other files are still loaded.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Import the worker pools only when they are used
+
+        :param path: a directory, or a glob pattern such as "ratings/*.jsonl"
+        :param employee_data: list of employee objects to be filled with the files' data
+        :param employee_type: an reference to the Employee class
+        :param backend_name: name of the storage format of every file, or None to go by each file extension
+        :param workers: number of worker processes, or None for one per CPU, 1 to parse in this process
+        :param merge_by_date: True to add the rows in review date order, else file by file in file name order
+        :param shard_timings: list to add a dictionary per file to, with the file, bytes, rows,
+                              read_seconds, and parse_seconds keys, and an error key for a file that failed
+        :return: list
+        """
+        file_names = FileProcessor.find_shard_files(path, backend_name)
+        if not file_names:
+            pres.IO.output_error_messages("There are no rating files at " + path, FileNotFoundError(path))
+            return employee_data
+        workers = workers or os.cpu_count() or 1
+        timings: dict = {file_name: {"file": file_name} for file_name in file_names}
+        parses: dict = {}
+        shard_lists: list = []
+
+        def report_error(file_name: str, error: Exception):
+            timings[file_name]["error"] = f"{type(error).__name__}: {error}"
+            pres.IO.output_error_messages(f"There was a problem reading {file_name}!", error)
+
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed  # slow to import
+        with ExitStack() as stack:
+            threads = stack.enter_context(ThreadPoolExecutor(max_workers=min(SHARD_READ_THREADS, len(file_names))))
+            if workers == 1 or len(file_names) == 1:
+                parsers = stack.enter_context(ThreadPoolExecutor(max_workers=1))  # parses while later files are read
+            else:
+                parsers = stack.enter_context(ProcessPoolExecutor(max_workers=min(workers, len(file_names))))
+            reads = {threads.submit(FileProcessor.read_shard_data, file_name, backend_name): file_name
+                     for file_name in file_names}
+            for read in as_completed(reads):
+                file_name = reads[read]
+                try:
+                    data, timings[file_name]["read_seconds"] = read.result()
+                except Exception as e:
+                    report_error(file_name, e)
+                    continue
+                timings[file_name]["bytes"] = os.path.getsize(file_name) if data is None else len(data)
+                parses[file_name] = parsers.submit(FileProcessor.parse_shard, file_name, data, employee_type,
+                                                   backend_name, merge_by_date)
+                del data
+            for file_name in file_names:
+                if file_name not in parses:
+                    continue
+                try:
+                    employee_list, timings[file_name]["parse_seconds"] = parses.pop(file_name).result()
+                except Exception as e:
+                    report_error(file_name, e)
+                    continue
+                timings[file_name]["rows"] = len(employee_list)
+                met.Metrics.count("rows_accepted", len(employee_list))
+                met.Metrics.count("bytes_read", timings[file_name]["bytes"])
+                shard_lists.append(employee_list)
+
+        if merge_by_date:
+            # Each file's rows come back sorted, so a k-way merge puts them all in order.
+            employee_data.extend(heapq.merge(*shard_lists, key=attrgetter("review_ordinal")))
+        else:
+            for employee_list in shard_lists:
+                employee_data.extend(employee_list)
+        if shard_timings is not None:
+            shard_timings.extend(timings[file_name] for file_name in file_names)
+        return employee_data
+
+    @staticmethod
+    def iter_merged_records(record_streams: list, max_rows_in_memory: int, temp_dir: str):
+        """ This function merges streams of valid dictionary rows into one stream in review date order
+
+        Each stream is sorted with external_sort, with an equal share of max_rows_in_memory, so a
+        stream that does not fit its share spills sorted runs to temp_dir. Rows with the same
+        review date stay in stream order.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param record_streams: list of iterables of dictionary rows with YYYY-MM-DD review dates
+        :param max_rows_in_memory: largest number of rows to hold in memory for sorting
+        :param temp_dir: directory for the spilled runs
+        :return: generator of dictionary rows
+        """
+        key = itemgetter("ReviewDate")
+        rows_per_stream = max(1, max_rows_in_memory // max(1, len(record_streams)))
+        sorted_streams = [FileProcessor.external_sort(records, key, rows_per_stream, tempfile.mkdtemp(dir=temp_dir))
+                          for records in record_streams]
+        yield from heapq.merge(*sorted_streams, key=key)
+
+
+class AutoSaver:
+    """
+    Saves an EmployeeTable to its file from a background thread, so saving never holds up the menu
+
+    Call changed after changing the table. The thread saves every change made so far once interval
+    seconds have passed since the first unsaved one, or as soon as max_rows rows were changed or
+    added, so a burst of changes costs one write. Each save writes a copy of the table made by
+    EmployeeTable.copy through write_employee_data_to_file, so only the added rows are appended and
+    only the changed rows patched, and the file is only replaced atomically when they cannot be.
+    A change made while saving stays unsaved for the next save, never lost. flush saves right away,
+    and stop ends the thread with a last flush.
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created Class
+    AdamSavage,20261018,Save only the changed and added rows
+    """
+
+    def __init__(self, file_name: str, employee_table, backend_name: str = None,
+                 interval: float = AUTOSAVE_INTERVAL, max_rows: int = AUTOSAVE_ROWS, fsync: bool = True,
+                 snapshot: bool = False, saved: bool = True):
+        """ This function prepares the autosave of an EmployeeTable, without starting its thread
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of file to save to
+        :param employee_table: the EmployeeTable to save
+        :param backend_name: name of the storage format, or None to go by the file extension
+        :param interval: seconds to wait after the first unsaved change, 0 to save after every change
+        :param max_rows: changed or added rows that start a save before the interval has passed
+        :param fsync: True to flush each save to disk before it replaces the file
+        :param snapshot: True to write the startup snapshot of the file after each save, False to delete
+                         an earlier snapshot instead, such as when the table does not hold the whole file
+        :param saved: True if the file already holds the rows of the table, False to save them all
+        """
+        self.file_name = file_name
+        self.employee_table = employee_table
+        self.backend_name = backend_name
+        self.interval = interval
+        self.max_rows = max_rows
+        self.fsync = fsync
+        self.snapshot = snapshot
+        self.wakeup = threading.Condition()  # notified by changed and stop
+        self.save_lock = threading.Lock()  # one save at a time, from the thread or from flush
+        self.dirty_since = None  # time.monotonic() of the first change not yet picked up by a save
+        self.saved_row_count = len(employee_table) if saved else None  # None rewrites the whole file
+        self.save_count: int = 0
+        self.stopping: bool = False
+        self.thread = None
+        if saved:
+            employee_table.mark_saved()
+        else:
+            self.dirty_since = time.monotonic()
+
+    def start(self):
+        """ This function starts the autosave thread
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :return: None
+        """
+        self.thread = threading.Thread(target=self.run, name="autosave", daemon=True)
+        self.thread.start()
+
+    def changed(self):
+        """ This function tells the autosave thread that the table changed
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :return: None
+        """
+        with self.wakeup:
+            if self.dirty_since is None:
+                self.dirty_since = time.monotonic()
+            self.wakeup.notify()
+
+    def get_wait_seconds(self):
+        """ This function gets how long the thread can wait before the next save is due
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :return: seconds to wait, 0 if a save is due, or None to wait for a change
+        """
+        if self.dirty_since is None:
+            return None
+        employee_table = self.employee_table
+        unsaved_rows = max(len(employee_table) - (self.saved_row_count or 0), 0) + len(employee_table.changed_rows)
+        if unsaved_rows >= self.max_rows:
+            return 0
+        return max(self.dirty_since + self.interval - time.monotonic(), 0)
+
+    def run(self):
+        """ This function saves the table whenever a save is due, until stop is called
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :return: None
+        """
+        while True:
+            with self.wakeup:
+                while not self.stopping and (wait_seconds := self.get_wait_seconds()) != 0:
+                    self.wakeup.wait(wait_seconds)
+                if self.stopping:
+                    return
+                self.dirty_since = None
+            self.flush()
+
+    def flush(self) -> int:
+        """ This function saves every change made to the table so far, in the calling thread
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Write only the changed and added rows of the copy
+        AdamSavage,20261018,Delete the startup snapshot after a save when snapshot is False
+
+        :return: number of rows written, 0 if nothing changed, or None if the data could not be saved
+        """
+        with self.save_lock:
+            employee_table = self.employee_table
+            if not employee_table.is_dirty():
+                return 0
+            table_copy = employee_table.copy()
+            saved_rows = set(table_copy.changed_rows)  # the save clears the changed rows of the copy
+            rows_written = FileProcessor.write_employee_data_to_file(self.file_name, table_copy, self.backend_name,
+                                                                     start_row=self.saved_row_count, fsync=self.fsync)
+            if rows_written is None:
+                return None  # the error was already shown
+            employee_table.mark_copy_saved(table_copy, saved_rows)
+            self.saved_row_count = len(table_copy)
+            self.save_count += 1
+            if rows_written:
+                if self.snapshot:
+                    FileProcessor.write_employee_snapshot(self.file_name, table_copy)
+                else:
+                    FileProcessor.delete_employee_snapshot(self.file_name)
+            return rows_written
+
+    def stop(self) -> int:
+        """ This function ends the autosave thread, then saves the changes it had not saved yet
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :return: number of rows written by the last flush, 0 if nothing changed, or None if it failed
+        """
+        with self.wakeup:
+            self.stopping = True
+            self.wakeup.notify()
+        if self.thread is not None:
+            self.thread.join()
+        return self.flush()
+
+
+class LazyEmployeeData:
+    """
+    A list-like collection of the employees in a ratings file that reads rows only when they are used
+
+    Opening it costs the same for any file size. For json lines and binary files the file is
+    memory mapped and the offset of each record is indexed as rows are first reached, so getting
+    a row reads only that record. Other formats are read in full the first time a row is used.
+    Rows appended to the collection are kept in added_rows, which is what a save needs to write,
+    so entering a rating and saving never reads the file's rows at all.
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created Class
+    AdamSavage,20261018,Added mark_saved, so saved rows become file rows instead of being counted twice
+    """
+
+    def __init__(self, file_name: str, employee_type: object, backend_name: str = None, added_rows: list = None):
+        """ This function opens a ratings file without reading its rows
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of file to read from, a missing file has no rows
+        :param employee_type: an reference to the Employee class
+        :param backend_name: name of the storage format, or None to go by the file extension
+        :param added_rows: list to hold the rows appended to the collection
+        """
+        self.file_name = file_name
+        self.employee_type = employee_type
+        self.backend_name = backend_name
+        self.backend = storage.StorageBackend.for_file_name(file_name, backend_name)
+        self.added_rows = [] if added_rows is None else added_rows
+        self.resources = ExitStack()
+        self.open_file()
+
+    def open_file(self):
+        """ This function maps the file, or notes that its rows are read when first used, without reading them
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :return: None
+        """
+        self.can_index: bool = self.backend.can_index and storage.StorageBackend.can_map(self.file_name)
+        self.buffer = b""
+        self.offsets: array = array("q")  # offset of each file row indexed so far
+        self.offset_scanner = None  # generator of the offsets not indexed yet, None once they all are
+        self.file_rows = None  # every file row, for formats that cannot be indexed
+        if os.path.exists(self.file_name):
+            if self.can_index:
+                self.buffer = self.resources.enter_context(storage.StorageBackend.map_file(self.file_name))
+                self.offset_scanner = self.backend.iter_buffer_offsets(self.buffer)
+        else:
+            self.file_rows = []
+
+    def mark_saved(self):
+        """ This function makes the added rows file rows, once a save has written them to the file
+
+        The file is opened again, so its rows are counted afresh and include the saved rows.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :return: None
+        """
+        self.added_rows.clear()  # cleared in place, since the caller may save this same list
+        self.close()
+        self.open_file()
+
+    def close(self):
+        """ This function releases the memory map of the file
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :return: None
+        """
+        self.resources.close()
+
+    def count_file_rows(self, at_least: int = None) -> int:
+        """ This function indexes file rows until at_least rows are known, or every row if at_least is None
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param at_least: number of rows that are needed, or None to count them all
+        :return: number of file rows known, which is less than at_least only when the file has fewer rows
+        """
+        if not self.can_index or self.file_rows is not None:
+            if self.file_rows is None:
+                self.file_rows = FileProcessor.read_employee_data_from_file(self.file_name, [], self.employee_type,
+                                                                            self.backend_name)
+            return len(self.file_rows)
+        offsets = self.offsets
+        if self.offset_scanner is not None and (at_least is None or len(offsets) < at_least):
+            wanted = None if at_least is None else at_least - len(offsets)
+            known = len(offsets)
+            offsets.extend(islice(self.offset_scanner, wanted))
+            if wanted is None or len(offsets) - known < wanted:
+                self.offset_scanner = None
+        return len(offsets)
+
+    def read_file_rows(self, start: int, end: int) -> list:
+        """ This function builds the employee objects of a range of file rows
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param start: position of the first row
+        :param end: position after the last row, no more than count_file_rows(end)
+        :return: list of employee objects
+        """
+        if start >= end:
+            return []
+        if self.file_rows is not None:
+            return self.file_rows[start:end]
+        records = islice(self.backend.iter_buffer_records(self.buffer, self.offsets[start]), end - start)
+        return self.employee_type.from_records(records)
+
+    def __len__(self):
+        """ This function counts the rows, indexing every file row the first time
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :return: number of file rows and added rows
+        """
+        return self.count_file_rows() + len(self.added_rows)
+
+    def __getitem__(self, index: int):
+        """ This function builds the employee object of one row
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param index: position of the row, negative values count from the end
+        :return: the employee object
+        """
+        if index < 0:
+            index += len(self)
+        if 0 <= index < self.count_file_rows(index + 1):
+            return self.read_file_rows(index, index + 1)[0]
+        added_index = index - self.count_file_rows()
+        if not 0 <= added_index < len(self.added_rows):
+            raise IndexError("LazyEmployeeData index out of range")
+        return self.added_rows[added_index]
+
+    def __iter__(self):
+        """ This function yields the employee objects of every row, building file rows a batch at a time
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :return: generator of employee objects
+        """
+        start = 0
+        while start < (available := self.count_file_rows(start + RECORD_BATCH_SIZE)):
+            end = min(start + RECORD_BATCH_SIZE, available)
+            yield from self.read_file_rows(start, end)
+            start = end
+        yield from self.added_rows
+
+    def append(self, employee):
+        """ This function adds a row without reading the file
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param employee: the employee object to add
+        :return: None
+        """
+        self.added_rows.append(employee)
+
+    def extend(self, employee_data):
+        """ This function adds rows without reading the file
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param employee_data: iterable of employee objects
+        :return: None
+        """
+        self.added_rows.extend(employee_data)
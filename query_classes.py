@@ -0,0 +1,387 @@
+# ------------------------------------------------------------------------------------------------- #
+# Title: query_classes.py
+# Description: The module of query classes over loaded employee rating data
+# ChangeLog: (Who, When, What)
+# AdamSavage,20261018,Created module
+# AdamSavage,20261018,Added the review key index and upserts
+# AdamSavage,20261018,Read review dates as ordinals from Employee.review_ordinal
+# AdamSavage,20261018,Insert a few new pairs into the sorted indexes instead of sorting them again
+# AdamSavage,20261018,Added EmployeeOrdering for sorted and top N displays
+# ------------------------------------------------------------------------------------------------- #
+
+import heapq
+from array import array
+from bisect import bisect_left, insort
+from datetime import date
+from itertools import compress, islice
+from operator import attrgetter
+
+RATINGS: tuple = (1, 2, 3, 4, 5)
+INSERT_RATIO: int = 64  # new pairs are inserted one by one while there are this many times more sorted pairs
+SORT_KEYS: tuple = ("last_name", "first_name", "review_date", "review_rating")
+SORT_ATTRIBUTES: dict = {"last_name": ("last_name", "first_name"),  # employee attributes each sort key compares
+                         "first_name": ("first_name", "last_name"),
+                         "review_date": ("review_ordinal",),
+                         "review_rating": ("review_rating",)}
+MAX_CACHED_ORDERS: int = 16  # orders kept per data version, the oldest is dropped first
+
+
+class EmployeeIndex:
+    """
+    Indexes over a list of employee objects for fast lookups
+
+    The index keeps a hash index on (last name, first name), a hash index on the review key
+    (last name, first name, review date), a sorted index on review date, and a sorted review date
+    index per rating. Rows appended to the list, for example by IO.input_employee_data, are added
+    to the indexes the next time a query runs.
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created Class
+    AdamSavage,20261018,Added the review key index and upserts
+    """
+
+    def __init__(self, employee_data: list):
+        """ This function builds the indexes over a list of employee objects
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param employee_data: list of employee objects to index
+        """
+        self.employee_data = employee_data
+        self.indexed_count: int = 0
+        self.by_name: dict = {}  # (last name, first name) -> row positions in row order
+        self.by_key: dict = {}  # (last name, first name, review date ordinal) -> last row position with that key
+        self.by_date: list = []  # sorted (review date ordinal, row position) pairs
+        self.by_rating: dict = {rating: [] for rating in RATINGS}  # rating -> sorted (ordinal, row) pairs
+        self.update_count: int = 0  # rows changed in place by upsert, which an append-only save would miss
+        self.pending_keys: dict = {}  # review key -> row position of rows upserted since the last refresh
+        self.refresh()
+
+    def refresh(self):
+        """ This function adds rows appended to the list since the last refresh to the indexes
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :return: None
+        """
+        employee_data = self.employee_data
+        row_count = len(employee_data)
+        if row_count < self.indexed_count:  # the list was cleared or shortened, so start over
+            self.indexed_count = 0
+            self.by_name.clear()
+            self.by_key.clear()
+            self.by_date.clear()
+            for rating_index in self.by_rating.values():
+                rating_index.clear()
+        if row_count == self.indexed_count:
+            return
+
+        new_by_date: list = []
+        new_by_rating: dict = {rating: [] for rating in RATINGS}
+        by_name = self.by_name
+        by_key = self.by_key
+        start = self.indexed_count
+        if hasattr(employee_data, "review_dates"):  # an EmployeeTable, so read its columns directly
+            rows = zip(range(start, row_count), employee_data.first_names[start:], employee_data.last_names[start:],
+                       employee_data.review_dates[start:], employee_data.review_ratings[start:])
+        else:
+            rows = ((row, employee_data[row].first_name, employee_data[row].last_name,
+                     employee_data[row].review_ordinal, employee_data[row].review_rating)
+                    for row in range(start, row_count))
+        for row, first_name, last_name, ordinal, review_rating in rows:
+            by_name.setdefault((last_name, first_name), []).append(row)
+            by_key[(last_name, first_name, ordinal)] = row
+            new_by_date.append((ordinal, row))
+            new_by_rating[review_rating].append((ordinal, row))
+
+        EmployeeIndex.merge_sorted(self.by_date, new_by_date)
+        for rating in RATINGS:
+            EmployeeIndex.merge_sorted(self.by_rating[rating], new_by_rating[rating])
+        self.indexed_count = row_count
+        self.pending_keys.clear()
+
+    @staticmethod
+    def merge_sorted(sorted_pairs: list, new_pairs: list):
+        """ This function adds pairs to a sorted list of pairs, keeping it sorted
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param sorted_pairs: sorted list to add to
+        :param new_pairs: pairs to add
+        :return: None
+        """
+        if len(new_pairs) * INSERT_RATIO < len(sorted_pairs):  # a few pairs, as between queries of the service
+            for pair in new_pairs:
+                insort(sorted_pairs, pair)
+        elif new_pairs:
+            sorted_pairs.extend(new_pairs)
+            sorted_pairs.sort()  # Timsort merges the two sorted runs in about linear time
+
+    @staticmethod
+    def slice_by_date(sorted_pairs: list, since: str = None, until: str = None) -> list:
+        """ This function gets the row positions of the pairs reviewed within a date range
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param sorted_pairs: sorted (review date ordinal, row position) pairs
+        :param since: first YYYY-MM-DD date to include, or None for no lower bound
+        :param until: last YYYY-MM-DD date to include, or None for no upper bound
+        :return: list of row positions in review date order
+        """
+        start = 0 if since is None else bisect_left(sorted_pairs, (date.fromisoformat(since).toordinal(), -1))
+        end = len(sorted_pairs) if until is None else \
+            bisect_left(sorted_pairs, (date.fromisoformat(until).toordinal() + 1, -1))
+        return [row for _, row in sorted_pairs[start:end]]
+
+    def rows(self, positions: list) -> list:
+        """ This function gets the employee objects at row positions
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param positions: list of row positions
+        :return: list of employee objects
+        """
+        employee_data = self.employee_data
+        return [employee_data[row] for row in positions]
+
+    def find_by_name(self, first_name: str, last_name: str) -> list:
+        """ This function finds every review of one employee
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param first_name: the employee's first name, in any letter case
+        :param last_name: the employee's last name, in any letter case
+        :return: list of employee objects in row order
+        """
+        self.refresh()
+        return self.rows(self.by_name.get((last_name.title(), first_name.title()), []))
+
+    def latest_review(self, first_name: str, last_name: str):
+        """ This function finds the most recent review of one employee
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param first_name: the employee's first name, in any letter case
+        :param last_name: the employee's last name, in any letter case
+        :return: the employee object of the latest review, or None if there are no reviews
+        """
+        self.refresh()
+        positions = self.by_name.get((last_name.title(), first_name.title()))
+        if not positions:
+            return None
+        employee_data = self.employee_data
+        ordinals = getattr(employee_data, "review_dates", None)
+        if ordinals is not None:
+            latest_row = max(positions, key=ordinals.__getitem__)
+        else:
+            latest_row = max(positions, key=lambda row: employee_data[row].review_date)  # ISO dates sort as text
+        return employee_data[latest_row]
+
+    def find_by_date(self, since: str = None, until: str = None) -> list:
+        """ This function finds the reviews within a date range
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param since: first YYYY-MM-DD date to include, or None for no lower bound
+        :param until: last YYYY-MM-DD date to include, or None for no upper bound
+        :return: list of employee objects in review date order
+        """
+        self.refresh()
+        return self.rows(EmployeeIndex.slice_by_date(self.by_date, since, until))
+
+    def find_by_rating(self, review_rating: int, since: str = None, until: str = None) -> list:
+        """ This function finds the reviews with one rating, optionally within a date range
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param review_rating: the review rating to find (1-5)
+        :param since: first YYYY-MM-DD date to include, or None for no lower bound
+        :param until: last YYYY-MM-DD date to include, or None for no upper bound
+        :return: list of employee objects in review date order
+        """
+        self.refresh()
+        return self.rows(EmployeeIndex.slice_by_date(self.by_rating.get(review_rating, []), since, until))
+
+    def upsert(self, employee) -> bool:
+        """ This function adds a review, or updates the rating of the review with the same key
+
+        The review key is (last name, first name, review date), so entering or importing the same
+        review again changes nothing, and a new rating for it replaces the old one in place. Each
+        upsert is a hash lookup; added rows join the sorted indexes together at the next query.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param employee: the employee object to add
+        :return: True if the review was added, False if an existing review was kept or updated
+        """
+        employee_data = self.employee_data
+        if len(employee_data) != self.indexed_count + len(self.pending_keys):  # rows were added elsewhere
+            self.refresh()
+        ordinal = employee.review_ordinal
+        key = (employee.last_name, employee.first_name, ordinal)
+        row = self.by_key.get(key)
+        is_pending = row is None
+        if is_pending:
+            row = self.pending_keys.get(key)
+        if row is None:
+            self.pending_keys[key] = len(employee_data)
+            employee_data.append(employee)
+            return True
+
+        existing = employee_data[row]
+        old_rating, new_rating = existing.review_rating, employee.review_rating
+        if old_rating != new_rating:
+            if not is_pending:  # pending rows are not in the rating index yet
+                rating_index = self.by_rating[old_rating]
+                del rating_index[bisect_left(rating_index, (ordinal, row))]
+                insort(self.by_rating[new_rating], (ordinal, row))
+            existing.review_rating = new_rating
+            self.update_count += 1
+        return False
+
+    def upsert_many(self, employee_data) -> tuple:
+        """ This function upserts several employee objects
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param employee_data: iterable of employee objects
+        :return: tuple of the number of reviews added and the number that already existed
+        """
+        added = 0
+        existed = 0
+        for employee in employee_data:
+            if self.upsert(employee):
+                added += 1
+            else:
+                existed += 1
+        return added, existed
+
+
+class EmployeeOrdering:
+    """
+    Orders of the rows of a list of employee objects by a sort key, for sorted and top N displays
+
+    An order is a list of row positions, so no employee objects are copied. A top N order is picked
+    with heapq.nsmallest or heapq.nlargest in O(n log N), and a full order is sorted once and kept
+    as an int array. Orders are cached until the data changes, and a top N of a key that already has
+    a cached full order is a slice of it. Rows that compare equal keep their row order.
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created Class
+    """
+
+    def __init__(self, employee_data: list):
+        """ This function prepares the orderings of a list of employee objects
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param employee_data: list of employee objects or an EmployeeTable
+        """
+        self.employee_data = employee_data
+        self.cache: dict = {}  # (sort key, descending, top, rating) -> row positions
+        self.cache_version = None
+
+    def data_version(self):
+        """ This function gets a value that changes whenever the data changes
+
+        An EmployeeTable counts its changes in its generation. A plain list only grows through
+        IO.input_employee_data and the loaders, so its length is used instead.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :return: the version value
+        """
+        return getattr(self.employee_data, "generation", None), len(self.employee_data)
+
+    def get_key_function(self, sort_key: str):
+        """ This function gets a function from a row position to the value that row sorts by
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param sort_key: one of SORT_KEYS
+        :return: the key function
+        """
+        if sort_key not in SORT_KEYS:
+            raise ValueError(f"Please choose a sort key from {', '.join(SORT_KEYS)}")
+        employee_data = self.employee_data
+        if hasattr(employee_data, "review_dates"):  # an EmployeeTable, so read its columns directly
+            if sort_key == "review_date":
+                return employee_data.review_dates.__getitem__
+            if sort_key == "review_rating":
+                return employee_data.review_ratings.__getitem__
+            first_names, last_names = employee_data.first_names, employee_data.last_names
+            if sort_key == "last_name":
+                return lambda row: (last_names[row], first_names[row])
+            return lambda row: (first_names[row], last_names[row])
+        get_value = attrgetter(*SORT_ATTRIBUTES[sort_key])
+        return lambda row: get_value(employee_data[row])
+
+    def get_rows(self, rating: int = None):
+        """ This function gets the row positions to order, optionally only those with one rating
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param rating: the review rating to keep (1-5), or None for every row
+        :return: iterable of row positions in row order
+        """
+        employee_data = self.employee_data
+        rows = range(len(employee_data))
+        if rating is None:
+            return rows
+        ratings = getattr(employee_data, "review_ratings", None)
+        if ratings is None:
+            ratings = (employee.review_rating for employee in employee_data)
+        return compress(rows, map(rating.__eq__, ratings))
+
+    def positions(self, sort_key: str = None, descending: bool = False, top: int = None, rating: int = None):
+        """ This function gets the row positions of the data in sorted order, or only the first top of them
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param sort_key: one of SORT_KEYS, or None to keep row order
+        :param descending: True to put the largest values first
+        :param top: number of rows to keep, or None for every row
+        :param rating: the review rating to keep (1-5), or None for every rating
+        :return: list or int array of row positions
+        """
+        top = None if top is None else max(top, 0)
+        version = self.data_version()
+        if version != self.cache_version:
+            self.cache.clear()
+            self.cache_version = version
+        cache_key = (sort_key, descending, top, rating)
+        order = self.cache.get(cache_key)
+        if order is not None:
+            return order
+
+        full_order = self.cache.get((sort_key, descending, None, rating))
+        if full_order is not None:
+            order = full_order[:top]
+        elif sort_key is None:
+            order = array("i", islice(self.get_rows(rating), top))
+        elif top is not None:
+            pick = heapq.nlargest if descending else heapq.nsmallest
+            order = pick(top, self.get_rows(rating), key=self.get_key_function(sort_key))
+        else:
+            order = array("i", sorted(self.get_rows(rating), key=self.get_key_function(sort_key),
+                                      reverse=descending))
+        if len(self.cache) >= MAX_CACHED_ORDERS:
+            del self.cache[next(iter(self.cache))]
+        self.cache[cache_key] = order
+        return order
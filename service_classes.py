@@ -0,0 +1,320 @@
+# ------------------------------------------------------------------------------------------------- #
+# Title: service_classes.py
+# Description: The module of service classes that serve employee rating data over a local socket
+# ChangeLog: (Who, When, What)
+# AdamSavage,20261018,Created module with the asyncio ratings service
+# AdamSavage,20261018,Save writes only the rows changed or added since the last save
+# AdamSavage,20261018,run_server falls back to SAVE_INTERVAL, since main.py no longer imports this module
+# AdamSavage,20261018,Saves write a copy of the data from a worker thread instead of blocking the event loop
+# ------------------------------------------------------------------------------------------------- #
+
+import asyncio
+import contextlib
+import json
+import analytics_classes as ana
+import data_classes as dat
+import processing_classes as proc
+import query_classes as query
+import storage_classes as storage
+
+SAVE_INTERVAL: float = 1.0  # seconds between saves of the rows added by clients, so writes are batched
+MAX_QUERY_ROWS: int = 1_000  # rows returned by a query when the client does not set a limit
+OPERATIONS: tuple = ("add", "query", "stats", "save")
+
+
+class RatingService:
+    """
+    A ratings service that keeps the employee data in memory and serves clients over a local socket
+
+    Clients send one JSON object per line and get one JSON object per line back, in order. Every
+    request has an "op" key, one of add, query, stats, or save. Every response has an "ok" key, and
+    an "error" key when ok is false. Requests are handled one at a time on the event loop, so they
+    never see half-applied changes, and added rows are saved together every SAVE_INTERVAL seconds.
+    A save writes a copy of the data from a worker thread, so clients are still answered while the
+    file is written, and save_lock keeps two saves from overlapping.
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created Class
+    AdamSavage,20261018,Save from a worker thread
+    """
+
+    def __init__(self, file_name: str, employee_data: list, employee_type: object, backend_name: str = None,
+                 save_interval: float = SAVE_INTERVAL):
+        """ This function prepares the service for a ratings file
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of the ratings file
+        :param employee_data: an EmployeeTable to keep the data in
+        :param employee_type: an reference to the Employee class
+        :param backend_name: storage format of the ratings file, or None to go by the file extension
+        :param save_interval: seconds between saves of added rows, 0 to save after every add
+        """
+        self.file_name = file_name
+        self.employee_data = employee_data
+        self.employee_type = employee_type
+        self.backend_name = backend_name
+        self.save_interval = save_interval
+        self.index = None
+        self.analytics = None
+        self.saved_row_count: int = 0
+        self.saved_update_count: int = 0
+        self.save_task = None
+        self.save_lock = asyncio.Lock()  # one save at a time, so a save never overlaps the write of another
+
+    def load(self):
+        """ This function loads the ratings file into memory
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :return: None
+        """
+        proc.FileProcessor.read_employee_data_from_file(self.file_name, self.employee_data, self.employee_type,
+                                                        self.backend_name)
+        self.index = query.EmployeeIndex(self.employee_data)
+        self.analytics = ana.RatingAnalytics(self.employee_data)
+        self.saved_row_count = len(self.employee_data)
+        self.saved_update_count = self.index.update_count
+
+    def is_dirty(self) -> bool:
+        """ This function checks for changes that are not saved yet
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :return: True if rows were added or updated since the last save
+        """
+        return len(self.employee_data) != self.saved_row_count or self.index.update_count != self.saved_update_count
+
+    async def save(self) -> bool:
+        """ This function saves the changes made by clients, writing only the rows changed or added since the last save
+
+        The rows are copied on the event loop and written from a worker thread, so requests keep being
+        answered during the write. A cancelled save still waits for its write to finish.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Save through write_employee_data_to_file with the rows saved so far
+        AdamSavage,20261018,Write a copy of the data from a worker thread, one save at a time
+
+        :return: True if every change was saved
+        """
+        async with self.save_lock:
+            table_copy = self.employee_data.copy()
+            saved_rows = set(table_copy.changed_rows)  # the write clears the changed rows of the copy
+            update_count = self.index.update_count
+            write = asyncio.ensure_future(asyncio.to_thread(
+                proc.FileProcessor.write_employee_data_to_file, self.file_name, table_copy, self.backend_name,
+                start_row=self.saved_row_count))
+            try:
+                await asyncio.shield(write)
+            finally:
+                rows_written = await write
+                if rows_written is not None:
+                    self.employee_data.mark_copy_saved(table_copy, saved_rows)
+                    self.saved_row_count, self.saved_update_count = len(table_copy), update_count
+            return rows_written is not None
+
+    async def save_later(self):
+        """ This function waits for the save interval and then saves, so adds that arrive meanwhile share one write
+
+        Changes made while the file is written are saved after another interval.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Save again for the changes made during a save
+
+        :return: None
+        """
+        try:
+            while True:
+                await asyncio.sleep(self.save_interval)
+                if not self.is_dirty() or not await self.save():  # a save request may have saved the changes
+                    break
+        finally:
+            self.save_task = None
+
+    def schedule_save(self):
+        """ This function starts a delayed save unless one is already waiting
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Also save in the background when the save interval is 0
+
+        :return: None
+        """
+        if self.save_task is None:
+            self.save_task = asyncio.get_running_loop().create_task(self.save_later())
+
+    def handle_add(self, request: dict) -> dict:
+        """ This function adds a review, or updates the rating of the same review, with the Employee validation
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param request: dictionary with the FirstName, LastName, ReviewDate, and ReviewRating keys
+        :return: response dictionary with an added key, False when an existing review was kept or updated
+        """
+        employee = self.employee_type.from_records([request])[0]
+        added = self.index.upsert(employee)
+        if self.is_dirty():
+            self.schedule_save()
+        return {"ok": True, "added": added}
+
+    def handle_query(self, request: dict) -> dict:
+        """ This function finds reviews by name, or by rating and review date range
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param request: dictionary with FirstName and LastName keys, or optional ReviewRating, since,
+                        and until keys, and an optional limit key
+        :return: response dictionary with the count of matching rows and the first limit rows
+        """
+        index = self.index
+        index.refresh()
+        if "FirstName" in request or "LastName" in request:
+            name = (request.get("LastName", "").title(), request.get("FirstName", "").title())
+            positions = index.by_name.get(name, [])
+        else:
+            pairs = index.by_date if "ReviewRating" not in request else index.by_rating[request["ReviewRating"]]
+            positions = index.slice_by_date(pairs, request.get("since"), request.get("until"))
+        # Only the returned rows are built, however many rows match.
+        rows = index.rows(positions[:request.get("limit", MAX_QUERY_ROWS)])
+        return {"ok": True, "count": len(positions), "rows": [storage.record_from_employee(row) for row in rows]}
+
+    def handle_stats(self, request: dict) -> dict:
+        """ This function gets the rating analytics summary
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param request: dictionary with an optional period key, "month" or "quarter"
+        :return: response dictionary with the rows and summary keys
+        """
+        return {"ok": True, "rows": len(self.employee_data),
+                "summary": self.analytics.summary(request.get("period", "quarter"))}
+
+    async def handle_save(self, request: dict) -> dict:
+        """ This function saves the changes made by clients right away
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Wait for the save without blocking the event loop
+
+        :param request: dictionary without other keys
+        :return: response dictionary with the rows key
+        """
+        if self.is_dirty() and not await self.save():
+            return {"ok": False, "error": "The data could not be saved"}
+        return {"ok": True, "rows": self.saved_row_count}
+
+    async def handle_request(self, request) -> dict:
+        """ This function runs one request and turns its errors into error responses
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Await the handlers that wait for a save
+
+        :param request: the decoded request
+        :return: the response dictionary
+        """
+        try:
+            operation = request.get("op") if isinstance(request, dict) else None
+            if operation not in OPERATIONS:
+                return {"ok": False, "error": f"Please choose an op from {', '.join(OPERATIONS)}"}
+            response = getattr(self, "handle_" + operation)(request)
+            return await response if asyncio.iscoroutine(response) else response
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+    async def handle_client(self, reader, writer):
+        """ This function answers the requests of one client until it disconnects
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Await handle_request
+
+        :param reader: the asyncio stream reader of the connection
+        :param writer: the asyncio stream writer of the connection
+        :return: None
+        """
+        decode = json.JSONDecoder().decode
+        try:
+            while line := await reader.readline():
+                try:
+                    request = decode(line.decode("utf-8"))
+                except ValueError as e:  # also catches JSONDecodeError and UnicodeDecodeError
+                    response = {"ok": False, "error": f"Invalid JSON: {e}"}
+                else:
+                    response = await self.handle_request(request)
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0, path: str = None):
+        """ This function starts listening on a TCP port or a Unix socket
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param host: host name or address to listen on with TCP
+        :param port: TCP port to listen on, 0 to pick a free port
+        :param path: path of a Unix socket to listen on instead of TCP
+        :return: the asyncio server
+        """
+        if path:
+            return await asyncio.start_unix_server(self.handle_client, path=path)
+        return await asyncio.start_server(self.handle_client, host, port)
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 0, path: str = None):
+        """ This function serves clients until the task is cancelled, then saves the unsaved changes
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Wait for a running save before the last one
+
+        :param host: host name or address to listen on with TCP
+        :param port: TCP port to listen on, 0 to pick a free port
+        :param path: path of a Unix socket to listen on instead of TCP
+        :return: None
+        """
+        server = await self.start(host, port, path)
+        addresses = ", ".join(str(socket.getsockname()) for socket in server.sockets)
+        print(f"Serving {self.file_name} on {addresses}. Press Ctrl+C to stop.")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if self.save_task is not None:
+                self.save_task.cancel()  # a save it started still finishes its write
+                with contextlib.suppress(asyncio.CancelledError):
+                    await self.save_task
+            if self.is_dirty():
+                await self.save()
+
+    @staticmethod
+    def run_server(arguments, employee_type: object) -> int:
+        """ This function runs the ratings service chosen on the command line until Ctrl+C
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Fall back to SAVE_INTERVAL when no save interval is given
+
+        :param arguments: the parsed command line arguments of main.py
+        :param employee_type: an reference to the Employee class
+        :return: the process exit code
+        """
+        save_interval = SAVE_INTERVAL if arguments.save_interval is None else arguments.save_interval
+        service = RatingService(arguments.file, dat.EmployeeTable(), employee_type, arguments.format, save_interval)
+        service.load()
+        try:
+            asyncio.run(service.serve(arguments.host, arguments.port, arguments.socket))
+        except KeyboardInterrupt:
+            pass
+        return 0 if not service.is_dirty() else 2
@@ -0,0 +1,1034 @@
+# ------------------------------------------------------------------------------------------------- #
+# Title: storage_classes.py
+# Description: The module of storage backend classes for employee rating files
+# ChangeLog: (Who, When, What)
+# AdamSavage,20261018,Created module with JSON, JSON Lines, CSV, SQLite, and binary backends
+# AdamSavage,20261018,Added reading and writing open files for the text backends
+# AdamSavage,20261018,Read json lines and binary files through a memory map
+# AdamSavage,20261018,Added JsonBackend.iter_text_chunks
+# AdamSavage,20261018,Added record offsets for the json lines and binary formats
+# AdamSavage,20261018,Added gzip, bz2, and xz compressed files, picked by the last file extension
+# AdamSavage,20261018,Added reading records from file contents held in memory
+# AdamSavage,20261018,Added encode_record so saves can patch changed records in place
+# AdamSavage,20261018,Import sqlite3 only when a SQLite file is opened
+# AdamSavage,20261018,Binary records reject names too long for their one byte length fields
+# AdamSavage,20261018,A malformed json record is reported without reading the rest of the file
+# AdamSavage,20261018,append_records flushes the new rows to disk when fsync is True
+# ------------------------------------------------------------------------------------------------- #
+
+import bz2
+import csv
+import gzip
+import io
+import json
+import lzma
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+from datetime import date
+
+READ_CHUNK_SIZE: int = 64 * 1024  # characters or bytes read from a file per streaming step
+MAX_JSON_RECORD_CHARS: int = 4 * READ_CHUNK_SIZE  # longest json record read on for before a decode error is raised
+JSON_TOKEN_CHARS: int = 64  # a decode error this close to the end of the read text may be a token cut off by it
+FIELD_NAMES: tuple = ("FirstName", "LastName", "ReviewDate", "ReviewRating")
+CODECS: dict = {".gz": gzip, ".bz2": bz2, ".xz": lzma}  # compressed file extension -> stdlib codec module
+CODEC_WRITE_OPTIONS: dict = {".gz": {"compresslevel": 6}, ".bz2": {"compresslevel": 9}, ".xz": {"preset": 6}}
+
+
+def record_from_employee(employee) -> dict:
+    """ This function converts an employee object to a dictionary row
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created function
+
+    :param employee: employee object to convert
+    :return: dictionary row
+    """
+    return {"FirstName": employee.first_name,
+            "LastName": employee.last_name,
+            "ReviewDate": employee.review_date,
+            "ReviewRating": employee.review_rating}
+
+
+class StorageBackend:
+    """
+    The interface of a storage backend that reads and writes dictionary rows of employee data
+
+    Each backend is a collection of static functions, picked by name or by file extension
+    with for_file_name.
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created Class
+    """
+    name: str = ""
+    extensions: tuple = ()
+    can_append: bool = False
+    can_index: bool = False  # True if records can be read at offsets found by iter_buffer_offsets
+
+    @staticmethod
+    def iter_records(file_name: str):
+        """ This function yields the dictionary rows stored in a file one at a time
+
+        :param file_name: string data with name of file to read from
+        :return: generator of dictionary rows
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def iter_buffer_offsets(buffer):
+        """ This function yields the offset of each record in a memory mapped file
+
+        Backends with can_index also have iter_buffer_records(buffer, position), which reads the
+        records from the one at an offset onwards, and encode_record(record), which gives the bytes
+        of one record as they are stored.
+
+        :param buffer: bytes-like object holding the file
+        :return: generator of record offsets
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def write_records(file_name: str, records):
+        """ This function replaces the contents of a file with dictionary rows
+
+        :param file_name: string data with name of file to write to
+        :param records: iterable of dictionary rows
+        :return: None
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def append_records(file_name: str, records, fsync: bool = False):
+        """ This function adds dictionary rows to the end of a file, creating it if needed
+
+        :param file_name: string data with name of file to append to
+        :param records: iterable of dictionary rows
+        :param fsync: True to flush the new rows to disk before returning
+        :return: None
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def sync_file(file_name: str):
+        """ This function flushes the data of a closed file from the system's cache to disk
+
+        A compressed file only writes the end of its stream when it is closed, so files are synced
+        after closing them rather than through the open file object.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of the file
+        :return: None
+        """
+        with open(file_name, "rb") as file:
+            os.fsync(file.fileno())
+
+    @staticmethod
+    @contextmanager
+    def map_file(file_name: str):
+        """ This function maps a file into memory read-only, so records can be scanned without copying the file
+
+        Processes that map the same file share its pages in the operating system's page cache.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of file to map
+        :return: context manager giving a bytes-like view of the file
+        """
+        with open(file_name, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                yield b""  # an empty file cannot be mapped
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                yield buffer
+
+    @staticmethod
+    def get_codec_extension(file_name: str) -> str:
+        """ This function gets the compression extension of a file name
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of the file
+        :return: ".gz", ".bz2", or ".xz", or "" for a file that is not compressed
+        """
+        extension = os.path.splitext(file_name)[1].lower()
+        return extension if extension in CODECS else ""
+
+    @staticmethod
+    def open_file(file_name: str, mode: str = "r", newline: str = None):
+        """ This function opens a file like open, streaming through the codec its extension names
+
+        Compressed files are decompressed or compressed a block at a time as they are read or
+        written, so they are never held in memory whole. Appending to a compressed file adds a
+        new compressed stream, which the codecs read back as one file.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of the file
+        :param mode: "r", "w", or "a", with "b" for a binary file
+        :param newline: newline handling of a text file, as for open
+        :return: the open file object
+        """
+        codec_extension = StorageBackend.get_codec_extension(file_name)
+        options = {} if newline is None else {"newline": newline}
+        if not codec_extension:
+            return open(file_name, mode, **options)
+        if "r" not in mode:
+            options.update(CODEC_WRITE_OPTIONS[codec_extension])
+        return CODECS[codec_extension].open(file_name, mode if "b" in mode else mode + "t", **options)
+
+    @staticmethod
+    def can_map(file_name: str) -> bool:
+        """ This function checks whether a file's bytes are its records, so it can be memory mapped and indexed
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of the file
+        :return: False for a compressed file
+        """
+        return not StorageBackend.get_codec_extension(file_name)
+
+    @staticmethod
+    def get_format_extension(file_name: str) -> str:
+        """ This function gets the extension of a file name that names its storage format, before any codec extension
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of the file
+        :return: the lower case extension, such as ".jsonl" for "EmployeeRatings.jsonl.gz"
+        """
+        root, extension = os.path.splitext(file_name)
+        if extension.lower() in CODECS:
+            extension = os.path.splitext(root)[1]
+        return extension.lower()
+
+    @staticmethod
+    def is_ratings_file_name(file_name: str) -> bool:
+        """ This function checks whether a file name has the extension of one of the storage formats
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of the file
+        :return: True if a backend claims the file's extension
+        """
+        extension = StorageBackend.get_format_extension(file_name)
+        return any(extension in backend.extensions for backend in BACKENDS)
+
+    @staticmethod
+    def iter_data_records(file_name: str, data: bytes, backend_name: str = None):
+        """ This function yields the dictionary rows of a file's contents that were already read into memory
+
+        The format and codec are picked by the file name as for a file on disk, so a file can be read
+        in one place and parsed in another, such as in a worker process.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of the file the contents were read from
+        :param data: the bytes of the file, compressed if the file name says so
+        :param backend_name: name of the backend to use, or None to go by the file extension
+        :return: generator of dictionary rows
+        """
+        backend = StorageBackend.for_file_name(file_name, backend_name)
+        if not hasattr(backend, "iter_file_records"):
+            raise ValueError(f"The {backend.name} format cannot be read from memory")
+        file = io.BytesIO(data)
+        codec_extension = StorageBackend.get_codec_extension(file_name)
+        if codec_extension:
+            file = CODECS[codec_extension].open(file, "rb")
+        if backend is BinaryBackend:
+            if file.read(len(BinaryBackend.SIGNATURE)) != BinaryBackend.SIGNATURE:
+                raise ValueError(f"{file_name} is not a binary employee ratings file")
+            if (yield from BinaryBackend.iter_file_records(file)):
+                raise ValueError(f"{file_name} ends with an incomplete record")
+            return
+        yield from backend.iter_file_records(io.TextIOWrapper(file, newline="" if backend is CsvBackend else None))
+
+    @staticmethod
+    def for_file_name(file_name: str, backend_name: str = None):
+        """ This function picks the backend for a file by name, or else by the file extension
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of the file
+        :param backend_name: name of the backend to use, or None to go by the file extension
+        :return: the backend class
+        """
+        if backend_name:
+            for backend in BACKENDS:
+                if backend.name == backend_name:
+                    return backend
+            raise ValueError(f"Unknown storage format: {backend_name}")
+        extension = StorageBackend.get_format_extension(file_name)
+        for backend in BACKENDS:
+            if extension in backend.extensions:
+                return backend
+        return JsonBackend
+
+
+class JsonBackend(StorageBackend):
+    """
+    Stores employee data as one json array of dictionary rows
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created Class
+    """
+    name = "json"
+    extensions = (".json",)
+
+    @staticmethod
+    def iter_records(file_name: str):
+        """ This function yields the dictionary rows of a json array file one at a time
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of file to read from
+        :return: generator of dictionary rows
+        """
+        with StorageBackend.open_file(file_name, "r") as file:
+            yield from JsonBackend.iter_file_records(file)
+
+    @staticmethod
+    def iter_file_records(file, chunk_size: int = READ_CHUNK_SIZE):
+        """ This function yields the dictionary rows of a json array one at a time
+
+        Only the current chunk of the file and the record being decoded are kept in memory,
+        so peak memory stays flat no matter how many rows the file holds. A record that fails to
+        decode is only read on when the error could come from the end of the text read so far,
+        and never past MAX_JSON_RECORD_CHARS, so a malformed record is reported right away.
+        Anything but whitespace after the closing "]" is malformed too, as it is for json.load.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Raise decode errors without reading the rest of the file
+        AdamSavage,20261018,Raise a decode error for data after the end of the array
+
+        :param file: an open text file positioned at the start of a json array
+        :param chunk_size: number of characters to read from the file per step
+        :return: generator of dictionary rows
+        """
+        decoder = json.JSONDecoder()
+        buffer: str = ""
+        position: int = 0
+        at_eof: bool = False
+        expecting_value: bool = True  # True right after "[" or ",", False right after a value
+
+        def fill() -> bool:
+            nonlocal buffer, position, at_eof
+            chunk = file.read(chunk_size)
+            if not chunk:
+                at_eof = True
+                return False
+            buffer = buffer[position:] + chunk
+            position = 0
+            return True
+
+        def skip_whitespace() -> bool:
+            nonlocal position
+            while True:
+                while position < len(buffer) and buffer[position] in " \t\r\n":
+                    position += 1
+                if position < len(buffer):
+                    return True
+                if at_eof or not fill():
+                    return False
+
+        def check_end_of_array():
+            nonlocal position
+            position += 1
+            if skip_whitespace():
+                raise json.JSONDecodeError("Extra data", buffer, position)
+
+        if not skip_whitespace() or buffer[position] != "[":
+            raise json.JSONDecodeError("Expecting '['", buffer, position)
+        position += 1
+
+        if skip_whitespace() and buffer[position] == "]":
+            check_end_of_array()
+            return
+
+        while True:
+            if not skip_whitespace():
+                raise json.JSONDecodeError("Unterminated array", buffer, position)
+            if expecting_value:
+                try:
+                    record, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError as e:
+                    # The record may simply be cut off by the end of the chunk, so read more and retry.
+                    cut_off = e.pos >= len(buffer) - JSON_TOKEN_CHARS or e.msg.startswith("Unterminated string")
+                    if not cut_off or len(buffer) - position > MAX_JSON_RECORD_CHARS or at_eof or not fill():
+                        raise
+                    continue
+                if end == len(buffer) and not at_eof:
+                    # A number at the end of the chunk may continue in the next one.
+                    if fill():
+                        continue
+                position = end
+                expecting_value = False
+                yield record
+            elif buffer[position] == ",":
+                position += 1
+                expecting_value = True
+            elif buffer[position] == "]":
+                check_end_of_array()
+                return
+            else:
+                raise json.JSONDecodeError("Expecting ',' delimiter", buffer, position)
+
+    @staticmethod
+    def write_records(file_name: str, records):
+        """ This function writes dictionary rows to a file as one json array
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of file to write to
+        :param records: iterable of dictionary rows
+        :return: None
+        """
+        list_of_dictionary_data = records if isinstance(records, list) else list(records)
+        with StorageBackend.open_file(file_name, "w") as file:
+            json.dump(list_of_dictionary_data, file)
+
+    @staticmethod
+    def write_file_records(file, records):
+        """ This function writes dictionary rows to an open file as one json array, one row at a time
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file: an open text file
+        :param records: iterable of dictionary rows
+        :return: None
+        """
+        file.writelines(JsonBackend.iter_text_chunks(records))
+
+    @staticmethod
+    def iter_text_chunks(records):
+        """ This function yields the text of a json array of dictionary rows, one row at a time
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param records: iterable of dictionary rows
+        :return: generator of strings that together make up the json array
+        """
+        dumps = json.dumps
+        separator = "["
+        for record in records:
+            yield separator + dumps(record)
+            separator = ", "
+        yield "[]" if separator == "[" else "]"
+
+
+class JsonLinesBackend(StorageBackend):
+    """
+    Stores employee data as one json object per line, so files can be streamed and appended to
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created Class
+    """
+    name = "jsonl"
+    extensions = (".jsonl", ".ndjson")
+    can_append = True
+    can_index = True
+
+    @staticmethod
+    def iter_records(file_name: str):
+        """ This function yields the dictionary rows of a json lines file one at a time
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of file to read from
+        :return: generator of dictionary rows
+        """
+        if not StorageBackend.can_map(file_name):
+            with StorageBackend.open_file(file_name, "r") as file:
+                yield from JsonLinesBackend.iter_file_records(file)
+            return
+        with StorageBackend.map_file(file_name) as buffer:
+            yield from JsonLinesBackend.iter_buffer_records(buffer)
+
+    @staticmethod
+    def iter_buffer_records(buffer, start: int = 0, end: int = None):
+        """ This function yields the dictionary rows of the json lines that start within part of a buffer
+
+        A line belongs to the part its first byte falls in, so parts split anywhere in a buffer
+        together read every line exactly once. Each line is decoded straight from the buffer.
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param buffer: bytes-like object holding json lines, such as a memory mapped file
+        :param start: offset of the first byte of the part
+        :param end: offset after the last byte of the part, or None for the end of the buffer
+        :return: generator of dictionary rows
+        """
+        size = len(buffer)
+        end = size if end is None else end
+        find = buffer.find
+        decode = json.JSONDecoder().decode  # decoding str skips the encoding detection json.loads does on bytes
+        position = start
+        if position > 0:  # skip the rest of the line that started before the part
+            line_end = find(b"\n", position - 1)
+            position = size if line_end < 0 else line_end + 1
+        while position < end:
+            line_end = find(b"\n", position)
+            if line_end < 0:
+                line_end = size
+            line = buffer[position:line_end]
+            if line.strip():
+                yield decode(str(line, "utf-8"))
+            position = line_end + 1
+
+    @staticmethod
+    def iter_buffer_offsets(buffer):
+        """ This function yields the offset of each json line in a buffer, skipping blank lines
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param buffer: bytes-like object holding json lines, such as a memory mapped file
+        :return: generator of line offsets
+        """
+        size = len(buffer)
+        find = buffer.find
+        position = 0
+        while position < size:
+            line_end = find(b"\n", position)
+            if line_end < 0:
+                line_end = size
+            if buffer[position:line_end].strip():
+                yield position
+            position = line_end + 1
+
+    @staticmethod
+    def encode_record(record: dict) -> bytes:
+        """ This function gets the bytes of one dictionary row as a json line, newline included
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param record: dictionary row
+        :return: the encoded line
+        """
+        return (json.dumps(record) + "\n").encode("utf-8")
+
+    @staticmethod
+    def iter_file_records(file):
+        """ This function yields the dictionary rows of an open json lines file one at a time
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file: an open text file
+        :return: generator of dictionary rows
+        """
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+    @staticmethod
+    def write_records(file_name: str, records):
+        """ This function writes dictionary rows to a file as json lines
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of file to write to
+        :param records: iterable of dictionary rows
+        :return: None
+        """
+        with StorageBackend.open_file(file_name, "w") as file:
+            JsonLinesBackend.write_file_records(file, records)
+
+    @staticmethod
+    def append_records(file_name: str, records, fsync: bool = False):
+        """ This function adds dictionary rows to the end of a json lines file
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Added fsync
+
+        :param file_name: string data with name of file to append to
+        :param records: iterable of dictionary rows
+        :param fsync: True to flush the new rows to disk before returning
+        :return: None
+        """
+        with StorageBackend.open_file(file_name, "a") as file:
+            JsonLinesBackend.write_file_records(file, records)
+        if fsync:
+            StorageBackend.sync_file(file_name)
+
+    @staticmethod
+    def write_file_records(file, records):
+        """ This function writes dictionary rows to an open file as json lines
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file: an open text file
+        :param records: iterable of dictionary rows
+        :return: None
+        """
+        dumps = json.dumps
+        file.writelines(dumps(record) + "\n" for record in records)
+
+
+class CsvBackend(StorageBackend):
+    """
+    Stores employee data as a csv file with a header row
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created Class
+    """
+    name = "csv"
+    extensions = (".csv",)
+    can_append = True
+
+    @staticmethod
+    def iter_records(file_name: str):
+        """ This function yields the dictionary rows of a csv file one at a time
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of file to read from
+        :return: generator of dictionary rows
+        """
+        with StorageBackend.open_file(file_name, "r", newline="") as file:
+            yield from CsvBackend.iter_file_records(file)
+
+    @staticmethod
+    def iter_file_records(file):
+        """ This function yields the dictionary rows of an open csv file one at a time
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file: an open text file
+        :return: generator of dictionary rows
+        """
+        for row in csv.DictReader(file):
+            rating = row["ReviewRating"]
+            row["ReviewRating"] = int(rating) if rating.isdigit() else rating  # validation rejects the rest
+            yield row
+
+    @staticmethod
+    def write_records(file_name: str, records):
+        """ This function writes dictionary rows to a csv file with a header row
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of file to write to
+        :param records: iterable of dictionary rows
+        :return: None
+        """
+        with StorageBackend.open_file(file_name, "w", newline="") as file:
+            CsvBackend.write_file_records(file, records)
+
+    @staticmethod
+    def write_file_records(file, records):
+        """ This function writes dictionary rows to an open file as csv with a header row
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file: an open text file
+        :param records: iterable of dictionary rows
+        :return: None
+        """
+        writer = csv.DictWriter(file, fieldnames=FIELD_NAMES)
+        writer.writeheader()
+        writer.writerows(records)
+
+    @staticmethod
+    def append_records(file_name: str, records, fsync: bool = False):
+        """ This function adds dictionary rows to the end of a csv file
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Added fsync
+
+        :param file_name: string data with name of file to append to
+        :param records: iterable of dictionary rows
+        :param fsync: True to flush the new rows to disk before returning
+        :return: None
+        """
+        if not os.path.exists(file_name):
+            CsvBackend.write_records(file_name, records)
+        else:
+            with StorageBackend.open_file(file_name, "a", newline="") as file:
+                csv.DictWriter(file, fieldnames=FIELD_NAMES).writerows(records)
+        if fsync:
+            StorageBackend.sync_file(file_name)
+
+
+class SqliteBackend(StorageBackend):
+    """
+    Stores employee data in an indexed SQLite table that can be queried without loading it
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created Class
+    """
+    name = "sqlite"
+    extensions = (".db", ".sqlite", ".sqlite3")
+    can_append = True
+
+    @staticmethod
+    def connect(file_name: str):
+        """ This function opens a SQLite file and creates the ratings table and indexes if needed
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Import sqlite3 only when a SQLite file is opened
+
+        :param file_name: string data with name of the SQLite file
+        :return: sqlite3 connection
+        """
+        if StorageBackend.get_codec_extension(file_name):
+            raise ValueError(f"SQLite files cannot be compressed: {file_name}")
+        import sqlite3  # imported here, so only SQLite files pay for it
+        connection = sqlite3.connect(file_name)
+        connection.executescript("""
+            CREATE TABLE IF NOT EXISTS employee_ratings (
+                first_name TEXT NOT NULL, last_name TEXT NOT NULL,
+                review_date TEXT NOT NULL, review_rating INTEGER NOT NULL);
+            CREATE INDEX IF NOT EXISTS employee_ratings_name ON employee_ratings (last_name, first_name);
+            CREATE INDEX IF NOT EXISTS employee_ratings_date ON employee_ratings (review_date);
+            CREATE INDEX IF NOT EXISTS employee_ratings_rating ON employee_ratings (review_rating, review_date);
+        """)
+        return connection
+
+    @staticmethod
+    def iter_records(file_name: str):
+        """ This function yields the dictionary rows of a SQLite file one at a time
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of file to read from
+        :return: generator of dictionary rows
+        """
+        yield from SqliteBackend.query_records(file_name)
+
+    @staticmethod
+    def query_records(file_name: str, first_name: str = None, last_name: str = None,
+                      review_rating: int = None, since: str = None):
+        """ This function yields the dictionary rows of a SQLite file that match all given filters
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of file to read from
+        :param first_name: only rows with this first name, if given
+        :param last_name: only rows with this last name, if given
+        :param review_rating: only rows with this review rating, if given
+        :param since: only rows reviewed on or after this YYYY-MM-DD date, if given
+        :return: generator of dictionary rows in the order they were saved
+        """
+        if not os.path.exists(file_name):
+            raise FileNotFoundError(file_name)
+        conditions: list = []
+        parameters: list = []
+        for column, value, operator in (("first_name", first_name, "="), ("last_name", last_name, "="),
+                                        ("review_rating", review_rating, "="), ("review_date", since, ">=")):
+            if value is not None:
+                conditions.append(f"{column} {operator} ?")
+                parameters.append(value)
+        where = (" WHERE " + " AND ".join(conditions)) if conditions else ""
+        connection = SqliteBackend.connect(file_name)
+        try:
+            cursor = connection.execute("SELECT first_name, last_name, review_date, review_rating"
+                                        " FROM employee_ratings" + where + " ORDER BY rowid", parameters)
+            for row in cursor:
+                yield dict(zip(FIELD_NAMES, row))
+        finally:
+            connection.close()
+
+    @staticmethod
+    def write_records(file_name: str, records):
+        """ This function replaces the rows of a SQLite file in one transaction
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of file to write to
+        :param records: iterable of dictionary rows
+        :return: None
+        """
+        SqliteBackend.insert_records(file_name, records, replace=True)
+
+    @staticmethod
+    def append_records(file_name: str, records, fsync: bool = False):
+        """ This function adds dictionary rows to a SQLite file in one transaction
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Added fsync
+
+        :param file_name: string data with name of file to append to
+        :param records: iterable of dictionary rows
+        :param fsync: True to have SQLite flush the transaction to disk before it commits
+        :return: None
+        """
+        SqliteBackend.insert_records(file_name, records, replace=False, fsync=fsync)
+
+    @staticmethod
+    def insert_records(file_name: str, records, replace: bool, fsync: bool = True):
+        """ This function inserts dictionary rows into a SQLite file in one transaction
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Added fsync
+
+        :param file_name: string data with name of file to write to
+        :param records: iterable of dictionary rows
+        :param replace: True to delete the existing rows first
+        :param fsync: True to keep SQLite's own flush to disk at each commit, False to skip it
+        :return: None
+        """
+        connection = SqliteBackend.connect(file_name)
+        try:
+            if not fsync:
+                connection.execute("PRAGMA synchronous = OFF")
+            with connection:
+                if replace:
+                    connection.execute("DELETE FROM employee_ratings")
+                connection.executemany("INSERT INTO employee_ratings VALUES (?, ?, ?, ?)",
+                                       ((record["FirstName"], record["LastName"],
+                                         record["ReviewDate"], record["ReviewRating"]) for record in records))
+        finally:
+            connection.close()
+
+
+class BinaryBackend(StorageBackend):
+    """
+    Stores employee data as compact binary records for the fastest loads
+
+    The file starts with the 4 byte signature b"EMPR". Each record is a struct of the review date
+    ordinal (int32), the review rating, and the byte lengths of the first and last names (one byte
+    each), followed by the utf-8 first and last names.
+
+    ChangeLog: (Who, When, What)
+    AdamSavage,20261018,Created Class
+    """
+    name = "binary"
+    extensions = (".bin", ".empr")
+    can_append = True
+    can_index = True
+    SIGNATURE: bytes = b"EMPR"
+    RECORD_HEADER = struct.Struct("<iBBB")
+    MAX_NAME_BYTES: int = 255  # largest utf-8 length of a name, since its length is stored in one byte
+
+    @staticmethod
+    def pack_header(record: dict, first_name: bytes, last_name: bytes) -> bytes:
+        """ This function packs the struct that starts the binary record of a dictionary row
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param record: dictionary row
+        :param first_name: the utf-8 first name
+        :param last_name: the utf-8 last name
+        :return: the packed header
+        """
+        if len(first_name) > BinaryBackend.MAX_NAME_BYTES or len(last_name) > BinaryBackend.MAX_NAME_BYTES:
+            raise ValueError(f"The binary format stores names of up to {BinaryBackend.MAX_NAME_BYTES} utf-8 bytes, "
+                             f"so the review of {record['FirstName'][:20]} {record['LastName'][:20]} cannot be saved")
+        return BinaryBackend.RECORD_HEADER.pack(date.fromisoformat(record["ReviewDate"]).toordinal(),
+                                                record["ReviewRating"], len(first_name), len(last_name))
+
+    @staticmethod
+    def iter_records(file_name: str):
+        """ This function yields the dictionary rows of a binary file one at a time
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of file to read from
+        :return: generator of dictionary rows
+        """
+        if not StorageBackend.can_map(file_name):
+            with StorageBackend.open_file(file_name, "rb") as file:
+                if file.read(len(BinaryBackend.SIGNATURE)) != BinaryBackend.SIGNATURE:
+                    raise ValueError(f"{file_name} is not a binary employee ratings file")
+                if (yield from BinaryBackend.iter_file_records(file)):
+                    raise ValueError(f"{file_name} ends with an incomplete record")
+            return
+        with StorageBackend.map_file(file_name) as buffer:
+            signature = BinaryBackend.SIGNATURE
+            if buffer[:len(signature)] != signature:
+                raise ValueError(f"{file_name} is not a binary employee ratings file")
+            position = yield from BinaryBackend.iter_buffer_records(buffer, len(signature))
+            if position != len(buffer):
+                raise ValueError(f"{file_name} ends with an incomplete record")
+
+    @staticmethod
+    def iter_file_records(file, chunk_size: int = READ_CHUNK_SIZE):
+        """ This function yields the dictionary rows of an open binary file after its signature, one chunk at a time
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file: an open binary file positioned after the signature
+        :param chunk_size: number of bytes to read from the file per step
+        :return: generator of dictionary rows that returns the bytes of an incomplete last record
+        """
+        pending = b""
+        while chunk := file.read(chunk_size):
+            pending += chunk  # what is left of the previous chunk is at most one record
+            position = yield from BinaryBackend.iter_buffer_records(pending)
+            pending = pending[position:]
+        return pending
+
+    @staticmethod
+    def iter_buffer_offsets(buffer):
+        """ This function yields the offset of each record in a memory mapped binary file
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param buffer: bytes-like object holding the whole binary file
+        :return: generator of record offsets
+        """
+        signature = BinaryBackend.SIGNATURE
+        if buffer[:len(signature)] != signature:
+            raise ValueError("The file is not a binary employee ratings file")
+        end = len(buffer)
+        unpack_header = BinaryBackend.RECORD_HEADER.unpack_from
+        header_size = BinaryBackend.RECORD_HEADER.size
+        position = len(signature)
+        while position < end:
+            if position + header_size > end:
+                raise ValueError("The file ends with an incomplete record")
+            _, _, first_length, last_length = unpack_header(buffer, position)
+            yield position
+            position += header_size + first_length + last_length
+        if position > end:
+            raise ValueError("The file ends with an incomplete record")
+
+    @staticmethod
+    def iter_buffer_records(buffer, position: int = 0, end: int = None):
+        """ This function yields the dictionary rows of the complete binary records in a buffer
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param buffer: bytes-like object holding binary records
+        :param position: offset of the first record in the buffer
+        :param end: offset where the records stop, or None for the end of the buffer
+        :return: generator of dictionary rows that returns the offset after the last complete record
+        """
+        end = len(buffer) if end is None else end
+        unpack_header = BinaryBackend.RECORD_HEADER.unpack_from
+        header_size = BinaryBackend.RECORD_HEADER.size
+        from_ordinal = date.fromordinal
+        while position + header_size <= end:
+            review_ordinal, review_rating, first_length, last_length = unpack_header(buffer, position)
+            names_start = position + header_size
+            names_end = names_start + first_length + last_length
+            if names_end > end:
+                break
+            yield {"FirstName": str(buffer[names_start:names_start + first_length], "utf-8"),
+                   "LastName": str(buffer[names_start + first_length:names_end], "utf-8"),
+                   "ReviewDate": from_ordinal(review_ordinal).isoformat(),
+                   "ReviewRating": review_rating}
+            position = names_end
+        return position
+
+    @staticmethod
+    def encode_record(record: dict) -> bytes:
+        """ This function gets the bytes of one dictionary row as a binary record
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Reject names too long for the record header
+
+        :param record: dictionary row
+        :return: the encoded record
+        """
+        first_name = record["FirstName"].encode("utf-8")
+        last_name = record["LastName"].encode("utf-8")
+        return BinaryBackend.pack_header(record, first_name, last_name) + first_name + last_name
+
+    @staticmethod
+    def write_records(file_name: str, records):
+        """ This function writes dictionary rows to a binary file
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+
+        :param file_name: string data with name of file to write to
+        :param records: iterable of dictionary rows
+        :return: None
+        """
+        with StorageBackend.open_file(file_name, "wb") as file:
+            file.write(BinaryBackend.SIGNATURE)
+            BinaryBackend.write_file_records(file, records)
+
+    @staticmethod
+    def append_records(file_name: str, records, fsync: bool = False):
+        """ This function adds dictionary rows to the end of a binary file
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Added fsync
+
+        :param file_name: string data with name of file to append to
+        :param records: iterable of dictionary rows
+        :param fsync: True to flush the new rows to disk before returning
+        :return: None
+        """
+        if not os.path.exists(file_name):
+            BinaryBackend.write_records(file_name, records)
+        else:
+            with StorageBackend.open_file(file_name, "ab") as file:
+                BinaryBackend.write_file_records(file, records)
+        if fsync:
+            StorageBackend.sync_file(file_name)
+
+    @staticmethod
+    def write_file_records(file, records):
+        """ This function writes dictionary rows to an open binary file
+
+        ChangeLog: (Who, When, What)
+        AdamSavage,20261018,Created function
+        AdamSavage,20261018,Reject names too long for the record header
+
+        :param file: an open binary file
+        :param records: iterable of dictionary rows
+        :return: None
+        """
+        pack_header = BinaryBackend.RECORD_HEADER.pack
+        chunk: list = []
+        for record in records:
+            first_name = record["FirstName"].encode("utf-8")
+            last_name = record["LastName"].encode("utf-8")
+            try:
+                chunk.append(pack_header(date.fromisoformat(record["ReviewDate"]).toordinal(),
+                                         record["ReviewRating"], len(first_name), len(last_name)))
+            except struct.error:
+                BinaryBackend.pack_header(record, first_name, last_name)  # raises the ValueError for a long name
+                raise
+            chunk.append(first_name)
+            chunk.append(last_name)
+            if len(chunk) >= 30_000:
+                file.write(b"".join(chunk))
+                chunk.clear()
+        file.write(b"".join(chunk))
+
+
+BACKENDS: tuple = (JsonBackend, JsonLinesBackend, CsvBackend, SqliteBackend, BinaryBackend)
@@ -0,0 +1,85 @@
+# ------------------------------------------------------------------------------------------------- #
+# Title: test_analytics_classes.py
+# Description: The test harness for analytics classes
+# ChangeLog: (Who, When, What)
+# AdamSavage,20261018,Created script
+# ------------------------------------------------------------------------------------------------- #
+
+import unittest
+from unittest.mock import patch
+from data_classes import Employee, EmployeeTable
+from presentation_classes import IO
+from analytics_classes import RatingAnalytics
+
+
+def make_employee_data():
+    return [Employee("Jane", "Doe", "2024-03-01", 1),
+            Employee("John", "Smith", "2024-02-01", 5),
+            Employee("Jane", "Doe", "2024-01-15", 4),
+            Employee("Jane", "Doe", "2024-04-01", 2)]
+
+
+class TestRatingAnalytics(unittest.TestCase):
+
+    def test_rating_histogram(self):
+        for employee_data in (make_employee_data(), EmployeeTable(make_employee_data())):
+            with self.subTest(collection=type(employee_data).__name__):
+                analytics = RatingAnalytics(employee_data)
+                self.assertEqual(analytics.rating_histogram(), {1: 1, 2: 1, 3: 0, 4: 1, 5: 1})
+
+    def test_period_summary(self):
+        analytics = RatingAnalytics(EmployeeTable(make_employee_data()))
+        quarters = analytics.period_summary("quarter")
+        self.assertEqual(list(quarters), ["2024-Q1", "2024-Q2"])
+        self.assertEqual(quarters["2024-Q1"], {"reviews": 3, "mean": 10 / 3, "median": 4.0,
+                                               "not_meeting_percent": 100 / 3})
+        months = analytics.period_summary("month")
+        self.assertEqual(list(months), ["2024-01", "2024-02", "2024-03", "2024-04"])
+        self.assertEqual(months["2024-03"]["not_meeting_percent"], 100.0)
+        with self.assertRaises(ValueError):
+            analytics.period_summary("week")
+
+    def test_histogram_summary_median(self):
+        self.assertEqual(RatingAnalytics.histogram_summary({1: 1, 2: 0, 3: 0, 4: 0, 5: 1})["median"], 3.0)
+        self.assertEqual(RatingAnalytics.histogram_summary({1: 0, 2: 2, 3: 1, 4: 0, 5: 0})["median"], 2.0)
+        self.assertIsNone(RatingAnalytics.histogram_summary({1: 0})["mean"])
+
+    def test_rating_trajectory(self):
+        analytics = RatingAnalytics(make_employee_data())
+        self.assertEqual(analytics.rating_trajectory("jane", "doe"),
+                         [("2024-01-15", 4), ("2024-03-01", 1), ("2024-04-01", 2)])
+        self.assertEqual(analytics.rating_trajectory("No", "One"), [])
+
+    @patch("builtins.input", side_effect=["John", "Doe", "2024-05-01", "3"])
+    def test_cache_follows_changes(self, mock_input):
+        for employee_data in (make_employee_data(), EmployeeTable(make_employee_data())):
+            with self.subTest(collection=type(employee_data).__name__):
+                mock_input.side_effect = ["John", "Doe", "2024-05-01", "3"]
+                analytics = RatingAnalytics(employee_data)
+                self.assertEqual(analytics.rating_histogram()[3], 0)
+                self.assertIs(analytics.rating_histogram(), analytics.rating_histogram())  # cached
+
+                IO.input_employee_data(employee_data, Employee)
+                self.assertEqual(analytics.rating_histogram()[3], 1)
+
+    def test_cache_follows_table_edits(self):
+        employee_data = EmployeeTable(make_employee_data())
+        analytics = RatingAnalytics(employee_data)
+        self.assertEqual(analytics.rating_histogram()[5], 1)
+        employee_data[0].review_rating = 5
+        self.assertEqual(analytics.rating_histogram()[5], 2)
+
+    def test_appended_rows_are_counted_incrementally(self):
+        employee_data = EmployeeTable(make_employee_data())
+        analytics = RatingAnalytics(employee_data)
+        analytics.rating_histogram()
+        employee_data.append(Employee("Jane", "Doe", "2024-03-01", 1))
+        with patch.object(analytics, "columns", side_effect=AssertionError("rescanned")):
+            self.assertEqual(analytics.rating_histogram()[1], 2)
+        self.assertEqual(analytics.date_rating_counts()[(employee_data.review_dates[0], 1)], 2)
+        employee_data[4].review_rating = 3  # an edit counts every row again
+        self.assertEqual(analytics.rating_histogram(), {1: 1, 2: 1, 3: 1, 4: 1, 5: 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
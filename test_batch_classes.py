@@ -0,0 +1,138 @@
+# ------------------------------------------------------------------------------------------------- #
+# Title: test_batch_classes.py
+# Description: The test harness for batch classes
+# ChangeLog: (Who, When, What)
+# AdamSavage,20261018,Created script
+# ------------------------------------------------------------------------------------------------- #
+
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from data_classes import Employee
+import batch_classes as batch
+import storage_classes as storage
+
+RECORDS: list = [{"FirstName": "John", "LastName": "Doe", "ReviewDate": "2024-12-09", "ReviewRating": 4},
+                 {"FirstName": "John1", "LastName": "Doe", "ReviewDate": "2024-12-09", "ReviewRating": 4},
+                 {"FirstName": "Jane", "LastName": "Doe", "ReviewDate": "2024-12-10", "ReviewRating": 1}]
+
+
+@patch("presentation_classes.IO.output_batch_report")
+class TestBatchProcessor(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.temp_dir.name, "EmployeeRatings.json")
+        self.source_name = os.path.join(self.temp_dir.name, "extract.jsonl")
+        storage.JsonLinesBackend.write_records(self.source_name, RECORDS)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_iter_valid_employees(self, mock_report):
+        report = batch.BatchProcessor.new_report("test")
+        employees = list(batch.BatchProcessor.iter_valid_employees(RECORDS + [{"FirstName": "Jo"}, 5],
+                                                                   Employee, report))
+        self.assertEqual([str(employee) for employee in employees], ["John,Doe,2024-12-09,4", "Jane,Doe,2024-12-10,1"])
+        self.assertEqual((report["accepted"], report["rejected"]), (2, 3))
+        self.assertEqual([error[0] for error in report["errors"]], [2, 4, 5])
+
+    def test_import_and_export(self, mock_report):
+        exit_code = batch.BatchProcessor.run_import([self.source_name], self.file_name, Employee)
+        self.assertEqual(exit_code, 1)  # one row was rejected
+        self.assertEqual(mock_report.call_args[0][0]["accepted"], 2)
+
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            exit_code = batch.BatchProcessor.run_export(self.file_name, "-", Employee, output_format="json")
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(json.loads(mock_stdout.getvalue()), [RECORDS[0], RECORDS[2]])
+
+    def test_validate_standard_input(self, mock_report):
+        lines = "".join(json.dumps(record) + "\n" for record in RECORDS)
+        with patch("sys.stdin", io.StringIO(lines)):
+            exit_code = batch.BatchProcessor.run_validate(["-"], Employee)
+        self.assertEqual(exit_code, 1)
+        report = mock_report.call_args[0][0]
+        self.assertEqual((report["command"], report["accepted"], report["rejected"]), ("validate", 2, 1))
+        self.assertFalse(os.path.exists(self.file_name))  # validate never saves
+
+    def test_import_upsert_is_idempotent(self, mock_report):
+        for _ in range(2):
+            batch.BatchProcessor.run_import([self.source_name], self.file_name, Employee, upsert=True)
+        self.assertEqual(mock_report.call_args[0][0]["duplicates"], 2)
+        changed = os.path.join(self.temp_dir.name, "changed.jsonl")
+        storage.JsonLinesBackend.write_records(changed, [dict(RECORDS[2], ReviewRating=5)])
+        exit_code = batch.BatchProcessor.run_import([changed], self.file_name, Employee, upsert=True)
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(list(storage.JsonBackend.iter_records(self.file_name)),
+                         [RECORDS[0], dict(RECORDS[2], ReviewRating=5)])
+
+    def test_import_upsert_keeps_invalid_rows_of_the_file(self, mock_report):
+        storage.JsonBackend.write_records(self.file_name, [RECORDS[0], RECORDS[1]])  # RECORDS[1] is invalid
+        changed = os.path.join(self.temp_dir.name, "changed.jsonl")
+        storage.JsonLinesBackend.write_records(changed, [dict(RECORDS[0], ReviewRating=1)])
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            exit_code = batch.BatchProcessor.run_import([changed], self.file_name, Employee, upsert=True)
+        self.assertEqual(exit_code, 2)
+        self.assertIn("1 invalid rows", mock_stdout.getvalue())
+        report = mock_report.call_args[0][0]
+        self.assertEqual((report["accepted"], report["file_rejected"]), (0, 1))
+        self.assertEqual(list(storage.JsonBackend.iter_records(self.file_name)), [RECORDS[0], RECORDS[1]])
+
+        storage.JsonLinesBackend.write_records(changed, [RECORDS[2]])  # a new review is appended
+        exit_code = batch.BatchProcessor.run_import([changed], self.file_name, Employee, upsert=True)
+        self.assertEqual(exit_code, 1)
+        self.assertEqual(len(list(storage.JsonBackend.iter_records(self.file_name))), 2)  # journaled
+        self.assertEqual(mock_report.call_args[0][0]["file_rejected"], 1)
+
+    def test_dedup(self, mock_report):
+        storage.JsonBackend.write_records(self.file_name, [RECORDS[0], RECORDS[2], RECORDS[0]])
+        exit_code = batch.BatchProcessor.run_dedup(self.file_name, max_rows_in_memory=2)
+        self.assertEqual(exit_code, 0)
+        report = mock_report.call_args[0][0]
+        self.assertEqual((report["accepted"], report["duplicates"]), (2, 1))
+        self.assertEqual(list(storage.JsonBackend.iter_records(self.file_name)), [RECORDS[2], RECORDS[0]])
+
+    def test_merge(self, mock_report):
+        shard_dir = os.path.join(self.temp_dir.name, "shards")
+        os.mkdir(shard_dir)
+        storage.JsonLinesBackend.write_records(os.path.join(shard_dir, "sales.jsonl"), [RECORDS[2], RECORDS[0]])
+        storage.CsvBackend.write_records(os.path.join(shard_dir, "support.csv.gz"), RECORDS[:2])
+        exit_code = batch.BatchProcessor.run_merge(shard_dir, self.file_name, Employee, max_rows_in_memory=2)
+        self.assertEqual(exit_code, 1)  # the John1 row is rejected
+        report = mock_report.call_args[0][0]
+        self.assertEqual(report["shards"], {os.path.join(shard_dir, "sales.jsonl"): 2,
+                                            os.path.join(shard_dir, "support.csv.gz"): 1})
+        self.assertEqual(list(storage.JsonBackend.iter_records(self.file_name)), [RECORDS[0], RECORDS[0], RECORDS[2]])
+
+    @patch("presentation_classes.IO.output_rating_stats")
+    def test_stats(self, mock_stats, mock_report):
+        storage.JsonBackend.write_records(self.file_name, [RECORDS[0], RECORDS[2]])
+        exit_code = batch.BatchProcessor.run_stats(self.file_name, Employee)
+        self.assertEqual(exit_code, 0)
+        stats = mock_stats.call_args[0][0]
+        self.assertEqual((stats["rows"], stats["employees"]), (2, 2))
+        self.assertEqual((stats["first_date"], stats["last_date"]), ("2024-12-09", "2024-12-10"))
+        self.assertEqual(stats["ratings"][1], 1)
+
+    @patch("presentation_classes.IO.output_rating_analytics")
+    def test_analytics(self, mock_analytics, mock_report):
+        storage.JsonBackend.write_records(self.file_name, [RECORDS[0], RECORDS[2]])
+        exit_code = batch.BatchProcessor.run_analytics(self.file_name, Employee, period="month")
+        self.assertEqual(exit_code, 0)
+        summary = mock_analytics.call_args[0][0]
+        self.assertEqual(summary["histogram"][1], 1)
+        self.assertEqual(list(summary["periods"]), ["2024-12"])
+
+    @patch("presentation_classes.IO.output_error_messages")
+    def test_missing_source(self, mock_output, mock_report):
+        exit_code = batch.BatchProcessor.run_validate([os.path.join(self.temp_dir.name, "missing.json")], Employee)
+        self.assertEqual(exit_code, 2)
+        mock_output.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
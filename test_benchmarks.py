@@ -0,0 +1,39 @@
+# ------------------------------------------------------------------------------------------------- #
+# Title: test_benchmarks.py
+# Description: The test harness for the benchmark data generator and baseline comparison
+# ChangeLog: (Who, When, What)
+# AdamSavage,20261018,Created script
+# ------------------------------------------------------------------------------------------------- #
+
+import unittest
+from data_classes import Employee
+import benchmarks
+
+
+class TestBenchmarks(unittest.TestCase):
+
+    def test_records_are_deterministic_and_valid(self):
+        records = list(benchmarks.make_employee_records(500, seed=3, name_count=250, date_spread=7))
+        self.assertEqual(records, list(benchmarks.make_employee_records(500, seed=3, name_count=250, date_spread=7)))
+        self.assertEqual(len(Employee.from_records(records)), 500)
+        self.assertLessEqual(len({(record["FirstName"], record["LastName"]) for record in records}), 250)
+        self.assertLessEqual(len({record["ReviewDate"] for record in records}), 7)
+
+    def test_person_names_are_distinct(self):
+        names = [benchmarks.make_person_name(person) for person in range(3000)]
+        self.assertEqual(len(set(names)), 3000)
+        self.assertTrue(all(first_name.isalpha() for first_name, _ in names))
+
+    def test_find_regressions(self):
+        baseline = {"runs": [{"benchmark": "suite", "rows": 10, "load_rows_per_sec": 100.0, "menu_ms": 10.0}]}
+        runs = [{"benchmark": "suite", "rows": 10, "load_rows_per_sec": 70.0, "menu_ms": 11.0},
+                {"benchmark": "suite", "rows": 20, "load_rows_per_sec": 1.0}]  # not in the baseline
+        regressions = benchmarks.find_regressions(runs, baseline, tolerance=0.25)
+        self.assertEqual([regression["metric"] for regression in regressions], ["load_rows_per_sec"])
+        self.assertEqual(benchmarks.find_regressions(runs, baseline, tolerance=0.5), [])
+        runs[0]["menu_ms"] = 25.0
+        self.assertEqual(len(benchmarks.find_regressions(runs, baseline, tolerance=0.5)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
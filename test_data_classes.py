@@ -7,7 +7,7 @@
 
 import unittest
 from datetime import date
-from data_classes import Person, Employee
+from data_classes import Person, Employee, EmployeeTable, parse_review_date, format_review_date, normalize_name
 
 class TestPerson(unittest.TestCase):
     def test_first_name_setter_and_getter_valid(self):
@@ -30,6 +30,16 @@ class TestPerson(unittest.TestCase):
         with self.assertRaises(ValueError):
             person.last_name = "Doe123"  # Invalid last name with numbers
 
+    def test_names_are_interned(self):
+        first = Person("jOHN", "".join(["d", "oe"]))
+        second = Person("John", "DOE")
+        self.assertEqual((first.first_name, first.last_name), ("John", "Doe"))
+        self.assertIs(first.last_name, second.last_name)
+        self.assertIs(first.first_name, first.first_name)  # the getter does not build a new string
+        employee = Employee.from_records([{"FirstName": "john", "LastName": "doe", "ReviewDate": "2024-12-09",
+                                           "ReviewRating": 3}])[0]
+        self.assertIs(employee.first_name, normalize_name("JOHN"))
+
     def test_str_method(self):
         person = Person("John", "Doe")
         self.assertEqual(str(person), "John,Doe")
@@ -66,5 +76,128 @@ class TestEmployee(unittest.TestCase):
         employee = Employee("John", "Doe", "2024-12-09", 3)
         self.assertEqual(str(employee), "John,Doe,2024-12-09,3")
 
+    def test_slots(self):
+        employee = Employee()
+        with self.assertRaises(AttributeError):
+            employee.nickname = "Johnny"  # __slots__ leaves no instance __dict__
+
+    def test_from_records_valid(self):
+        records = [{"FirstName": "John", "LastName": "Doe", "ReviewDate": "2024-12-09", "ReviewRating": 3},
+                   {"FirstName": "Jane", "LastName": "Doe", "ReviewDate": "2024-12-10", "ReviewRating": 5}]
+        employees = Employee.from_records(iter(records))
+        self.assertEqual([str(employee) for employee in employees],
+                         ["John,Doe,2024-12-09,3", "Jane,Doe,2024-12-10,5"])
+        self.assertIsInstance(employees[0], Employee)
+
+    def test_from_records_invalid(self):
+        record = {"FirstName": "John", "LastName": "Doe", "ReviewDate": "2024-12-09", "ReviewRating": 3}
+        for field, value in (("FirstName", "John1"), ("LastName", "Doe1"),
+                             ("ReviewDate", "2024/12/09"), ("ReviewRating", 6)):
+            with self.assertRaises(ValueError):
+                Employee.from_records([record, dict(record, **{field: value})])
+
+    def test_find_record_errors(self):
+        record = {"FirstName": "John", "LastName": "Doe", "ReviewDate": "2024-12-09", "ReviewRating": 3}
+        self.assertEqual(Employee.find_record_errors(record), [])
+        self.assertEqual([field for field, _ in Employee.find_record_errors(
+            {"FirstName": "John1", "LastName": None, "ReviewDate": 20241209, "ReviewRating": "3"})],
+            ["FirstName", "LastName", "ReviewDate", "ReviewRating"])
+        self.assertEqual(Employee.find_record_errors({"FirstName": "John"})[0], ("LastName", "The field is missing"))
+        self.assertEqual(Employee.find_record_errors(["John"])[0][0], "")
+
+    def test_review_ordinal(self):
+        employee = Employee("John", "Doe", "2024-12-09", 3)
+        self.assertEqual(employee.review_ordinal, date(2024, 12, 9).toordinal())
+        employees = Employee.from_records([{"FirstName": "John", "LastName": "Doe", "ReviewDate": "2024-12-09",
+                                            "ReviewRating": 3}])
+        self.assertEqual(employees[0].review_ordinal, employee.review_ordinal)
+        self.assertEqual(EmployeeTable([employee])[0].review_ordinal, employee.review_ordinal)
+
+    def test_review_date_cache(self):
+        self.assertIs(format_review_date(parse_review_date("2024-12-09")),
+                      format_review_date(parse_review_date("2024-12-09")))  # the same cached string
+        with self.assertRaises(ValueError):
+            parse_review_date("2024-13-01")
+        self.assertEqual(Employee(review_date="2024-01-31").review_date, "2024-01-31")
+
+    def test_changed_flag(self):
+        self.assertTrue(Employee("John", "Doe", "2024-12-09", 3).changed)
+        employee = Employee.from_records([{"FirstName": "John", "LastName": "Doe", "ReviewDate": "2024-12-09",
+                                           "ReviewRating": 3}])[0]
+        self.assertFalse(employee.changed)
+        with self.assertRaises(ValueError):
+            employee.review_rating = 9
+        self.assertFalse(employee.changed)  # a rejected value changes nothing
+        employee.review_rating = 4
+        self.assertTrue(employee.changed)
+
+class TestEmployeeTable(unittest.TestCase):
+    def test_append_and_row_view(self):
+        table = EmployeeTable()
+        table.append(Employee("jane", "smith", "2024-12-09", 4))
+        self.assertEqual(len(table), 1)
+        self.assertEqual(table[0].first_name, "Jane")
+        self.assertEqual(table[0].last_name, "Smith")
+        self.assertEqual(table[0].review_date, "2024-12-09")
+        self.assertEqual(table[0].review_rating, 4)
+        self.assertEqual(str(table[-1]), "Jane,Smith,2024-12-09,4")
+
+    def test_columns_are_compact(self):
+        table = EmployeeTable([Employee("John", "Doe", "2024-12-09", 3), Employee("John", "Doe", "2024-12-10", 5)])
+        self.assertIs(table.first_names[0], table.first_names[1])  # names are interned
+        self.assertEqual(list(table.review_dates), [date(2024, 12, 9).toordinal(), date(2024, 12, 10).toordinal()])
+        self.assertEqual(list(table.review_ratings), [3, 5])
+
+    def test_row_view_setters_validate(self):
+        table = EmployeeTable([Employee("John", "Doe", "2024-12-09", 3)])
+        row = table[0]
+        row.review_rating = 5
+        self.assertEqual(table.review_ratings[0], 5)
+        with self.assertRaises(ValueError):
+            row.first_name = "John123"
+        with self.assertRaises(ValueError):
+            row.review_date = "2024/12/09"
+
+    def test_change_tracking(self):
+        table = EmployeeTable([Employee("John", "Doe", "2024-12-09", 3), Employee("Jane", "Doe", "2024-12-10", 5)])
+        self.assertTrue(table.is_dirty())
+        table.mark_saved()
+        self.assertFalse(table.is_dirty())
+        table[1].review_rating = 4
+        self.assertTrue(table.is_dirty())
+        self.assertEqual(table.changed_rows, {1})
+        self.assertEqual([row.changed for row in table], [False, True])
+        table.mark_saved()
+        self.assertEqual((table.is_dirty(), table.changed_rows), (False, set()))
+
+    def test_copy_and_mark_copy_saved(self):
+        table = EmployeeTable([Employee("John", "Doe", "2024-12-09", 3), Employee("Jane", "Doe", "2024-12-10", 5)])
+        table.mark_saved()
+        table[0].review_rating = 1
+        table[1].review_rating = 2
+        table_copy = table.copy()
+        self.assertEqual([str(row) for row in table_copy], [str(row) for row in table])
+        self.assertEqual((table_copy.generation, table_copy.changed_rows), (table.generation, {0, 1}))
+        table[1].review_rating = 4  # changed while the copy is saved
+        table.append(Employee("Ann", "Lee", "2024-12-11", 2))
+        table.mark_copy_saved(table_copy, {0, 1})
+        self.assertTrue(table.is_dirty())
+        self.assertEqual(table.changed_rows, {1})
+
+    def test_float_rating_keeps_the_columns_aligned(self):
+        table = EmployeeTable([Employee("John", "Doe", "2024-12-09", 4)])
+        table.append(Employee("Jane", "Doe", "2024-12-10", 3.0))  # 3.0 passes the Employee validation
+        table[0].review_rating = 2.0
+        with self.assertRaises(ValueError):
+            table.append_values("Bad", "Row", 738000, 2.5)
+        table.append(Employee("Ann", "Lee", "2024-01-01", 5))
+        self.assertEqual([str(row) for row in table],
+                         ["John,Doe,2024-12-09,2", "Jane,Doe,2024-12-10,3", "Ann,Lee,2024-01-01,5"])
+        self.assertEqual({len(table.first_names), len(table.last_names), len(table.review_dates)}, {3})
+
+    def test_index_out_of_range(self):
+        with self.assertRaises(IndexError):
+            EmployeeTable()[0]
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,94 @@
+# ------------------------------------------------------------------------------------------------- #
+# Title: test_metrics_classes.py
+# Description: The test harness for metrics classes
+# ChangeLog: (Who, When, What)
+# AdamSavage,20261018,Created script
+# ------------------------------------------------------------------------------------------------- #
+
+import io
+import json
+import os
+import pstats
+import tempfile
+import unittest
+from unittest.mock import patch
+from data_classes import Person, Employee
+from metrics_classes import Metrics, NO_TIMER
+import processing_classes as proc
+from presentation_classes import IO
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        Metrics.reset()
+
+    def tearDown(self):
+        Metrics.disable()
+        Metrics.reset()
+        self.temp_dir.cleanup()
+
+    def test_disabled_metrics_do_nothing(self):
+        self.assertIs(Metrics.timer("parse"), NO_TIMER)
+        Metrics.count("rows_accepted")
+        self.assertEqual(Metrics.to_dict(), {"counters": {}, "timers": {}})
+
+    def test_setters_are_wrapped_only_while_enabled(self):
+        original = vars(Employee)["review_rating"]
+        Metrics.enable(setter_classes=(Person, Employee))
+        self.assertIsNot(vars(Employee)["review_rating"], original)
+        employee = Employee("John", "Doe", "2024-12-09", 4)
+        with self.assertRaises(ValueError):
+            employee.review_rating = 9
+        self.assertEqual(Metrics.timers["setter"][0], 5)
+        self.assertEqual(Metrics.counters["setter_rejections"], 1)
+        Metrics.disable()
+        self.assertIs(vars(Employee)["review_rating"], original)
+
+    def test_load_save_and_display_are_measured(self):
+        Metrics.enable()
+        file_name = os.path.join(self.temp_dir.name, "EmployeeRatings.json")
+        employee_data = [Employee("John", "Doe", "2024-12-09", 4), Employee("Jane", "Doe", "2024-12-10", 1)]
+        proc.FileProcessor.write_employee_data_to_file(file_name, employee_data)
+        proc.FileProcessor.read_employee_data_from_file(file_name, [], Employee)
+        with patch("sys.stdout", new_callable=io.StringIO):
+            IO.write_employee_data(employee_data)
+        counters = Metrics.to_dict()["counters"]
+        self.assertEqual((counters["rows_written"], counters["rows_accepted"], counters["rows_rendered"]), (2, 2, 2))
+        self.assertEqual(counters["bytes_read"], counters["bytes_written"])
+        self.assertEqual(set(Metrics.timers), {"write", "parse", "validate", "render"})
+
+    def test_prometheus_text(self):
+        Metrics.enable()
+        Metrics.count("rows_accepted", 3)
+        Metrics.add_time("parse", 0.5)
+        self.assertEqual(Metrics.to_prometheus(),
+                         "# TYPE employee_ratings_rows_accepted_total counter\n"
+                         "employee_ratings_rows_accepted_total 3\n"
+                         "# TYPE employee_ratings_parse_seconds summary\n"
+                         "employee_ratings_parse_seconds_count 1\n"
+                         "employee_ratings_parse_seconds_sum 0.500000000\n")
+        file_name = os.path.join(self.temp_dir.name, "metrics.json")
+        Metrics.write_file(file_name)
+        with open(file_name, "r") as file:
+            self.assertEqual(json.load(file)["counters"], {"rows_accepted": 3})
+
+    def test_capture_profile(self):
+        for mode in ("cprofile", "tracemalloc"):
+            with self.subTest(mode=mode):
+                file_name = os.path.join(self.temp_dir.name, mode + ".out")
+                with Metrics.capture_profile(mode, file_name):
+                    sorted(range(1000), reverse=True)
+                if mode == "cprofile":
+                    self.assertGreater(pstats.Stats(file_name).total_calls, 0)
+                else:
+                    with open(file_name, "r") as file:
+                        self.assertTrue(file.readline().startswith("Peak traced memory"))
+        with self.assertRaises(ValueError):
+            with Metrics.capture_profile("perf", "unused"):
+                pass
+
+
+if __name__ == '__main__':
+    unittest.main()
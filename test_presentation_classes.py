@@ -5,9 +5,10 @@
 # AdamSavage,20241208,Created script from ChatGPT suggestions
 # ------------------------------------------------------------------------------------------------- #
 
+import io
 import unittest
 from unittest.mock import patch
-from data_classes import Employee  # Assuming Employee class is imported from data_classes module
+from data_classes import Employee, EmployeeTable  # Assuming Employee class is imported from data_classes module
 from presentation_classes import IO  # Assuming IO class is in the presentation_classes module
 
 
@@ -60,14 +61,14 @@ class TestIO(unittest.TestCase):
         self.assertEqual(choice, "2")
 
     # Test input_menu_choice method with invalid input
-    @patch("builtins.input", return_value="5")  # Invalid choice
+    @patch("builtins.input", return_value="6")  # Invalid choice
     @patch("presentation_classes.IO.output_error_messages")
     def test_input_menu_choice_invalid(self, mock_output, mock_input):
         # Call the function and get the choice
         choice = IO.input_menu_choice()
 
         # Check that the error message is called
-        mock_output.assert_called_once_with("Please, choose only 1, 2, 3, or 4")
+        mock_output.assert_called_once_with("Please, choose only 1, 2, 3, 4, or 5")
         self.assertEqual(choice, "0")  # Default invalid choice
 
     # Test output_employee_data method
@@ -86,6 +87,44 @@ class TestIO(unittest.TestCase):
         mock_print.assert_any_call(" John Doe is rated as 5 (Leading)")
         mock_print.assert_any_call(" Jane Doe is rated as 4 (Strong)")
 
+    # Test write_employee_data method writes every row in one write
+    def test_write_employee_data(self):
+        employee_data = [Employee("John", "Doe", "2024-01-01", 5), Employee("Jane", "Doe", "2024-01-02", 1)]
+        for collection in (employee_data, EmployeeTable(employee_data)):
+            with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+                IO.write_employee_data(collection)
+            self.assertEqual(mock_stdout.getvalue(),
+                             "\n" + "-" * 50 + "\n"
+                             " John Doe is rated as 5 (Leading)\n"
+                             " Jane Doe is rated as 1 (Not Meeting Expectations)\n"
+                             + "-" * 50 + "\n\n")
+
+    # Test write_employee_data method pages and chunks the rows
+    @patch("sys.stdout")
+    def test_write_employee_data_paged(self, mock_stdout):
+        employee_data = [Employee("John", "Doe", "2024-01-01", rating) for rating in (1, 2, 3, 4, 5)]
+
+        IO.write_employee_data(employee_data, offset=1, limit=3, chunk_rows=2)
+
+        written = "".join(call.args[0] for call in mock_stdout.write.call_args_list)
+        self.assertIn(" John Doe is rated as 2 (Building)", written)
+        self.assertIn(" John Doe is rated as 4 (Strong)", written)
+        self.assertNotIn("rated as 1", written)
+        self.assertNotIn("rated as 5", written)
+        self.assertIn(" Showing rows 2-4 of 5", written)
+        self.assertEqual(mock_stdout.write.call_count, 2)  # one write per full chunk plus the last one
+
+    # Test write_employee_data method shows the rows at positions in their order
+    def test_write_employee_data_positions(self):
+        employee_data = [Employee("John", "Doe", "2024-01-01", rating) for rating in (1, 2, 3)]
+        for collection in (employee_data, EmployeeTable(employee_data)):
+            with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+                IO.write_employee_data(collection, limit=1, positions=[2, 0])
+            written = mock_stdout.getvalue()
+            self.assertIn(" John Doe is rated as 3 (Solid)", written)
+            self.assertNotIn("rated as 1", written)
+            self.assertIn(" Showing rows 1-1 of 2", written)
+
     # Test input_employee_data method with valid input
     @patch("builtins.input", side_effect=["John", "Doe", "2024-01-01", "5"])
     def test_input_employee_data_valid(self, mock_input):
@@ -5,11 +5,17 @@
 # AdamSavage,20241208,Created script from ChatGPT suggestions
 # ------------------------------------------------------------------------------------------------- #
 
+import gzip
+import io
+import os
+import shutil
+import tempfile
+import time
 import unittest
 from unittest.mock import patch, mock_open
 import json
 import presentation_classes as pres
-from data_classes import Employee
+from data_classes import Employee, EmployeeTable
 import processing_classes as proc
 
 
@@ -46,6 +52,53 @@ class TestFileProcessor(unittest.TestCase):
         self.assertEqual(result, employee_data)  # No data should be added
         mock_output.assert_called_once_with("There was a non-specific error!", mock_file.side_effect)
 
+    def test_iter_json_array_records_small_chunks(self):
+        records = [{"FirstName": "John", "LastName": "Doe", "ReviewDate": "2024-12-09", "ReviewRating": 4},
+                   {"FirstName": "Jane", "LastName": "Smith", "ReviewDate": "2024-12-10", "ReviewRating": 12345}]
+        file = io.StringIO(json.dumps(records, indent=2))
+
+        # A tiny chunk size forces records and numbers to be split across reads
+        result = list(proc.FileProcessor.iter_json_array_records(file, chunk_size=3))
+
+        self.assertEqual(result, records)
+
+    def test_iter_json_array_records_empty_array(self):
+        self.assertEqual(list(proc.FileProcessor.iter_json_array_records(io.StringIO(" [ ] "))), [])
+
+    def test_iter_json_array_records_invalid(self):
+        with self.assertRaises(json.JSONDecodeError):
+            list(proc.FileProcessor.iter_json_array_records(io.StringIO('[{"FirstName": "John"},'), chunk_size=4))
+
+    def test_iter_json_array_records_invalid_record_stops_reading(self):
+        record = '{"FirstName": "John", "LastName": "Doe", "ReviewDate": "2024-12-09", "ReviewRating": 4}'
+        for bad_record in (record.replace("4}", "tru}"), record.replace('"Doe"', '"Do'), record.replace(", ", " ")):
+            with self.subTest(bad_record=bad_record):
+                file = io.StringIO("[" + bad_record + (", " + record) * 20_000 + "]")
+                with self.assertRaises(json.JSONDecodeError):
+                    list(proc.FileProcessor.iter_json_array_records(file, chunk_size=1024))
+                self.assertLess(file.tell(), 8 * 1024)  # the error is raised without reading the rest of the file
+
+    def test_iter_json_array_records_data_after_the_array(self):
+        record = '{"FirstName": "John", "LastName": "Doe", "ReviewDate": "2024-12-09", "ReviewRating": 4}'
+        for text in ("[" + record + "]\n", "[ ]  ", "[" + record + "] \n"):
+            with self.subTest(text=text):
+                list(proc.FileProcessor.iter_json_array_records(io.StringIO(text), chunk_size=16))
+        for text in ("[" + record + "], [" + record + "]", "[]x", "[" + record + "]\n\n" + " " * 50 + "]"):
+            with self.subTest(text=text):
+                with self.assertRaises(json.JSONDecodeError):
+                    list(proc.FileProcessor.iter_json_array_records(io.StringIO(text), chunk_size=16))
+
+    @patch("builtins.open", new_callable=mock_open,
+           read_data='[{"FirstName": "John", "LastName": "Doe", "ReviewDate": "2024-12-09", "ReviewRating": 4}, '
+                     '{"FirstName": "Jane", "LastName": "Doe", "ReviewDate": "2024/12/09", "ReviewRating": 4}]')
+    @patch.object(pres.IO, 'output_error_messages')  # Mock IO error handling
+    def test_read_employee_data_from_file_invalid_row(self, mock_output, mock_file):
+        employee_data = []
+        result = proc.FileProcessor.read_employee_data_from_file("test_file.json", employee_data, Employee)
+
+        self.assertEqual(len(result), 1)  # Rows before the bad one are kept
+        self.assertEqual(mock_output.call_args[0][0], "There was a non-specific error!")
+
     @patch("builtins.open", new_callable=mock_open)
     def test_write_employee_data_to_file_valid(self, mock_file):
         employee_data = [Employee("John", "Doe", "2024-12-09", 4)]
@@ -91,5 +144,699 @@ class TestFileProcessor(unittest.TestCase):
         mock_output.assert_called_once_with("There was a non-specific error!", mock_file.side_effect)
 
 
+class TestJournaledSave(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.temp_dir.name, "EmployeeRatings.json")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read_back(self):
+        return [str(employee) for employee in
+                proc.FileProcessor.read_employee_data_from_file(self.file_name, [], Employee)]
+
+    def test_save_appends_only_new_rows(self):
+        employee_data = [Employee("John", "Doe", "2024-12-09", 4)]
+        saved = proc.FileProcessor.save_employee_data_to_journal(self.file_name, employee_data)
+        employee_data.append(Employee("Jane", "Doe", "2024-12-10", 5))
+        saved = proc.FileProcessor.save_employee_data_to_journal(self.file_name, employee_data, saved)
+
+        self.assertEqual(saved, 2)
+        with open(self.file_name + proc.JOURNAL_SUFFIX, "r") as file:
+            self.assertEqual(len(file.readlines()), 3)  # header line plus one line per row
+        self.assertEqual(self.read_back(), ["John,Doe,2024-12-09,4", "Jane,Doe,2024-12-10,5"])
+
+    def test_partial_journal_line_is_ignored(self):
+        employee_data = [Employee("John", "Doe", "2024-12-09", 4)]
+        saved = proc.FileProcessor.save_employee_data_to_journal(self.file_name, employee_data)
+        with open(self.file_name + proc.JOURNAL_SUFFIX, "a") as file:
+            file.write('{"FirstName": "Ja')  # a save cut short by a crash
+        self.assertEqual(self.read_back(), ["John,Doe,2024-12-09,4"])
+
+        employee_data.append(Employee("Jane", "Doe", "2024-12-10", 5))
+        proc.FileProcessor.save_employee_data_to_journal(self.file_name, employee_data, saved)
+        self.assertEqual(self.read_back(), ["John,Doe,2024-12-09,4", "Jane,Doe,2024-12-10,5"])
+
+    def test_compact_merges_journal(self):
+        proc.FileProcessor.write_employee_data_to_file(self.file_name, [Employee("John", "Doe", "2024-12-09", 4)])
+        employee_data = [Employee("John", "Doe", "2024-12-09", 4), Employee("Jane", "Doe", "2024-12-10", 5)]
+        proc.FileProcessor.save_employee_data_to_journal(self.file_name, employee_data, 1)
+
+        proc.FileProcessor.compact_employee_data_journal(self.file_name)
+
+        self.assertFalse(os.path.exists(self.file_name + proc.JOURNAL_SUFFIX))
+        with open(self.file_name, "r") as file:
+            self.assertEqual(len(json.load(file)), 2)
+        self.assertEqual(self.read_back(), ["John,Doe,2024-12-09,4", "Jane,Doe,2024-12-10,5"])
+
+    @unittest.skipUnless(os.name == "posix", "file modes are POSIX permissions")
+    def test_atomic_saves_keep_the_file_mode(self):
+        employee_data = EmployeeTable([Employee("John", "Doe", "2024-12-09", 4)])
+        old_umask = os.umask(0o022)
+        try:
+            proc.FileProcessor.write_text_file_atomically(self.file_name, ["[]"])
+            self.assertEqual(os.stat(self.file_name).st_mode & 0o777, 0o644)  # a new file follows the umask
+            for mode in (0o640, 0o664):
+                os.chmod(self.file_name, mode)
+                proc.FileProcessor.replace_file_records(self.file_name, [{"FirstName": "John"}])
+                self.assertEqual(os.stat(self.file_name).st_mode & 0o777, mode)
+            proc.FileProcessor.write_employee_snapshot(self.file_name, employee_data)
+            self.assertEqual(os.stat(self.file_name + proc.SNAPSHOT_SUFFIX).st_mode & 0o777, 0o644)
+        finally:
+            os.umask(old_umask)
+
+    def test_journal_of_a_copied_file_is_kept(self):
+        employee_data = [Employee("John", "Doe", "2024-12-09", 4), Employee("Jane", "Doe", "2024-12-10", 5)]
+        proc.FileProcessor.write_employee_data_to_file(self.file_name, employee_data[:1])
+        saved = proc.FileProcessor.save_employee_data_to_journal(self.file_name, employee_data, 1)
+
+        # Like cp -a or a restore from a backup, the copy has a new inode but the same contents
+        self.file_name = os.path.join(self.temp_dir.name, "Restored.json")
+        for suffix in ("", proc.JOURNAL_SUFFIX):
+            shutil.copy2(os.path.join(self.temp_dir.name, "EmployeeRatings.json" + suffix), self.file_name + suffix)
+        self.assertEqual(self.read_back(), ["John,Doe,2024-12-09,4", "Jane,Doe,2024-12-10,5"])
+
+        employee_data.append(Employee("Ann", "Lee", "2024-12-11", 3))
+        proc.FileProcessor.save_employee_data_to_journal(self.file_name, employee_data, saved)
+        with patch.object(proc.FileProcessor, "hash_files") as mock_hash:
+            self.assertEqual(self.read_back(), ["John,Doe,2024-12-09,4", "Jane,Doe,2024-12-10,5",
+                                                "Ann,Lee,2024-12-11,3"])
+        mock_hash.assert_not_called()  # the save moved the journal over to the copy
+
+    def test_stale_journal_is_ignored(self):
+        employee_data = [Employee("John", "Doe", "2024-12-09", 4)]
+        proc.FileProcessor.save_employee_data_to_journal(self.file_name, employee_data)
+
+        # A full rewrite already holds every row, so the old journal must not be replayed
+        proc.FileProcessor.write_employee_data_to_file(self.file_name, employee_data + employee_data)
+        self.assertEqual(len(self.read_back()), 2)
+
+
+class TestStorageFormats(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_write_and_read_by_extension(self):
+        employee_data = [Employee("John", "Doe", "2024-12-09", 4)]
+        for extension in (".jsonl", ".csv", ".db", ".bin"):
+            with self.subTest(extension=extension):
+                file_name = os.path.join(self.temp_dir.name, "EmployeeRatings" + extension)
+                proc.FileProcessor.write_employee_data_to_file(file_name, employee_data)
+                result = proc.FileProcessor.read_employee_data_from_file(file_name, [], Employee)
+                self.assertEqual([str(employee) for employee in result], ["John,Doe,2024-12-09,4"])
+
+    def test_append_employee_data_to_file(self):
+        file_name = os.path.join(self.temp_dir.name, "EmployeeRatings.data")
+        employee_data = [Employee("John", "Doe", "2024-12-09", 4)]
+        saved = proc.FileProcessor.append_employee_data_to_file(file_name, employee_data, 0, "jsonl")
+        employee_data.append(Employee("Jane", "Doe", "2024-12-10", 5))
+        saved = proc.FileProcessor.append_employee_data_to_file(file_name, employee_data, saved, "jsonl")
+
+        self.assertEqual(saved, 2)
+        result = proc.FileProcessor.read_employee_data_from_file(file_name, [], Employee, "jsonl")
+        self.assertEqual([str(employee) for employee in result], ["John,Doe,2024-12-09,4", "Jane,Doe,2024-12-10,5"])
+
+    def test_compressed_files(self):
+        employee_data = [Employee("John", "Doe", "2024-12-09", 4), Employee("Jane", "Doe", "2024-12-10", 5)]
+        for extension in (".json.gz", ".jsonl.bz2", ".csv.xz", ".bin.gz"):
+            with self.subTest(extension=extension):
+                file_name = os.path.join(self.temp_dir.name, "EmployeeRatings" + extension)
+                proc.FileProcessor.write_employee_data_to_file(file_name, employee_data[:1])
+                saved = proc.FileProcessor.append_employee_data_to_file(file_name, employee_data, 1)
+                self.assertEqual(saved, 2)
+                for lazy in (False, True):
+                    result = proc.FileProcessor.read_employee_data_from_file(file_name, [], Employee, lazy=lazy)
+                    self.assertEqual([str(employee) for employee in result],
+                                     ["John,Doe,2024-12-09,4", "Jane,Doe,2024-12-10,5"])
+                proc.FileProcessor.replace_file_records(file_name,
+                                                        [proc.storage.record_from_employee(employee_data[1])])
+                result = proc.FileProcessor.read_employee_data_parallel(file_name, [], Employee, workers=2)
+                self.assertEqual([str(employee) for employee in result], ["Jane,Doe,2024-12-10,5"])
+        self.assertEqual(os.listdir(self.temp_dir.name).count("EmployeeRatings.json.gz.journal"), 0)
+
+    def test_compressed_json_journal_is_compacted(self):
+        file_name = os.path.join(self.temp_dir.name, "EmployeeRatings.json.gz")
+        employee_data = [Employee("John", "Doe", "2024-12-09", 4), Employee("Jane", "Doe", "2024-12-10", 5)]
+        proc.FileProcessor.save_employee_data_to_journal(file_name, employee_data)
+        proc.FileProcessor.compact_employee_data_journal(file_name)
+        with gzip.open(file_name, "rt") as file:
+            self.assertEqual(len(json.load(file)), 2)
+
+    def test_failed_binary_save_keeps_the_old_file(self):
+        file_name = os.path.join(self.temp_dir.name, "EmployeeRatings.bin")
+        employee_data = [Employee("John", "Doe", "2024-12-09", 4)]
+        proc.FileProcessor.write_employee_data_to_file(file_name, employee_data)
+        with open(file_name, "rb") as file:
+            saved_bytes = file.read()
+        employee_data.append(Employee("Jane", "Doe" * 100, "2024-12-10", 5))
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            self.assertIsNone(proc.FileProcessor.write_employee_data_to_file(file_name, employee_data))
+        self.assertIn("255 utf-8 bytes", mock_stdout.getvalue())
+        with open(file_name, "rb") as file:
+            self.assertEqual(file.read(), saved_bytes)
+        self.assertEqual(os.listdir(self.temp_dir.name), ["EmployeeRatings.bin"])  # no temporary file is left
+
+
+class TestTolerantLoad(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.temp_dir.name, "EmployeeRatings.jsonl")
+        record = {"FirstName": "John", "LastName": "Doe", "ReviewDate": "2024-12-09", "ReviewRating": 4}
+        self.records = [dict(record, ReviewDate=f"2024-12-{day:02}") for day in range(1, 21)]
+        self.records[4]["ReviewRating"] = 9
+        self.records[11] = {"FirstName": "J0hn", "LastName": "Doe", "ReviewRating": 4}
+        proc.storage.JsonLinesBackend.write_records(self.file_name, self.records)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    @patch("processing_classes.RECORD_BATCH_SIZE", 6)
+    @patch("presentation_classes.IO.output_error_messages")
+    def test_invalid_rows_are_reported(self, mock_output):
+        load_report = proc.FileProcessor.new_load_report(self.file_name)
+        result = proc.FileProcessor.read_employee_data_from_file(self.file_name, [], Employee,
+                                                                 load_report=load_report)
+        mock_output.assert_not_called()
+        self.assertEqual(len(result), 18)
+        self.assertEqual(result[4].review_date, "2024-12-06")  # the rows after a bad row are kept in order
+        self.assertEqual((load_report["accepted"], load_report["rejected"]), (18, 2))
+        self.assertEqual([(error["row"], error["field"]) for error in load_report["errors"]],
+                         [(5, "ReviewRating"), (12, "FirstName"), (12, "ReviewDate")])
+        self.assertEqual(load_report["reasons"]["ReviewDate: The field is missing"], 1)
+
+        report_file_name = os.path.join(self.temp_dir.name, "errors.json")
+        proc.FileProcessor.write_load_report(report_file_name, load_report)
+        with open(report_file_name, "r") as file:
+            self.assertEqual(json.load(file), load_report)
+
+    @patch("presentation_classes.IO.output_error_messages")
+    def test_strict_load_stops_at_invalid_row(self, mock_output):
+        result = proc.FileProcessor.read_employee_data_from_file(self.file_name, [], Employee)
+        self.assertEqual(len(result), 4)
+        mock_output.assert_called_once()
+
+    @patch("processing_classes.MAX_LOAD_ERRORS", 1)
+    def test_errors_are_capped(self):
+        load_report = proc.FileProcessor.new_load_report(self.file_name)
+        proc.FileProcessor.read_employee_data_from_file(self.file_name, [], Employee, load_report=load_report)
+        self.assertEqual(len(load_report["errors"]), 1)
+        self.assertEqual(sum(load_report["reasons"].values()), 3)
+
+    @patch("sys.stdout", new_callable=io.StringIO)
+    def test_output_load_report(self, mock_stdout):
+        load_report = proc.FileProcessor.new_load_report(self.file_name)
+        proc.FileProcessor.read_employee_data_from_file(self.file_name, [], Employee, load_report=load_report)
+        pres.IO.output_load_report(load_report)
+        lines = mock_stdout.getvalue().splitlines()
+        self.assertEqual(lines[0], f"{self.file_name}: 18 rows loaded, 2 invalid rows skipped")
+        self.assertIn("  row 5, ReviewRating: Please choose only values 1 through 5", lines)
+
+
+class TestShardLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.records = [{"FirstName": "John", "LastName": "Doe", "ReviewDate": f"2024-12-{day:02}", "ReviewRating": 4}
+                        for day in range(1, 13)]
+        for name, backend, records in (("a.json", proc.storage.JsonBackend, self.records[0::3]),
+                                       ("b.jsonl.gz", proc.storage.JsonLinesBackend, self.records[1::3]),
+                                       ("c.db", proc.storage.SqliteBackend, self.records[2::3])):
+            backend.write_records(os.path.join(self.temp_dir.name, name), records)
+        with open(os.path.join(self.temp_dir.name, "notes.txt"), "w") as file:
+            file.write("not ratings")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_find_shard_files(self):
+        names = ["a.json", "b.jsonl.gz", "c.db"]
+        proc.FileProcessor.save_employee_data_to_journal(os.path.join(self.temp_dir.name, "a.json"), [], 0)
+        for path in (self.temp_dir.name, os.path.join(self.temp_dir.name, "*")):
+            with self.subTest(path=path):
+                self.assertEqual(proc.FileProcessor.find_shard_files(path),
+                                 [os.path.join(self.temp_dir.name, name) for name in names])
+        self.assertEqual(len(proc.FileProcessor.find_shard_files(os.path.join(self.temp_dir.name, "*"), "json")), 4)
+
+    def test_read_employee_shards(self):
+        for workers, merge_by_date in ((1, False), (2, True)):
+            with self.subTest(workers=workers, merge_by_date=merge_by_date):
+                shard_timings: list = []
+                result = proc.FileProcessor.read_employee_shards(self.temp_dir.name, [], Employee, workers=workers,
+                                                                 merge_by_date=merge_by_date,
+                                                                 shard_timings=shard_timings)
+                dates = [employee.review_date for employee in result]
+                if merge_by_date:
+                    self.assertEqual(dates, [record["ReviewDate"] for record in self.records])
+                else:
+                    self.assertEqual(dates[:4], [record["ReviewDate"] for record in self.records[0::3]])
+                self.assertEqual([timing["rows"] for timing in shard_timings], [4, 4, 4])
+                self.assertTrue(all(timing["parse_seconds"] >= 0 for timing in shard_timings))
+
+    @patch("presentation_classes.IO.output_error_messages")
+    def test_invalid_shard_is_left_out(self, mock_output):
+        proc.storage.JsonBackend.write_records(os.path.join(self.temp_dir.name, "a.json"),
+                                               [dict(self.records[0], ReviewRating=9)])
+        shard_timings: list = []
+        result = proc.FileProcessor.read_employee_shards(self.temp_dir.name, [], Employee, workers=1,
+                                                         shard_timings=shard_timings)
+        self.assertEqual(len(result), 8)
+        self.assertIn("error", shard_timings[0])
+        mock_output.assert_called_once()
+
+    def test_iter_merged_records_spills(self):
+        streams = [iter(self.records[5::-1]), iter(self.records[6:])]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            self.assertEqual(list(proc.FileProcessor.iter_merged_records(streams, 4, temp_dir)), self.records)
+
+
+class TestChangeTracking(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.records = [{"FirstName": "John", "LastName": "Doe", "ReviewDate": "2024-12-09", "ReviewRating": 4},
+                        {"FirstName": "Jane", "LastName": "Doe", "ReviewDate": "2024-12-10", "ReviewRating": 5}]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def load(self, extension: str) -> tuple:
+        file_name = os.path.join(self.temp_dir.name, "EmployeeRatings" + extension)
+        proc.storage.StorageBackend.for_file_name(file_name).write_records(file_name, self.records)
+        return file_name, proc.FileProcessor.read_employee_data_from_file(file_name, EmployeeTable(), Employee)
+
+    def read_back(self, file_name: str) -> list:
+        return [str(employee) for employee in proc.FileProcessor.read_employee_data_from_file(file_name, [], Employee)]
+
+    def test_unchanged_save_is_skipped(self):
+        file_name, employee_data = self.load(".json")
+        with patch.object(proc.FileProcessor, "replace_file_records") as mock_replace:
+            self.assertEqual(proc.FileProcessor.write_employee_data_to_file(file_name, employee_data, start_row=2), 0)
+        mock_replace.assert_not_called()
+        self.assertFalse(os.path.exists(file_name + proc.JOURNAL_SUFFIX))
+
+    def test_added_rows_are_appended(self):
+        file_name, employee_data = self.load(".json")
+        employee_data.append(Employee("Ann", "Lee", "2024-12-11", 3))
+        self.assertEqual(proc.FileProcessor.write_employee_data_to_file(file_name, employee_data, start_row=2), 1)
+        self.assertTrue(os.path.exists(file_name + proc.JOURNAL_SUFFIX))
+        self.assertEqual(len(self.read_back(file_name)), 3)
+
+    def test_changed_rows_are_patched_in_place(self):
+        for extension in (".jsonl", ".bin"):
+            with self.subTest(extension=extension):
+                file_name, employee_data = self.load(extension)
+                inode = os.stat(file_name).st_ino
+                employee_data[0].review_rating = 1
+                employee_data.append(Employee("Ann", "Lee", "2024-12-11", 3))
+                self.assertEqual(proc.FileProcessor.write_employee_data_to_file(file_name, employee_data,
+                                                                                start_row=2), 2)
+                self.assertEqual(os.stat(file_name).st_ino, inode)  # the file was not replaced
+                self.assertEqual(self.read_back(file_name), ["John,Doe,2024-12-09,1", "Jane,Doe,2024-12-10,5",
+                                                             "Ann,Lee,2024-12-11,3"])
+                self.assertFalse(employee_data.is_dirty())
+
+    def test_resized_rows_rewrite_the_file(self):
+        for extension in (".jsonl", ".json", ".jsonl.gz"):
+            with self.subTest(extension=extension):
+                file_name, employee_data = self.load(extension)
+                employee_data[1].first_name = "Janet"
+                self.assertEqual(proc.FileProcessor.write_employee_data_to_file(file_name, employee_data,
+                                                                                start_row=2), 2)
+                self.assertEqual(self.read_back(file_name), ["John,Doe,2024-12-09,4", "Janet,Doe,2024-12-10,5"])
+
+    def test_appends_are_flushed_to_disk(self):
+        for extension in (".jsonl", ".csv", ".bin", ".jsonl.gz"):
+            with self.subTest(extension=extension):
+                file_name, employee_data = self.load(extension)
+                employee_data.append(Employee("Ann", "Lee", "2024-12-11", 3))
+                with patch("os.fsync") as mock_fsync:
+                    self.assertEqual(proc.FileProcessor.write_employee_data_to_file(file_name, employee_data,
+                                                                                    start_row=2, fsync=False), 1)
+                    mock_fsync.assert_not_called()
+                    employee_data.append(Employee("Bob", "Lee", "2024-12-12", 2))
+                    self.assertEqual(proc.FileProcessor.write_employee_data_to_file(file_name, employee_data,
+                                                                                    start_row=3), 1)
+                    mock_fsync.assert_called_once()
+                self.assertEqual(len(self.read_back(file_name)), 4)
+
+    def test_list_rows_clear_their_flags(self):
+        file_name, _ = self.load(".jsonl")
+        employee_data = proc.FileProcessor.read_employee_data_from_file(file_name, [], Employee)
+        employee_data[1].review_rating = 2
+        self.assertEqual(proc.FileProcessor.get_changed_rows(employee_data, 2), [1])
+        self.assertEqual(proc.FileProcessor.write_employee_data_to_file(file_name, employee_data, start_row=2), 1)
+        self.assertFalse(employee_data[1].changed)
+        self.assertEqual(proc.FileProcessor.write_employee_data_to_file(file_name, employee_data, start_row=2), 0)
+
+
+class TestStartupSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.temp_dir.name, "EmployeeRatings.json")
+        self.records = [{"FirstName": "John", "LastName": "Doe", "ReviewDate": "2024-12-09", "ReviewRating": 4},
+                        {"FirstName": "", "LastName": "Doe", "ReviewDate": "2024-12-10", "ReviewRating": 5}]
+        proc.storage.JsonBackend.write_records(self.file_name, self.records)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def load(self) -> list:
+        employee_data = proc.FileProcessor.read_employee_data_from_file(self.file_name, EmployeeTable(), Employee,
+                                                                        snapshot=True)
+        return [str(employee) for employee in employee_data]
+
+    def test_snapshot_is_used_until_the_file_changes(self):
+        expected = ["John,Doe,2024-12-09,4", ",Doe,2024-12-10,5"]
+        self.assertEqual(self.load(), expected)
+        self.assertTrue(os.path.exists(self.file_name + proc.SNAPSHOT_SUFFIX))
+        with patch.object(proc.storage.JsonBackend, "iter_records") as mock_iter:
+            self.assertEqual(self.load(), expected)
+        mock_iter.assert_not_called()
+
+        proc.FileProcessor.save_employee_data_to_journal(self.file_name, [Employee("Ann", "Lee", "2024-12-11", 3)])
+        self.assertEqual(self.load(), expected + ["Ann,Lee,2024-12-11,3"])  # the journal is part of the key
+
+    def test_same_size_and_time_edit_is_caught_by_the_hash(self):
+        self.load()
+        stat = os.stat(self.file_name)
+        with open(self.file_name, "r+b") as file:
+            data = file.read().replace(b'"ReviewRating": 4', b'"ReviewRating": 1')
+            file.seek(0)
+            file.write(data)
+        os.utime(self.file_name, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertEqual(self.load()[0], "John,Doe,2024-12-09,1")
+
+    def test_damaged_snapshot_is_ignored(self):
+        self.load()
+        with open(self.file_name + proc.SNAPSHOT_SUFFIX, "r+b") as file:
+            file.truncate(os.path.getsize(self.file_name + proc.SNAPSHOT_SUFFIX) - 3)
+        self.assertFalse(proc.FileProcessor.read_employee_snapshot(self.file_name, EmployeeTable()))
+        self.assertEqual(len(self.load()), 2)
+
+    @patch("presentation_classes.IO.output_error_messages")
+    def test_invalid_file_writes_no_snapshot(self, mock_output):
+        proc.storage.JsonBackend.write_records(self.file_name, [dict(self.records[0], ReviewRating=9)])
+        self.load()
+        mock_output.assert_called_once()
+        self.assertFalse(os.path.exists(self.file_name + proc.SNAPSHOT_SUFFIX))
+
+    @patch("presentation_classes.IO.output_error_messages")
+    def test_partial_load_is_not_complete_and_its_save_deletes_the_snapshot(self, mock_output):
+        load_status = {}
+        proc.FileProcessor.read_employee_data_from_file(self.file_name, EmployeeTable(), Employee,
+                                                        snapshot=True, load_status=load_status)
+        self.assertTrue(load_status["complete"])
+        self.records.append(dict(self.records[0], ReviewRating=9))
+        proc.storage.JsonBackend.write_records(self.file_name, self.records)
+        employee_table = proc.FileProcessor.read_employee_data_from_file(self.file_name, EmployeeTable(), Employee,
+                                                                         snapshot=True, load_status=load_status)
+        mock_output.assert_called_once()
+        self.assertFalse(load_status["complete"])
+        self.assertEqual(len(employee_table), 2)  # the rows before the invalid one
+
+        autosaver = proc.AutoSaver(self.file_name, employee_table, snapshot=load_status["complete"], saved=False)
+        self.assertEqual(autosaver.flush(), 2)
+        self.assertFalse(os.path.exists(self.file_name + proc.SNAPSHOT_SUFFIX))
+
+
+class TestAutoSaver(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.temp_dir.name, "EmployeeRatings.jsonl")
+        self.table = EmployeeTable([Employee("John", "Doe", "2024-12-09", 4)])
+        proc.storage.JsonLinesBackend.write_records(self.file_name, map(proc.storage.record_from_employee, self.table))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read_back(self) -> list:
+        return [str(employee) for employee in
+                proc.FileProcessor.read_employee_data_from_file(self.file_name, [], Employee)]
+
+    def wait_for_saves(self, autosaver, save_count: int):
+        deadline = time.monotonic() + 5
+        while autosaver.save_count < save_count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(autosaver.save_count, save_count)
+
+    def test_changes_are_saved_together_when_enough_rows_changed(self):
+        autosaver = proc.AutoSaver(self.file_name, self.table, interval=60, max_rows=3)
+        autosaver.start()
+        try:
+            for first_name in ("Ann", "Bob"):
+                self.table.append(Employee(first_name, "Lee", "2024-12-11", 3))
+                autosaver.changed()
+            time.sleep(0.05)
+            self.assertEqual(autosaver.save_count, 0)  # under max_rows, so the save waits for the interval
+            self.table[0].review_rating = 1
+            autosaver.changed()
+            self.wait_for_saves(autosaver, 1)
+        finally:
+            autosaver.stop()
+        self.assertEqual(self.read_back(), ["John,Doe,2024-12-09,1", "Ann,Lee,2024-12-11,3", "Bob,Lee,2024-12-11,3"])
+        self.assertFalse(self.table.is_dirty())
+
+    def test_interval_and_stop_save_the_changes(self):
+        autosaver = proc.AutoSaver(self.file_name, self.table, interval=0.05)
+        autosaver.start()
+        self.table.append(Employee("Ann", "Lee", "2024-12-11", 3))
+        autosaver.changed()
+        self.wait_for_saves(autosaver, 1)
+        self.table.append(Employee("Bob", "Lee", "2024-12-11", 3))
+        autosaver.interval = 60
+        autosaver.changed()
+        self.assertEqual(autosaver.stop(), 1)  # the last change is saved when the thread ends
+        self.assertFalse(autosaver.thread.is_alive())
+        self.assertEqual(len(self.read_back()), 3)
+        self.assertEqual(autosaver.stop(), 0)
+
+    def test_saves_write_only_the_changes(self):
+        autosaver = proc.AutoSaver(self.file_name, self.table, fsync=False)
+        self.assertEqual(autosaver.flush(), 0)  # the file already holds the table
+        with patch.object(proc.FileProcessor, "replace_file_records") as mock_replace:
+            self.table.append(Employee("Ann", "Lee", "2024-12-11", 3))
+            self.assertEqual(autosaver.flush(), 1)  # appended
+            self.table[0].review_rating = 2
+            self.assertEqual(autosaver.flush(), 1)  # patched in place
+        mock_replace.assert_not_called()
+        self.table[1].last_name = "Leeson"  # a longer record, so the file is replaced
+        self.assertEqual(autosaver.flush(), 2)
+        self.assertEqual(self.read_back(), ["John,Doe,2024-12-09,2", "Ann,Leeson,2024-12-11,3"])
+
+    def test_change_during_save_stays_unsaved(self):
+        autosaver = proc.AutoSaver(self.file_name, self.table, fsync=False)
+        self.table[0].review_rating = 2
+        write_employee_data_to_file = proc.FileProcessor.write_employee_data_to_file
+
+        def write_and_change(*args, **kwargs):
+            self.table[0].review_rating = 5  # as if entered while the file is written
+            self.table.append(Employee("Bob", "Lee", "2024-12-11", 3))
+            return write_employee_data_to_file(*args, **kwargs)
+
+        with patch.object(proc.FileProcessor, "write_employee_data_to_file",
+                          side_effect=write_and_change) as mock_write:
+            self.assertEqual(autosaver.flush(), 1)
+        self.assertFalse(mock_write.call_args.kwargs["fsync"])
+        self.assertEqual(self.read_back(), ["John,Doe,2024-12-09,2"])
+        self.assertTrue(self.table.is_dirty())
+        self.assertEqual(self.table.changed_rows, {0})
+        self.assertEqual(autosaver.flush(), 2)
+        self.assertEqual(self.read_back(), ["John,Doe,2024-12-09,5", "Bob,Lee,2024-12-11,3"])
+
+    def test_failed_save_stays_unsaved(self):
+        autosaver = proc.AutoSaver(self.file_name, self.table, saved=False)
+        with patch.object(proc.FileProcessor, "replace_file_records", side_effect=OSError("disk full")), \
+                patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            self.assertIsNone(autosaver.flush())
+        self.assertIn("disk full", mock_stdout.getvalue())
+        self.assertTrue(self.table.is_dirty())
+        self.assertEqual(autosaver.flush(), 1)
+
+
+class TestDeduplication(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_external_sort_spills_runs(self):
+        items = [[number % 7, number] for number in range(50)]
+        with patch("heapq.merge", wraps=proc.heapq.merge) as mock_merge:
+            result = list(proc.FileProcessor.external_sort(items, lambda item: item, 8, self.temp_dir.name))
+        self.assertEqual(result, sorted(items))
+        self.assertEqual(len(mock_merge.call_args[0]), 7)  # 50 items in runs of 8
+        self.assertEqual(os.listdir(self.temp_dir.name), [])  # the runs are removed once merged
+
+    def test_deduplicate_keeps_last_row_in_file_order(self):
+        records = [{"FirstName": "John", "LastName": "Doe", "ReviewDate": "2024-12-09", "ReviewRating": 4},
+                   {"FirstName": "Jane", "LastName": "Doe", "ReviewDate": "2024-12-10", "ReviewRating": 1},
+                   {"FirstName": "john", "LastName": "DOE", "ReviewDate": "2024-12-09", "ReviewRating": 2},
+                   {"FirstName": "Sue", "LastName": "Lee", "ReviewDate": "2024-12-11", "ReviewRating": 5},
+                   {"FirstName": "Jane", "LastName": "Doe", "ReviewDate": "2024-12-10", "ReviewRating": 3}]
+        for extension in (".json", ".jsonl", ".csv"):
+            for max_rows in (2, 100):
+                with self.subTest(extension=extension, max_rows=max_rows):
+                    file_name = os.path.join(self.temp_dir.name, "EmployeeRatings" + extension)
+                    proc.storage.StorageBackend.for_file_name(file_name).write_records(file_name, records)
+                    counts = proc.FileProcessor.deduplicate_employee_file(file_name, max_rows_in_memory=max_rows)
+                    self.assertEqual(counts, (5, 3))
+                    self.assertEqual(list(proc.FileProcessor.iter_file_records(file_name)), records[2:])
+                    self.assertEqual(os.listdir(self.temp_dir.name), ["EmployeeRatings" + extension])
+                    os.remove(file_name)
+
+    def test_deduplicate_with_both_sorts_spilling(self):
+        digits = "abcdefghij"
+        records = [{"FirstName": "".join(digits[int(digit)] for digit in f"{number * 37 % 600:03d}").title(),
+                    "LastName": "Doe", "ReviewDate": "2024-12-09", "ReviewRating": number % 5 + 1}
+                   for number in range(1000)]  # the keys of every run span the whole key range
+        last_rows = {record["FirstName"]: number for number, record in enumerate(records)}
+        expected = [records[number] for number in sorted(last_rows.values())]
+        file_name = os.path.join(self.temp_dir.name, "EmployeeRatings.jsonl")
+        for max_rows in (7, 150):  # 150 rows make runs larger than the read buffer of a run file
+            with self.subTest(max_rows=max_rows):
+                proc.storage.JsonLinesBackend.write_records(file_name, records)
+                with patch("heapq.merge", wraps=proc.heapq.merge) as mock_merge:
+                    counts = proc.FileProcessor.deduplicate_employee_file(file_name, max_rows_in_memory=max_rows)
+                self.assertEqual(counts, (1000, 600))
+                self.assertEqual([len(call.args) for call in mock_merge.call_args_list],
+                                 [-(-1000 // max_rows), -(-600 // max_rows)])  # both sorts spilled runs
+                self.assertEqual(list(proc.FileProcessor.iter_file_records(file_name)), expected)
+
+    def test_deduplicate_matches_review_dates_by_day(self):
+        records = [{"FirstName": "John", "LastName": "Doe", "ReviewDate": "2024-12-09", "ReviewRating": 4},
+                   {"FirstName": "John", "LastName": "Doe", "ReviewDate": "20241209", "ReviewRating": 2},
+                   {"FirstName": "John", "LastName": "Doe", "ReviewDate": "not a date", "ReviewRating": 1}]
+        Employee("John", "Doe", records[1]["ReviewDate"], 2)  # another form the Employee validation accepts
+        file_name = os.path.join(self.temp_dir.name, "EmployeeRatings.jsonl")
+        proc.storage.JsonLinesBackend.write_records(file_name, records)
+        self.assertEqual(proc.FileProcessor.deduplicate_employee_file(file_name), (3, 2))
+        self.assertEqual(list(proc.FileProcessor.iter_file_records(file_name)), records[1:])
+
+    def test_read_employee_data_with_index_upserts(self):
+        from query_classes import EmployeeIndex
+        file_name = os.path.join(self.temp_dir.name, "EmployeeRatings.json")
+        proc.FileProcessor.write_employee_data_to_file(file_name, [Employee("John", "Doe", "2024-12-09", 4),
+                                                                   Employee("John", "Doe", "2024-12-09", 2)])
+        employee_data = []
+        proc.FileProcessor.read_employee_data_from_file(file_name, employee_data, Employee,
+                                                        employee_index=EmployeeIndex(employee_data))
+        self.assertEqual([str(employee) for employee in employee_data], ["John,Doe,2024-12-09,2"])
+
+
+class TestLazyEmployeeData(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.employee_data = [Employee("John", "Doe", "2024-12-09", 4), Employee("Jane", "Doe", "2024-12-10", 1),
+                              Employee("Sue", "Lee", "2024-12-11", 5)]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_rows_are_read_on_demand(self):
+        for extension in (".jsonl", ".bin", ".json"):
+            with self.subTest(extension=extension):
+                file_name = os.path.join(self.temp_dir.name, "EmployeeRatings" + extension)
+                proc.FileProcessor.write_employee_data_to_file(file_name, self.employee_data)
+                lazy_data = proc.FileProcessor.read_employee_data_from_file(file_name, [], Employee, lazy=True)
+                self.assertIsInstance(lazy_data, proc.LazyEmployeeData)
+                if extension != ".json":
+                    self.assertEqual(len(lazy_data.offsets), 0)  # nothing is read when the file is opened
+                    self.assertEqual(str(lazy_data[1]), "Jane,Doe,2024-12-10,1")
+                    self.assertEqual(len(lazy_data.offsets), 2)  # only as far as the row that was used
+                lazy_data.append(Employee("Ann", "Lee", "2025-01-01", 3))
+                self.assertEqual(len(lazy_data), 4)
+                self.assertEqual(str(lazy_data[-1]), "Ann,Lee,2025-01-01,3")
+                self.assertEqual([str(employee) for employee in lazy_data][:3],
+                                 [str(employee) for employee in self.employee_data])
+                with self.assertRaises(IndexError):
+                    lazy_data[4]
+                lazy_data.close()
+
+    def test_save_appends_added_rows_only(self):
+        file_name = os.path.join(self.temp_dir.name, "EmployeeRatings.jsonl")
+        proc.FileProcessor.write_employee_data_to_file(file_name, self.employee_data)
+        lazy_data = proc.FileProcessor.read_employee_data_from_file(file_name, [], Employee, lazy=True)
+        lazy_data.append(Employee("Ann", "Lee", "2025-01-01", 3))
+        saved = proc.FileProcessor.append_employee_data_to_file(file_name, lazy_data.added_rows, 0)
+        self.assertEqual((saved, len(lazy_data.offsets)), (1, 0))
+        lazy_data.close()
+        result = proc.FileProcessor.read_employee_data_from_file(file_name, [], Employee)
+        self.assertEqual(len(result), 4)
+
+    def test_saved_rows_become_file_rows(self):
+        for extension in (".csv", ".json", ".jsonl"):
+            with self.subTest(extension=extension):
+                file_name = os.path.join(self.temp_dir.name, "EmployeeRatings" + extension)
+                proc.FileProcessor.write_employee_data_to_file(file_name, self.employee_data)
+                lazy_data = proc.FileProcessor.read_employee_data_from_file(file_name, [], Employee, lazy=True)
+                lazy_data.append(Employee("Ann", "Lee", "2025-01-01", 3))
+                self.assertEqual(len(lazy_data), 4)  # the file rows are counted before the save
+                self.assertEqual(proc.FileProcessor.write_employee_data_to_file(file_name, lazy_data.added_rows,
+                                                                                start_row=0), 1)
+                lazy_data.mark_saved()
+                self.assertEqual((len(lazy_data), str(lazy_data[3])), (4, "Ann,Lee,2025-01-01,3"))
+                with self.assertRaises(IndexError):
+                    lazy_data[4]
+                lazy_data.append(Employee("Bob", "Lee", "2025-01-02", 2))
+                self.assertEqual([str(employee) for employee in lazy_data][3:],
+                                 ["Ann,Lee,2025-01-01,3", "Bob,Lee,2025-01-02,2"])
+                lazy_data.close()
+
+    @patch("presentation_classes.IO.output_error_messages")
+    def test_missing_file_has_no_rows(self, mock_output):
+        file_name = os.path.join(self.temp_dir.name, "missing.jsonl")
+        lazy_data = proc.FileProcessor.read_employee_data_from_file(file_name, [], Employee, lazy=True)
+        self.assertEqual(len(lazy_data), 0)
+        self.assertEqual(list(lazy_data), [])
+        mock_output.assert_called_once()
+
+
+class TestParallelLoad(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.temp_dir.name, "EmployeeRatings.jsonl")
+        self.employee_data = [Employee("John", "Doe", "2024-12-09", rating) for rating in (1, 2, 3, 4, 5)] * 20
+        proc.FileProcessor.write_employee_data_to_file(self.file_name, self.employee_data)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_ranges_read_every_line_once(self):
+        file_size = os.path.getsize(self.file_name)
+        for range_count in (1, 3, 7, 100):
+            with self.subTest(range_count=range_count):
+                bounds = [file_size * index // range_count for index in range(range_count + 1)]
+                result = []
+                for start, end in zip(bounds, bounds[1:]):
+                    result.extend(proc.FileProcessor.read_json_lines_range(self.file_name, start, end, Employee))
+                self.assertEqual([str(employee) for employee in result],
+                                 [str(employee) for employee in self.employee_data])
+
+    @patch.object(proc, "MIN_RANGE_BYTES", 256)  # split even this small file between the workers
+    def test_read_employee_data_parallel(self):
+        result = proc.FileProcessor.read_employee_data_parallel(self.file_name, [], Employee, workers=2)
+        self.assertEqual([str(employee) for employee in result], [str(employee) for employee in self.employee_data])
+
+    @patch.object(pres.IO, 'output_error_messages')  # Mock IO error handling
+    def test_read_employee_data_parallel_invalid_row(self, mock_output):
+        with open(self.file_name, "a") as file:
+            file.write('{"FirstName": "John1", "LastName": "Doe", "ReviewDate": "2024-12-09", "ReviewRating": 4}\n')
+        proc.FileProcessor.read_employee_data_parallel(self.file_name, [], Employee, workers=1)
+        self.assertEqual(mock_output.call_args[0][0], "There was a non-specific error!")
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,121 @@
+# ------------------------------------------------------------------------------------------------- #
+# Title: test_query_classes.py
+# Description: The test harness for query classes
+# ChangeLog: (Who, When, What)
+# AdamSavage,20261018,Created script
+# ------------------------------------------------------------------------------------------------- #
+
+import unittest
+from unittest.mock import patch
+from data_classes import Employee, EmployeeTable
+from presentation_classes import IO
+from query_classes import EmployeeIndex, EmployeeOrdering
+
+
+def make_employee_data():
+    return [Employee("Jane", "Doe", "2024-03-01", 1),
+            Employee("John", "Smith", "2023-06-01", 1),
+            Employee("Jane", "Doe", "2024-09-01", 4),
+            Employee("Jane", "Doe", "2023-01-01", 2)]
+
+
+class TestEmployeeIndex(unittest.TestCase):
+
+    def test_find_by_name(self):
+        index = EmployeeIndex(make_employee_data())
+        self.assertEqual([employee.review_date for employee in index.find_by_name("jane", "DOE")],
+                         ["2024-03-01", "2024-09-01", "2023-01-01"])
+        self.assertEqual(index.find_by_name("No", "One"), [])
+
+    def test_latest_review(self):
+        for employee_data in (make_employee_data(), EmployeeTable(make_employee_data())):
+            with self.subTest(collection=type(employee_data).__name__):
+                index = EmployeeIndex(employee_data)
+                self.assertEqual(index.latest_review("Jane", "Doe").review_date, "2024-09-01")
+                self.assertIsNone(index.latest_review("No", "One"))
+
+    def test_find_by_rating_since(self):
+        index = EmployeeIndex(make_employee_data())
+        result = index.find_by_rating(1, since="2024-01-01")
+        self.assertEqual([str(employee) for employee in result], ["Jane,Doe,2024-03-01,1"])
+        self.assertEqual(len(index.find_by_rating(1)), 2)
+
+    def test_find_by_date_range(self):
+        index = EmployeeIndex(EmployeeTable(make_employee_data()))
+        result = index.find_by_date(since="2023-06-01", until="2024-03-01")
+        self.assertEqual([employee.review_date for employee in result], ["2023-06-01", "2024-03-01"])
+
+    @patch("builtins.input", side_effect=["Jane", "Doe", "2025-01-01", "1"])
+    def test_index_follows_appended_rows(self, mock_input):
+        employee_data = make_employee_data()
+        index = EmployeeIndex(employee_data)
+        IO.input_employee_data(employee_data, Employee)
+
+        self.assertEqual(index.latest_review("Jane", "Doe").review_date, "2025-01-01")
+        self.assertEqual(len(index.find_by_rating(1, since="2024-01-01")), 2)
+
+    def test_index_rebuilds_after_clear(self):
+        employee_data = make_employee_data()
+        index = EmployeeIndex(employee_data)
+        employee_data.clear()
+        self.assertEqual(index.find_by_date(), [])
+
+
+    def test_upsert_adds_then_updates(self):
+        for employee_data in (make_employee_data(), EmployeeTable(make_employee_data())):
+            with self.subTest(collection=type(employee_data).__name__):
+                index = EmployeeIndex(employee_data)
+                self.assertTrue(index.upsert(Employee("Jane", "Doe", "2025-01-01", 3)))
+                self.assertFalse(index.upsert(Employee("JANE", "doe", "2025-01-01", 5)))  # the row just added
+                self.assertFalse(index.upsert(Employee("Jane", "Doe", "2024-03-01", 5)))
+                self.assertEqual(len(employee_data), 5)
+                self.assertEqual(index.update_count, 2)
+                self.assertEqual([employee.review_date for employee in index.find_by_rating(5)],
+                                 ["2024-03-01", "2025-01-01"])
+                self.assertEqual(index.find_by_rating(1)[0].first_name, "John")
+
+    def test_upsert_many_is_idempotent(self):
+        employee_data = make_employee_data()
+        index = EmployeeIndex(employee_data)
+        self.assertEqual(index.upsert_many(make_employee_data()), (0, 4))
+        self.assertEqual((len(employee_data), index.update_count), (4, 0))
+
+
+
+class TestEmployeeOrdering(unittest.TestCase):
+
+    def test_sorted_orders(self):
+        for employee_data in (make_employee_data(), EmployeeTable(make_employee_data())):
+            with self.subTest(collection=type(employee_data).__name__):
+                ordering = EmployeeOrdering(employee_data)
+                self.assertEqual(list(ordering.positions("review_date")), [3, 1, 0, 2])
+                self.assertEqual(list(ordering.positions("last_name")), [0, 2, 3, 1])  # ties keep row order
+                self.assertEqual(list(ordering.positions("review_rating", descending=True)), [2, 3, 0, 1])
+                self.assertEqual(list(ordering.positions(rating=1)), [0, 1])
+                with self.assertRaises(ValueError):
+                    ordering.positions("nickname")
+
+    def test_top_matches_full_sort(self):
+        employee_data = EmployeeTable(make_employee_data() * 5)
+        for sort_key, descending, rating in (("review_date", True, None), ("first_name", False, 1),
+                                             ("review_rating", True, None)):
+            with self.subTest(sort_key=sort_key, descending=descending, rating=rating):
+                heap_top = EmployeeOrdering(employee_data).positions(sort_key, descending, 7, rating)
+                ordering = EmployeeOrdering(employee_data)
+                full_order = ordering.positions(sort_key, descending, rating=rating)
+                self.assertEqual(list(heap_top), list(full_order[:7]))
+                self.assertEqual(list(ordering.positions(sort_key, descending, 7, rating)), list(full_order[:7]))
+
+    def test_orders_are_cached_until_the_data_changes(self):
+        employee_data = EmployeeTable(make_employee_data())
+        ordering = EmployeeOrdering(employee_data)
+        order = ordering.positions("review_date", descending=True, top=2)
+        self.assertIs(ordering.positions("review_date", descending=True, top=2), order)
+        employee_data.append(Employee("Ann", "Lee", "2025-01-01", 3))
+        self.assertEqual(ordering.positions("review_date", descending=True, top=2), [4, 2])
+        employee_data[4].review_date = "2020-01-01"
+        self.assertEqual(ordering.positions("review_date", descending=True, top=2), [2, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
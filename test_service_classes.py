@@ -0,0 +1,108 @@
+# ------------------------------------------------------------------------------------------------- #
+# Title: test_service_classes.py
+# Description: The test harness for service classes
+# ChangeLog: (Who, When, What)
+# AdamSavage,20261018,Created script
+# ------------------------------------------------------------------------------------------------- #
+
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+from data_classes import Employee, EmployeeTable
+import processing_classes as proc
+import storage_classes as storage
+from service_classes import RatingService
+
+RECORD: dict = {"FirstName": "John", "LastName": "Doe", "ReviewDate": "2024-12-09", "ReviewRating": 4}
+
+
+class TestRatingService(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.temp_dir.name, "EmployeeRatings.json")
+        storage.JsonBackend.write_records(self.file_name, [RECORD])
+        self.service = RatingService(self.file_name, EmployeeTable(), Employee, save_interval=0.05)
+        self.service.load()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    async def send(self, reader, writer, request) -> dict:
+        writer.write((request if isinstance(request, str) else json.dumps(request)).encode() + b"\n")
+        await writer.drain()
+        return json.loads(await reader.readline())
+
+    async def test_requests_over_socket(self):
+        server = await self.service.start(port=0)
+        reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+        try:
+            new_record = dict(RECORD, FirstName="Jane", ReviewRating=5)
+            self.assertEqual(await self.send(reader, writer, dict(new_record, op="add")), {"ok": True, "added": True})
+            self.assertEqual(await self.send(reader, writer, dict(new_record, op="add")), {"ok": True, "added": False})
+            response = await self.send(reader, writer, {"op": "query", "ReviewRating": 5})
+            self.assertEqual((response["count"], response["rows"]), (1, [new_record]))
+            response = await self.send(reader, writer, {"op": "stats"})
+            self.assertEqual(response["rows"], 2)
+            self.assertEqual(response["summary"]["histogram"]["5"], 1)
+            self.assertFalse((await self.send(reader, writer, "not json"))["ok"])
+            self.assertFalse((await self.send(reader, writer, {"op": "drop"}))["ok"])
+            self.assertFalse((await self.send(reader, writer, dict(RECORD, op="add", ReviewRating=9)))["ok"])
+            self.assertEqual(await self.send(reader, writer, {"op": "save"}), {"ok": True, "rows": 2})
+        finally:
+            writer.close()
+            server.close()
+            await server.wait_closed()
+        self.assertEqual(len(list(storage.JsonBackend.iter_records(self.file_name))), 1)  # new rows are journaled
+        reloaded = RatingService(self.file_name, EmployeeTable(), Employee)
+        reloaded.load()
+        self.assertEqual(len(reloaded.employee_data), 2)
+
+    async def test_adds_are_saved_together(self):
+        for first_name in ("Ann", "Bob", "Cal"):
+            await self.service.handle_request(dict(RECORD, op="add", FirstName=first_name))
+        self.assertTrue(self.service.is_dirty())
+        task = self.service.save_task
+        self.assertIsNotNone(task)
+        await task
+        self.assertFalse(self.service.is_dirty())
+
+    async def test_update_rewrites_file(self):
+        await self.service.handle_request(dict(RECORD, op="add", ReviewRating=1))
+        self.assertEqual(await self.service.handle_request({"op": "save"}), {"ok": True, "rows": 1})
+        self.assertEqual(list(storage.JsonBackend.iter_records(self.file_name)), [dict(RECORD, ReviewRating=1)])
+
+
+    async def test_save_does_not_block_other_requests(self):
+        started, release = threading.Event(), threading.Event()
+        write_employee_data_to_file = proc.FileProcessor.write_employee_data_to_file
+
+        def slow_write(*args, **kwargs):
+            started.set()
+            release.wait(5)
+            return write_employee_data_to_file(*args, **kwargs)
+
+        with patch.object(proc.FileProcessor, "write_employee_data_to_file", side_effect=slow_write):
+            await self.service.handle_request(dict(RECORD, op="add", FirstName="Ann"))
+            save = asyncio.create_task(self.service.handle_request({"op": "save"}))
+            await asyncio.to_thread(started.wait, 5)
+            # Requests are answered while the file is written, and their changes wait for the next save
+            self.assertEqual(await self.service.handle_request(dict(RECORD, op="add", FirstName="Bob")),
+                             {"ok": True, "added": True})
+            self.assertEqual((await self.service.handle_request({"op": "stats"}))["rows"], 3)
+            release.set()
+            self.assertEqual(await save, {"ok": True, "rows": 2})
+            if self.service.save_task is not None:  # the delayed save of the add made during the write
+                await self.service.save_task
+        self.assertFalse(self.service.is_dirty())
+        reloaded = RatingService(self.file_name, EmployeeTable(), Employee)
+        reloaded.load()
+        self.assertEqual(len(reloaded.employee_data), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
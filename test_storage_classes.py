@@ -0,0 +1,162 @@
+# ------------------------------------------------------------------------------------------------- #
+# Title: test_storage_classes.py
+# Description: The test harness for storage classes
+# ChangeLog: (Who, When, What)
+# AdamSavage,20261018,Created script
+# ------------------------------------------------------------------------------------------------- #
+
+import gzip
+import io
+import os
+import tempfile
+import unittest
+import storage_classes as storage
+
+RECORDS: list = [{"FirstName": "John", "LastName": "Doe", "ReviewDate": "2024-12-09", "ReviewRating": 4},
+                 {"FirstName": "Zoë", "LastName": "Smith", "ReviewDate": "2024-12-10", "ReviewRating": 1}]
+
+
+class TestStorageBackends(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_for_file_name(self):
+        self.assertIs(storage.StorageBackend.for_file_name("ratings.json"), storage.JsonBackend)
+        self.assertIs(storage.StorageBackend.for_file_name("ratings.JSONL"), storage.JsonLinesBackend)
+        self.assertIs(storage.StorageBackend.for_file_name("ratings.csv"), storage.CsvBackend)
+        self.assertIs(storage.StorageBackend.for_file_name("ratings.db"), storage.SqliteBackend)
+        self.assertIs(storage.StorageBackend.for_file_name("ratings.bin"), storage.BinaryBackend)
+        self.assertIs(storage.StorageBackend.for_file_name("ratings.txt"), storage.JsonBackend)
+        self.assertIs(storage.StorageBackend.for_file_name("ratings.txt", "csv"), storage.CsvBackend)
+        self.assertIs(storage.StorageBackend.for_file_name("ratings.jsonl.GZ"), storage.JsonLinesBackend)
+        self.assertIs(storage.StorageBackend.for_file_name("ratings.bin.xz"), storage.BinaryBackend)
+        self.assertIs(storage.StorageBackend.for_file_name("ratings.xz"), storage.JsonBackend)
+        with self.assertRaises(ValueError):
+            storage.StorageBackend.for_file_name("ratings.json", "xml")
+
+    def test_round_trip(self):
+        for backend in storage.BACKENDS:
+            with self.subTest(backend=backend.name):
+                file_name = os.path.join(self.temp_dir.name, "ratings" + backend.extensions[0])
+                backend.write_records(file_name, RECORDS)
+                self.assertEqual(list(backend.iter_records(file_name)), RECORDS)
+
+    def test_append(self):
+        for backend in storage.BACKENDS:
+            if not backend.can_append:
+                continue
+            with self.subTest(backend=backend.name):
+                file_name = os.path.join(self.temp_dir.name, "appended" + backend.extensions[0])
+                backend.append_records(file_name, RECORDS[:1])  # creates the file
+                backend.append_records(file_name, RECORDS[1:])
+                self.assertEqual(list(backend.iter_records(file_name)), RECORDS)
+
+    def test_compressed_round_trip(self):
+        for backend in storage.BACKENDS:
+            if backend is storage.SqliteBackend:
+                continue
+            for codec_extension in storage.CODECS:
+                with self.subTest(backend=backend.name, codec=codec_extension):
+                    file_name = os.path.join(self.temp_dir.name, "ratings" + backend.extensions[0] + codec_extension)
+                    backend.write_records(file_name, RECORDS)
+                    self.assertEqual(list(backend.iter_records(file_name)), RECORDS)
+                    if backend.can_append:
+                        backend.append_records(file_name, RECORDS)  # adds a second compressed stream
+                        self.assertEqual(list(backend.iter_records(file_name)), RECORDS * 2)
+        file_name = os.path.join(self.temp_dir.name, "ratings.jsonl.gz")
+        with gzip.open(file_name, "rb") as file:
+            self.assertEqual(file.readline(), b'{"FirstName": "John", "LastName": "Doe", "ReviewDate": "2024-12-09", '
+                                              b'"ReviewRating": 4}\n')
+        with self.assertRaises(ValueError):
+            storage.SqliteBackend.write_records(os.path.join(self.temp_dir.name, "ratings.db.gz"), RECORDS)
+
+    def test_compressed_binary_is_streamed(self):
+        file_name = os.path.join(self.temp_dir.name, "ratings.bin.gz")
+        storage.BinaryBackend.write_records(file_name, RECORDS * 1000)
+        with storage.StorageBackend.open_file(file_name, "rb") as file:
+            file.read(len(storage.BinaryBackend.SIGNATURE))
+            records = storage.BinaryBackend.iter_file_records(file, chunk_size=7)  # records span the chunks
+            self.assertEqual(list(records), RECORDS * 1000)
+        with gzip.open(file_name, "ab") as file:
+            file.write(b"\x00\x00")
+        with self.assertRaises(ValueError):
+            list(storage.BinaryBackend.iter_records(file_name))
+
+    def test_iter_data_records(self):
+        for extension in (".json", ".jsonl.gz", ".csv.bz2", ".bin.xz"):
+            with self.subTest(extension=extension):
+                file_name = os.path.join(self.temp_dir.name, "ratings" + extension)
+                storage.StorageBackend.for_file_name(file_name).write_records(file_name, RECORDS)
+                with open(file_name, "rb") as file:
+                    data = file.read()
+                self.assertEqual(list(storage.StorageBackend.iter_data_records(file_name, data)), RECORDS)
+        with self.assertRaises(ValueError):
+            list(storage.StorageBackend.iter_data_records("ratings.db", b""))
+
+    def test_sqlite_query(self):
+        file_name = os.path.join(self.temp_dir.name, "ratings.db")
+        storage.SqliteBackend.write_records(file_name, RECORDS)
+        self.assertEqual(list(storage.SqliteBackend.query_records(file_name, review_rating=1, since="2024-12-01")),
+                         RECORDS[1:])
+        self.assertEqual(list(storage.SqliteBackend.query_records(file_name, first_name="John", last_name="Doe")),
+                         RECORDS[:1])
+
+    def test_missing_file(self):
+        for backend in storage.BACKENDS:
+            with self.subTest(backend=backend.name):
+                with self.assertRaises(FileNotFoundError):
+                    list(backend.iter_records(os.path.join(self.temp_dir.name, "missing" + backend.extensions[0])))
+
+    def test_empty_files_are_mapped(self):
+        for backend in (storage.JsonLinesBackend, storage.BinaryBackend):
+            with self.subTest(backend=backend.name):
+                file_name = os.path.join(self.temp_dir.name, "empty" + backend.extensions[0])
+                open(file_name, "wb").close()
+                with storage.StorageBackend.map_file(file_name) as buffer:
+                    self.assertEqual(len(buffer), 0)
+        self.assertEqual(list(storage.JsonLinesBackend.iter_records(file_name.replace(".bin", ".jsonl"))), [])
+
+    def test_json_lines_buffer_parts(self):
+        buffer = b"".join(b'{"Row": %d}\n' % row for row in range(10)) + b"\n"
+        for split in range(len(buffer) + 1):
+            with self.subTest(split=split):
+                rows = list(storage.JsonLinesBackend.iter_buffer_records(buffer, 0, split)) + \
+                       list(storage.JsonLinesBackend.iter_buffer_records(buffer, split))
+                self.assertEqual([row["Row"] for row in rows], list(range(10)))
+
+    def test_buffer_offsets(self):
+        for backend in storage.BACKENDS:
+            if not backend.can_index:
+                continue
+            with self.subTest(backend=backend.name):
+                file_name = os.path.join(self.temp_dir.name, "indexed" + backend.extensions[0])
+                backend.write_records(file_name, RECORDS)
+                with storage.StorageBackend.map_file(file_name) as buffer:
+                    offsets = list(backend.iter_buffer_offsets(buffer))
+                    self.assertEqual(len(offsets), 2)
+                    self.assertEqual(next(backend.iter_buffer_records(buffer, offsets[1])), RECORDS[1])
+        self.assertEqual(list(storage.JsonLinesBackend.iter_buffer_offsets(b'{"A": 1}\n\n  \n{"B": 2}')), [0, 13])
+
+    def test_binary_incomplete_record(self):
+        file_name = os.path.join(self.temp_dir.name, "ratings.bin")
+        storage.BinaryBackend.write_records(file_name, RECORDS)
+        with open(file_name, "r+b") as file:
+            file.truncate(os.path.getsize(file_name) - 2)
+        with self.assertRaises(ValueError):
+            list(storage.BinaryBackend.iter_records(file_name))
+
+
+    def test_binary_name_too_long(self):
+        long_record = dict(RECORDS[0], LastName="Doe" * 100)  # a valid name of 300 utf-8 bytes
+        with self.assertRaisesRegex(ValueError, "255 utf-8 bytes"):
+            storage.BinaryBackend.encode_record(long_record)
+        with self.assertRaisesRegex(ValueError, "255 utf-8 bytes"):
+            storage.BinaryBackend.write_file_records(io.BytesIO(), [RECORDS[0], long_record])
+
+
+if __name__ == '__main__':
+    unittest.main()